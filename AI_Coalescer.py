@@ -0,0 +1,307 @@
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from AI_Enrichment import Enrichment_Usage
+from Kanji_Cache import from_dynamodb_item
+
+# =================================================================
+# AI 한자 생성 요청 병합 (Kanji_Enricher 앞단, 여러 책/작업 공용)
+# - 같은 한자를 동시에 요청하면 진행 중인 생성 하나의 결과를 함께 사용
+# - 여러 작업에서 모인 미스 한자를 짧게(AI_COALESCE_WAIT) 모아 가득 찬 배치 프롬프트로 요청
+# - 모든 그룹은 병합기가 가진 엔진(Kanji_Enricher) 하나로 생성하고, 동시에 실행하는 그룹 수도
+#   엔진의 동시 요청 수로 제한. 모델 호출 수는 그룹에 한자를 넣은 작업들에 한자 수 비율로 나눔
+# - AI_LEASE=1 이면 DynamoDB 조건부 쓰기 리스로 여러 컨테이너/Lambda 중 한 곳만 같은 한자를 생성
+#   (리스를 못 얻은 한자는 다른 워커가 저장할 때까지 DynamoDB 를 조회해서 기다림)
+#   한자마다 조건부 쓰기/삭제 2번이 추가되므로 워커가 여러 개일 때만 켬 (기본 꺼짐)
+#   리스는 한자 테이블이 아닌 전용 테이블(AI_LEASE_TABLE, 파티션 키 kanji)에 저장
+# - 생성 결과의 DynamoDB 저장과 한자 캐시 반영도 여기서 한 번만 수행
+# =================================================================
+
+AI_COALESCE_WAIT = float(os.getenv('AI_COALESCE_WAIT', '0.05'))
+AI_LEASE = os.getenv('AI_LEASE', '0') == '1'
+AI_LEASE_TTL = float(os.getenv('AI_LEASE_TTL', '120'))
+AI_LEASE_POLL = float(os.getenv('AI_LEASE_POLL', '1.0'))
+# 리스 전용 테이블 (한자 테이블 Scan/스냅샷에 리스 항목이 섞이지 않도록 따로 둠)
+AI_LEASE_TABLE = os.getenv('AI_LEASE_TABLE')
+# 리스 항목 키 접두사 (다른 용도와 같은 테이블을 써도 키가 겹치지 않음)
+LEASE_PREFIX = 'lease#'
+DISPATCHER_IDLE = 30
+
+
+def error_code(error):
+    return getattr(error, 'response', {}).get('Error', {}).get('Code', '')
+
+
+class Enrichment_Lease:
+    """DynamoDB 조건부 쓰기로 한자별 AI 생성 권한(리스)을 얻고 해제"""
+
+    def __init__(self, client, table_name, ttl=AI_LEASE_TTL, owner=None, max_workers=8):
+        self.client = client
+        self.table_name = table_name
+        self.ttl = ttl
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.max_workers = max_workers
+        self.claimed = 0
+        self.conflicts = 0
+        self._lock = threading.Lock()
+
+    def claim_many(self, kanji_list):
+        """(리스를 얻은 한자 목록, 다른 워커가 생성 중인 한자 목록)"""
+        if not kanji_list:
+            return [], []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(kanji_list))) as executor:
+            results = list(executor.map(self._claim, kanji_list))
+        claimed = [kanji for kanji, ok in zip(kanji_list, results) if ok]
+        held = [kanji for kanji, ok in zip(kanji_list, results) if not ok]
+        with self._lock:
+            self.claimed += len(claimed)
+            self.conflicts += len(held)
+        return claimed, held
+
+    def _claim(self, kanji):
+        now = time.time()
+        try:
+            self.client.put_item(
+                TableName=self.table_name,
+                Item={
+                    'kanji': {'S': LEASE_PREFIX + kanji},
+                    'lease_owner': {'S': self.owner},
+                    'lease_until': {'N': str(now + self.ttl)}
+                },
+                # 리스가 없거나 만료된 경우에만 획득
+                ConditionExpression='attribute_not_exists(kanji) OR lease_until < :now',
+                ExpressionAttributeValues={':now': {'N': str(now)}}
+            )
+            return True
+        except Exception as e:
+            if error_code(e) == 'ConditionalCheckFailedException':
+                return False
+            # 리스 저장 실패로 생성을 막지는 않음 (중복 생성 가능성만 남음)
+            print(f"[ERROR] AI 생성 리스 획득 실패 ({kanji}): {e}")
+            return True
+
+    def release_many(self, kanji_list):
+        if not kanji_list:
+            return
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(kanji_list))) as executor:
+            list(executor.map(self._release, kanji_list))
+
+    def _release(self, kanji):
+        try:
+            self.client.delete_item(
+                TableName=self.table_name,
+                Key={'kanji': {'S': LEASE_PREFIX + kanji}},
+                ConditionExpression='lease_owner = :owner',
+                ExpressionAttributeValues={':owner': {'S': self.owner}}
+            )
+        except Exception as e:
+            # 다른 워커가 만료된 리스를 가져간 경우는 그대로 둠
+            if error_code(e) != 'ConditionalCheckFailedException':
+                print(f"[ERROR] AI 생성 리스 해제 실패 ({kanji}): {e}")
+
+    def stats(self):
+        return {'claimed': self.claimed, 'conflicts': self.conflicts}
+
+
+def create_enrichment_lease(client):
+    """AI_LEASE=1 이고 리스 전용 테이블(AI_LEASE_TABLE)이 지정되어 있으면 리스 사용"""
+    # load_dotenv() 가 모듈 import 뒤에 호출될 수 있으므로 테이블 이름은 다시 읽음
+    table_name = os.getenv('AI_LEASE_TABLE', AI_LEASE_TABLE)
+    if not AI_LEASE:
+        return None
+    if not table_name:
+        print("[ERROR] AI_LEASE=1 이지만 AI_LEASE_TABLE 이 없어 리스 없이 생성합니다.")
+        return None
+    return Enrichment_Lease(client, table_name)
+
+
+class Enrichment_Coalescer:
+    def __init__(self, enricher, gateway=None, kanji_cache=None, lease=None, max_wait=AI_COALESCE_WAIT,
+                 poll_interval=AI_LEASE_POLL):
+        """enricher(Kanji_Enricher) 는 모든 작업이 공유하는 생성 엔진 (작업별 상태 없음),
+        gateway(DynamoDB_Batch_Gateway) 가 있으면 생성 결과를 저장하고,
+        lease 를 쓰는 경우 다른 워커의 결과를 조회하는 데 사용"""
+        self.enricher = enricher
+        self.gateway = gateway
+        self.kanji_cache = kanji_cache
+        self.lease = lease if gateway is not None else None
+        self.max_wait = max_wait
+        self.poll_interval = poll_interval
+        self.requested = 0
+        self.coalesced = 0  # 진행 중인 생성에 합류한 한자 수
+        self.generated = 0  # 실제로 모델에 요청한 한자 수
+        self.from_other_workers = 0  # 다른 워커가 생성해 DynamoDB 에서 가져온 한자 수
+        self.groups = 0
+        self._inflight = {}  # 한자 -> Future (결과 dict 또는 None)
+        self._pending = OrderedDict()  # 한자 -> (요청한 작업의 Enrichment_Usage, 대기 시작 시각)
+        self._cond = threading.Condition()
+        self._dispatcher = None
+        # 동시에 실행하는 그룹 수 = 엔진의 동시 요청 수 (슬롯이 빌 때까지 한자는 대기열에서 더 모임)
+        self._group_slots = threading.BoundedSemaphore(max(1, enricher.concurrency))
+        self._executor = ThreadPoolExecutor(max_workers=max(1, enricher.concurrency))
+
+    def enrich(self, kanji_list, usage=None):
+        """kanji_list 의 AI 생성 결과(일반 dict 목록, 요청 순서)
+
+        진행 중인 같은 한자는 그 결과를 기다리고, 나머지는 대기열에 넣어
+        다른 작업의 한자와 함께 엔진 배치 크기로 요청합니다. usage(Enrichment_Usage)에는
+        이 작업이 요청한 한자 몫의 모델 호출 수가 기록됩니다.
+        """
+        futures = []
+        with self._cond:
+            for kanji in dict.fromkeys(kanji_list):
+                future = self._inflight.get(kanji)
+                if future is None:
+                    future = self._inflight[kanji] = Future()
+                    self._pending[kanji] = (usage, time.monotonic())
+                else:
+                    self.coalesced += 1
+                futures.append(future)
+            self.requested += len(futures)
+            if self._dispatcher is None:
+                self._dispatcher = threading.Thread(target=self._dispatch_loop, daemon=True)
+                self._dispatcher.start()
+            self._cond.notify_all()
+
+        results = []
+        for future in futures:
+            item = future.result()
+            if item is not None:
+                results.append(item)
+        return results
+
+    def _dispatch_loop(self):
+        while True:
+            self._group_slots.acquire()
+            with self._cond:
+                while not self._pending:
+                    # 한동안 요청이 없으면 스레드 종료 (다음 요청에서 다시 시작)
+                    if not self._cond.wait(DISPATCHER_IDLE) and not self._pending:
+                        self._dispatcher = None
+                        self._group_slots.release()
+                        return
+                _, first_at = next(iter(self._pending.values()))
+                batch_size = self.enricher.batch_size
+                deadline = first_at + self.max_wait
+                while len(self._pending) < batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                # 가득 찬 배치만 보내고, 남은 한자는 다른 작업의 한자와 합칠 수 있도록 대기
+                count = len(self._pending)
+                if count >= batch_size:
+                    count -= count % batch_size
+                group = [self._pending.popitem(last=False) for _ in range(count)]
+                self.groups += 1
+            self._executor.submit(self._run_group, {kanji: usage for kanji, (usage, _) in group})
+
+    def _run_group(self, owners):
+        """owners: 한자 -> 요청한 작업의 Enrichment_Usage (요청 순서)"""
+        kanji_list = list(owners)
+        try:
+            remaining = kanji_list
+            while remaining:
+                if self.lease is not None:
+                    claimed, held = self.lease.claim_many(remaining)
+                else:
+                    claimed, held = remaining, []
+                if claimed:
+                    self._generate(claimed, owners)
+                # 리스가 만료될 때까지 저장되지 않은 한자는 다시 리스를 얻어 직접 생성
+                remaining = self._wait_for_other_workers(held) if held else []
+        except Exception as e:
+            print(f"[ERROR] AI 생성 병합 처리 실패: {e}")
+            self._resolve({}, kanji_list, error=e)
+        finally:
+            self._group_slots.release()
+
+    def _generate(self, kanji_list, owners):
+        try:
+            # 호출 측 조회 이후 다른 작업/워커가 저장을 끝냈을 수 있으므로 한 번 더 조회
+            stored = self._lookup(kanji_list) if self.gateway is not None else {}
+            to_generate = [kanji for kanji in kanji_list if kanji not in stored]
+            generated = {}
+            if to_generate:
+                wanted = set(to_generate)
+                group_usage = Enrichment_Usage()
+                for item in self.enricher.enrich(to_generate, usage=group_usage):
+                    kanji = item.get('kanji')
+                    if kanji in wanted and kanji not in generated:
+                        generated[kanji] = item
+                group_usage.charge([owners[kanji] for kanji in to_generate])
+                with self._cond:
+                    self.generated += len(to_generate)
+                self._store(list(generated.values()))
+        finally:
+            # 저장 -> 리스 해제 -> 대기 중인 요청에 결과 전달 순서
+            if self.lease is not None:
+                self.lease.release_many(kanji_list)
+        self._resolve({**stored, **generated}, kanji_list)
+
+    def _store(self, items):
+        """생성 결과를 DynamoDB 와 캐시에 저장 (write-through, 리스 해제 전에 수행)"""
+        if not items:
+            return
+        if self.gateway is not None:
+            try:
+                failed_items = self.gateway.batch_write(items)
+                if failed_items:
+                    print(f"[ERROR] {len(failed_items)}개 항목 저장 실패 (재시도 초과)")
+            except Exception as e:
+                print(f"[ERROR] DynamoDB 일괄 저장 실패: {e}")
+        if self.kanji_cache is not None:
+            self.kanji_cache.put_many(items)
+
+    def _lookup(self, kanji_list):
+        """DynamoDB 에 이미 저장된 한자 -> 일반 dict"""
+        try:
+            items, _ = self.gateway.batch_get(kanji_list)
+        except Exception as e:
+            print(f"[ERROR] DynamoDB 요청 실패: {e}")
+            return {}
+        return {item['kanji']['S']: from_dynamodb_item(item) for item in items}
+
+    def _wait_for_other_workers(self, kanji_list):
+        """다른 워커가 생성 중인 한자를 DynamoDB 에서 기다리고, 리스 만료까지 없는 한자 목록 반환"""
+        deadline = time.monotonic() + self.lease.ttl
+        remaining = kanji_list
+        while remaining and time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            found = self._lookup(remaining)
+            if found:
+                if self.kanji_cache is not None:
+                    self.kanji_cache.put_many(list(found.values()))
+                with self._cond:
+                    self.from_other_workers += len(found)
+                self._resolve(found, list(found))
+                remaining = [kanji for kanji in remaining if kanji not in found]
+        return remaining
+
+    def _resolve(self, results, kanji_list, error=None):
+        with self._cond:
+            futures = [(kanji, self._inflight.pop(kanji, None)) for kanji in kanji_list]
+        for kanji, future in futures:
+            if future is None or future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(results.get(kanji))
+
+    def stats(self):
+        with self._cond:
+            stats = {
+                'requested': self.requested,
+                'coalesced': self.coalesced,
+                'generated': self.generated,
+                'from_other_workers': self.from_other_workers,
+                'groups': self.groups
+            }
+        if self.lease is not None:
+            stats['lease'] = self.lease.stats()
+        return stats
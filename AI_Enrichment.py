@@ -0,0 +1,353 @@
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from Pipeline_Metrics import pipeline_metrics
+
+# =================================================================
+# Gemini AI 한자 데이터 생성 엔진
+# - 스레드 풀로 여러 배치를 동시에 요청 (엔진 전체의 동시 모델 요청 수 제한)
+# - 고정 sleep 대신 토큰 버킷으로 초당 요청 수 제한
+# - 할당량(429/ResourceExhausted) 오류 시 지터를 둔 지수 백오프
+# - 응답 지연/누락에 따라 배치 크기를 자동 조절 (성공 시 10% 증가, 실패 시 절반,
+#   일부 누락 시 실제로 받은 개수를 상한으로)
+# - 일부가 깨진 JSON 응답에서도 온전한 객체는 모두 사용하고,
+#   빠진 한자만 다시 요청 (계속 빠지면 반으로 나눠 요청, 한 글자까지 실패하면 on_batch_error)
+# - 호출/재시도 수는 엔진 전체 누적값과 별도로 enrich(usage=...) 에 넘긴 작업별 집계에도 기록
+# model 은 generate_content(prompt).text 를 제공하는 어떤 객체든 가능합니다.
+# =================================================================
+
+AI_CONCURRENCY = int(os.getenv('AI_CONCURRENCY', '4'))
+AI_RATE_PER_SEC = float(os.getenv('AI_RATE_PER_SEC', '4'))
+AI_BURST = int(os.getenv('AI_BURST', str(AI_CONCURRENCY)))
+AI_MAX_RETRIES = int(os.getenv('AI_MAX_RETRIES', '5'))
+AI_ADAPTIVE_BATCH = os.getenv('AI_ADAPTIVE_BATCH', '1') == '1'
+AI_BATCH_MIN = int(os.getenv('AI_BATCH_MIN', '1'))
+AI_BATCH_MAX = int(os.getenv('AI_BATCH_MAX', '100'))
+AI_TARGET_LATENCY = float(os.getenv('AI_TARGET_LATENCY', '20'))
+# 누락으로 정한 상한을 이만큼 연속 성공한 뒤 다시 늘려 봄
+AI_BATCH_PROBE_AFTER = int(os.getenv('AI_BATCH_PROBE_AFTER', '20'))
+
+QUOTA_ERROR_MARKERS = ('429', 'ResourceExhausted', 'RESOURCE_EXHAUSTED', 'quota', 'Quota', 'rate limit')
+
+
+class Token_Bucket:
+    """초당 rate 개의 토큰이 채워지는 스레드 안전 토큰 버킷"""
+
+    def __init__(self, rate=AI_RATE_PER_SEC, capacity=AI_BURST):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """토큰 하나를 얻을 때까지 대기"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+# Gemini 할당량은 API 키 단위이므로 프로세스 안의 모든 엔진이 같은 버킷을 사용
+shared_rate_limiter = Token_Bucket()
+
+
+class Enrichment_Usage:
+    """AI 호출 수 집계 (스레드 안전). 작업마다 하나씩 두고 Kanji_Enricher.enrich 에 넘김"""
+
+    FIELDS = ('calls', 'retries', 'salvaged', 'placeholders')
+
+    def __init__(self):
+        self.counts = dict.fromkeys(self.FIELDS, 0)
+        self._lock = threading.Lock()
+
+    def add(self, name, count=1):
+        with self._lock:
+            self.counts[name] += count
+
+    def charge(self, owners):
+        """이 집계를 owners(한자마다 요청한 작업의 집계, 없으면 None)에 한자 수 비율로 나눠 더함
+
+        나머지는 소수점 이하가 큰 작업부터 1씩 주어 작업별 합계가 이 집계와 같습니다.
+        """
+        shares = Counter(owners)
+        total = sum(shares.values())
+        if not total:
+            return
+        for name, count in self.stats().items():
+            exact = {owner: count * share / total for owner, share in shares.items()}
+            amounts = {owner: int(value) for owner, value in exact.items()}
+            leftover = count - sum(amounts.values())
+            for owner in sorted(exact, key=lambda owner: exact[owner] - amounts[owner], reverse=True)[:leftover]:
+                amounts[owner] += 1
+            for owner, amount in amounts.items():
+                if owner is not None and amount:
+                    owner.add(name, amount)
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counts)
+
+
+def is_quota_error(error):
+    text = f"{type(error).__name__} {error}"
+    return any(marker in text for marker in QUOTA_ERROR_MARKERS)
+
+
+def parse_model_json(content):
+    """```json 태그 제거 후 JSON 변환"""
+    clean_text = re.sub(r"```(?:json)?", "", content).strip()
+    return json.loads(clean_text)
+
+
+def parse_model_items(content):
+    """모델 응답에서 kanji 가 있는 JSON 객체 목록 추출
+
+    전체가 올바른 JSON 이 아니면(잘림/깨진 항목) 각 '{' 위치에서 raw_decode 를 시도해
+    온전한 객체만 모읍니다.
+    """
+    clean_text = re.sub(r"```(?:json)?", "", content).strip()
+    try:
+        parsed = json.loads(clean_text)
+        items = parsed if isinstance(parsed, list) else [parsed]
+    except ValueError:
+        decoder = json.JSONDecoder()
+        items = []
+        pos = clean_text.find('{')
+        while pos != -1:
+            try:
+                item, end = decoder.raw_decode(clean_text, pos)
+            except ValueError:
+                pos = clean_text.find('{', pos + 1)
+                continue
+            items.append(item)
+            pos = clean_text.find('{', end)
+    return [item for item in items if isinstance(item, dict) and item.get('kanji')]
+
+
+class Adaptive_Batch_Size:
+    """응답 결과로 배치 크기 조절 (스레드 안전)
+
+    - 누락 없이 목표 지연 안에 응답: 10%(최소 1) 증가 (상한까지)
+    - 요청 실패 / 전부 누락 / 목표 지연 초과: 절반으로
+    - 뒤쪽이 빠짐 (출력 잘림): 실제로 받은 개수를 상한으로 두고 그 크기로,
+      상한은 probe_after 번 연속 성공하면 풀어서 다시 늘려 봄
+    - 중간 항목만 빠짐 (깨진 항목): 크기 유지
+    """
+
+    def __init__(self, initial, minimum=AI_BATCH_MIN, maximum=AI_BATCH_MAX,
+                 target_latency=AI_TARGET_LATENCY, probe_after=AI_BATCH_PROBE_AFTER):
+        self.minimum = max(1, minimum)
+        self.maximum = max(initial, maximum)
+        self.current = max(self.minimum, initial)
+        self.target_latency = target_latency
+        self.probe_after = probe_after
+        self.ceiling = None
+        self.successes = 0
+        self.grown = 0
+        self.shrunk = 0
+        self._lock = threading.Lock()
+
+    def record(self, size, missing, latency, failed=False, truncated=False):
+        with self._lock:
+            # 지금보다 훨씬 작은 재요청 배치의 결과로는 크기를 바꾸지 않음
+            if size * 2 < self.current:
+                return
+            if failed or missing == size or latency > self.target_latency:
+                self._shrink_to(self.current // 2)
+            elif truncated:
+                self.ceiling = max(self.minimum, size - missing)
+                self.successes = 0
+                self._shrink_to(self.ceiling)
+            elif not missing:
+                self.successes += 1
+                if self.ceiling is not None and self.successes >= self.probe_after:
+                    self.ceiling = None
+                limit = self.maximum if self.ceiling is None else self.ceiling
+                if size >= self.current and self.current < limit:
+                    self.current = min(limit, self.current + max(1, self.current // 10))
+                    self.grown += 1
+
+    def _shrink_to(self, size):
+        size = max(self.minimum, size)
+        if size < self.current:
+            self.current = size
+            self.shrunk += 1
+
+
+class Kanji_Enricher:
+    def __init__(self, model, build_prompt, on_batch_error, batch_size=10,
+                 concurrency=AI_CONCURRENCY, rate_limiter=None,
+                 max_retries=AI_MAX_RETRIES, base_delay=1.0, max_delay=30.0, adaptive=AI_ADAPTIVE_BATCH):
+        """build_prompt(batch) -> 프롬프트 문자열,
+        on_batch_error(batch) -> 끝내 생성하지 못한 한자에 대신 사용할 결과 목록
+        batch_size 는 adaptive 이면 시작 크기, 아니면 고정 크기,
+        concurrency 는 이 엔진으로 동시에 보내는 모델 요청 수의 상한 (여러 스레드가 enrich 를
+        동시에 호출해도 모두 합쳐서 적용)"""
+        self.model = model
+        self.build_prompt = build_prompt
+        self.on_batch_error = on_batch_error
+        self.batch_sizer = Adaptive_Batch_Size(batch_size) if adaptive else None
+        self.fixed_batch_size = batch_size
+        self.concurrency = concurrency
+        self.rate_limiter = rate_limiter or shared_rate_limiter
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.calls = 0
+        self.retries = 0  # 할당량 초과(429) 재시도 수
+        self.salvaged = 0  # 재요청으로 얻은 한자 수
+        self.placeholders = 0  # on_batch_error 로 채운 한자 수
+        self._lock = threading.Lock()
+        self._request_slots = threading.BoundedSemaphore(max(1, concurrency))
+        self._local = threading.local()  # 작업 스레드별 호출 측 Enrichment_Usage
+
+    @property
+    def batch_size(self):
+        return self.batch_sizer.current if self.batch_sizer else self.fixed_batch_size
+
+    def _count(self, name, count=1):
+        """엔진 누적값과 현재 enrich 호출의 작업별 집계에 함께 기록"""
+        with self._lock:
+            setattr(self, name, getattr(self, name) + count)
+        usage = getattr(self._local, 'usage', None)
+        if usage is not None:
+            usage.add(name, count)
+
+    def generate(self, prompt):
+        """동시 요청 수/속도 제한과 할당량 재시도를 거쳐 모델 응답 텍스트 반환"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                # 백오프 대기 중에는 요청 슬롯을 잡고 있지 않음
+                with self._request_slots:
+                    self.rate_limiter.acquire()
+                    self._count('calls')
+                    with pipeline_metrics.timer('gemini_request'):
+                        return self.model.generate_content(prompt).text
+            except Exception as e:
+                if not is_quota_error(e) or attempt == self.max_retries:
+                    raise
+                self._count('retries')
+                pipeline_metrics.increment('gemini_quota_retries')
+                # full jitter: 0 ~ base * 2^attempt 사이 임의 대기
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+                print(f"AI 할당량 초과, {delay:.1f}초 후 재시도 ({attempt + 1}/{self.max_retries})")
+                time.sleep(delay)
+
+    def enrich(self, kanji_list, batch_size=None, usage=None):
+        """kanji_list 를 배치로 나누어 동시에 생성, 결과는 kanji_list 순서대로 반환
+
+        batch_size 를 지정하지 않으면 각 작업 스레드가 다음 배치를 꺼낼 때의
+        (자동 조절된) 배치 크기를 사용합니다. usage(Enrichment_Usage)를 넘기면
+        이 호출에서 생긴 모델 호출/재시도 수를 그곳에도 기록합니다.
+        """
+        if not kanji_list:
+            return []
+
+        remaining = deque(kanji_list)
+        batches = []  # (배치 번호, 결과 목록), 배치 번호 순서 = kanji_list 순서
+        taken = [0]
+        lock = threading.Lock()
+
+        def next_batch():
+            with lock:
+                if not remaining:
+                    return None, None
+                size = batch_size or self.batch_size
+                batch = [remaining.popleft() for _ in range(min(size, len(remaining)))]
+                taken[0] += 1
+                return taken[0], batch
+
+        def worker():
+            self._local.usage = usage
+            try:
+                while True:
+                    batch_no, batch = next_batch()
+                    if batch is None:
+                        return
+                    print(f"AI 데이터 생성 시작: 배치 {batch_no} ({len(batch)} 한자)")
+                    batch_results = self._run_batch(batch)
+                    with lock:
+                        batches.append((batch_no, batch_results))
+            finally:
+                self._local.usage = None
+
+        workers = min(self.concurrency, -(-len(kanji_list) // (batch_size or self.batch_size)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for future in [executor.submit(worker) for _ in range(workers)]:
+                future.result()
+        return [item for _, batch_results in sorted(batches, key=lambda entry: entry[0])
+                for item in batch_results]
+
+    def _request(self, batch):
+        """배치를 한 번 요청 -> (한자 -> 항목, 요청 실패 여부)"""
+        start = time.monotonic()
+        failed = False
+        try:
+            items = parse_model_items(self.generate(self.build_prompt(batch)))
+        except Exception as e:
+            print(f"AI 데이터 생성 중 오류 발생: {e}")
+            items = []
+            failed = True
+        wanted = set(batch)
+        found = {}
+        for item in items:
+            if item['kanji'] in wanted and item['kanji'] not in found:
+                found[item['kanji']] = item
+        if self.batch_sizer:
+            missing = len(batch) - len(found)
+            # 빠진 한자가 배치 뒤쪽에 몰려 있으면 출력이 잘린 것으로 판단
+            truncated = 0 < missing < len(batch) and not any(kanji in found for kanji in batch[-missing:])
+            self.batch_sizer.record(len(batch), missing, time.monotonic() - start, failed, truncated)
+        return found, failed
+
+    def _run_batch(self, batch):
+        found = self._generate_all(batch)
+        print(f"배치 생성 완료: {len(found)} 항목")
+        return [found[kanji] for kanji in batch if kanji in found]
+
+    def _generate_all(self, batch, retry=False):
+        """배치를 요청하고 빠진 한자만 다시 요청 -> 한자 -> 항목
+
+        응답 전체가 쓸모없으면 반으로 나눠 요청하고(재귀), 한 글자 요청까지 실패하거나
+        API 오류(재시도 초과)면 on_batch_error 결과로 채웁니다.
+        """
+        found, failed = self._request(batch)
+        if retry:
+            self._count('salvaged', len(found))
+        missing = [kanji for kanji in batch if kanji not in found]
+        if not missing:
+            return found
+        if failed or len(batch) == 1:
+            # API 오류는 나눠서 다시 요청해도 같은 결과이므로 바로 대체
+            found.update(self._fill_placeholders(missing))
+        elif len(missing) < len(batch):
+            print(f"배치 응답에서 {len(missing)}/{len(batch)}개 누락, 누락분만 다시 요청")
+            found.update(self._generate_all(missing, retry=True))
+        else:
+            middle = len(missing) // 2
+            for half in (missing[:middle], missing[middle:]):
+                found.update(self._generate_all(half, retry=True))
+        return found
+
+    def _fill_placeholders(self, missing):
+        self._count('placeholders', len(missing))
+        return {item['kanji']: item for item in self.on_batch_error(missing) if item.get('kanji')}
+
+    def stats(self):
+        stats = {'calls': self.calls, 'retries': self.retries, 'salvaged': self.salvaged, 'placeholders': self.placeholders,
+                 'batch_size': self.batch_size}
+        if self.batch_sizer:
+            stats.update(grown=self.batch_sizer.grown, shrunk=self.batch_sizer.shrunk)
+        return stats
@@ -1,23 +1,356 @@
 import os
 import json
+import gzip
+import base64
+import threading
+import time
 import boto3
+from collections import OrderedDict
+from botocore.exceptions import ClientError
+from Kanji_Results import SHARD_NAME_PATTERN, shard_key
+from Kanji_Columnar import COLUMNAR_CONTENT_TYPE, COLUMNAR_SUFFIX, Columnar_Book
+from Pipeline_Metrics import Job_Metrics
 
 # 1. 초기화 (핸들러 함수 밖에서 실행)
 # 최종 결과 JSON 파일이 저장된 S3 버킷 이름을 환경 변수에서 가져옵니다.
 S3_RESULTS_BUCKET = os.getenv('S3_RESULTS_BUCKET')
+# limit 최대값 (한 번에 너무 큰 페이지를 요청하지 못하도록 제한)
+MAX_PAGE_LIMIT = int(os.getenv('MAX_PAGE_LIMIT', '1000'))
+# 이 크기 미만의 응답은 압축하지 않음 (압축 이득보다 오버헤드가 큼)
+GZIP_MIN_BYTES = int(os.getenv('GZIP_MIN_BYTES', '1024'))
+# 5 이상은 크기 차이가 거의 없고 압축 시간만 늘어남
+GZIP_LEVEL = int(os.getenv('GZIP_LEVEL', '5'))
+# 클라이언트가 매번 ETag 로 재검증하도록 설정 (변경이 없으면 304)
+RESULTS_CACHE_CONTROL = os.getenv('RESULTS_CACHE_CONTROL', 'no-cache')
+# warm 컨테이너의 책 캐시: 전체 크기 제한(바이트)과 재검증 주기(초)
+BOOK_CACHE_MAX_BYTES = int(os.getenv('BOOK_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+BOOK_CACHE_TTL = float(os.getenv('BOOK_CACHE_TTL', '60'))
+# 파싱된 dict/str 객체(와 압축 본문)는 JSON 원문보다 몇 배 크므로 원문 크기에 곱해서 계산
+PARSED_SIZE_FACTOR = 4
 s3_client = boto3.client('s3')
 
+
+class Not_Modified(Exception):
+    """If-None-Match 의 ETag 가 현재 객체와 같을 때"""
+
+    def __init__(self, etag):
+        super().__init__(etag)
+        self.etag = etag
+
+
+class Cached_Book:
+    __slots__ = ('etag', 'content', 'columnar', 'raw_bytes', 'size', 'validated_at', '_book', '_gzipped')
+
+    def __init__(self, etag, raw, columnar=False, gzipped=None):
+        """gzipped: S3 에 gzip 으로 저장된 원본 bytes (있으면 다시 압축하지 않고 그대로 전달)"""
+        self.etag = etag
+        self.raw_bytes = len(raw)
+        self.columnar = columnar
+        # .kjcol 원본 bytes 또는 S3 JSON 원문 (파라미터 없는 요청은 그대로 전달)
+        self.content = raw if columnar else raw.decode('utf-8')
+        self._book = None
+        # 파싱은 offset/limit/level 요청이 올 때까지 미루지만, 캐시 크기는 파싱된 경우로 계산
+        self.size = self.raw_bytes * (1 + PARSED_SIZE_FACTOR)
+        self.validated_at = time.monotonic()
+        self._gzipped = base64.b64encode(gzipped).decode('ascii') if gzipped is not None else None
+
+    @property
+    def book(self):
+        """offset/limit/level 요청용으로 파싱한 책. 처음 필요할 때 한 번만 파싱"""
+        if self._book is None:
+            self._book = Columnar_Book(self.content) if self.columnar else json.loads(self.content)
+        return self._book
+
+    def gzipped(self):
+        """원문 전체의 gzip(base64) 본문. 처음 요청될 때 한 번만 압축"""
+        if self._gzipped is None:
+            self._gzipped = gzip_body(self.content)
+        return self._gzipped
+
+
+class Book_Cache:
+    """전체 크기로 제한되는 LRU. TTL 이 지난 항목은 조건부 GET 으로 재검증"""
+
+    def __init__(self, max_bytes=BOOK_CACHE_MAX_BYTES, ttl=BOOK_CACHE_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.bytes_saved = 0  # S3 에서 다시 받지 않은 객체 바이트
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'revalidations': self.revalidations,
+                'hit_rate': round(self.hits / total, 3) if total else 0.0,
+                'bytes_saved': self.bytes_saved,
+                'entries': len(self._entries),
+                'bytes': self.current_bytes
+            }
+
+    def get(self, object_key):
+        """(항목, 재검증 필요 여부) 반환. 없으면 (None, False)"""
+        with self._lock:
+            entry = self._entries.get(object_key)
+            if entry is None:
+                return None, False
+            self._entries.move_to_end(object_key)
+            return entry, time.monotonic() - entry.validated_at >= self.ttl
+
+    def record(self, hit, saved_bytes=0, revalidated=False):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+            if revalidated:
+                self.revalidations += 1
+            self.bytes_saved += saved_bytes
+
+    def put(self, object_key, entry):
+        with self._lock:
+            old = self._entries.pop(object_key, None)
+            if old is not None:
+                self.current_bytes -= old.size
+            # 캐시 한도보다 큰 책은 저장하지 않음
+            if entry.size > self.max_bytes:
+                return
+            self._entries[object_key] = entry
+            self.current_bytes += entry.size
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= evicted.size
+
+    def discard(self, object_key):
+        """S3 에서 삭제된 객체의 항목 제거"""
+        with self._lock:
+            old = self._entries.pop(object_key, None)
+            if old is not None:
+                self.current_bytes -= old.size
+
+
+# 같은 warm 컨테이너의 모든 호출이 공유
+book_cache = Book_Cache()
+
+
+def gzip_etag(etag):
+    """gzip 응답의 ETag. 같은 객체라도 표현(바이트)이 다르므로 원본 ETag 에 접미사를 붙임"""
+    return f'{etag[:-1]}-gzip"' if etag.endswith('"') else f"{etag}-gzip"
+
+
+def matching_etag(if_none_match, etag):
+    """If-None-Match 헤더(여러 개, W/ 접두사 가능)에서 etag 또는 그 gzip ETag 와 같은 값, 없으면 None"""
+    if not if_none_match:
+        return None
+    for tag in if_none_match.split(','):
+        tag = tag.strip()
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        if tag == '*' or tag == etag:
+            return etag
+        if tag == gzip_etag(etag):
+            return tag
+    return None
+
+
+def get_header(event, name):
+    """API Gateway 헤더는 대소문자가 보장되지 않으므로 소문자로 비교"""
+    for key, value in (event.get('headers') or {}).items():
+        if key.lower() == name:
+            return value
+    return None
+
+
+def parse_view_params(event):
+    """쿼리 파라미터에서 (shard, format, offset, limit, levels) 추출. 잘못된 값이면 ValueError"""
+    params = event.get('queryStringParameters') or {}
+    # shard=manifest, shard=level/N1, shard=pages/1-50
+    shard = params.get('shard')
+    if shard and not SHARD_NAME_PATTERN.match(shard):
+        raise ValueError(f"알 수 없는 샤드: {shard}")
+    # format=json(기본) 또는 columnar (.kjcol 바이너리)
+    fmt = params.get('format') or 'json'
+    if fmt not in ('json', 'columnar'):
+        raise ValueError(f"지원하지 않는 형식: {fmt}")
+    if shard and fmt == 'columnar':
+        raise ValueError("샤드는 json 형식만 지원합니다.")
+    offset = int(params.get('offset') or 0)
+    limit = params.get('limit')
+    limit = int(limit) if limit else None
+    if offset < 0 or (limit is not None and not 0 < limit <= MAX_PAGE_LIMIT):
+        raise ValueError(f"offset 은 0 이상, limit 은 1~{MAX_PAGE_LIMIT} 이어야 합니다.")
+    # level=N1 또는 level=N1,N2
+    level = params.get('level')
+    levels = {lv.strip().upper() for lv in level.split(',') if lv.strip()} if level else None
+    return shard, fmt, offset, limit, levels
+
+
+def is_not_modified(error):
+    return error.response.get('Error', {}).get('Code') in ('304', 'NotModified')
+
+
+def fetch_book(object_key, if_none_match=None):
+    """S3 GET. if_none_match 와 같으면 본문 없이 None 반환"""
+    request = {'Bucket': S3_RESULTS_BUCKET, 'Key': object_key}
+    if if_none_match:
+        request['IfNoneMatch'] = if_none_match
+    try:
+        response = s3_client.get_object(**request)
+    except ClientError as e:
+        if is_not_modified(e):
+            return None
+        raise
+    raw = response['Body'].read()
+    gzipped = None
+    if response.get('ContentEncoding') == 'gzip':
+        # 처리 Lambda 가 RESULT_GZIP=1 로 저장한 결과: 압축 본문은 gzip 응답에 그대로 사용
+        gzipped, raw = raw, gzip.decompress(raw)
+    return Cached_Book(response['ETag'], raw, object_key.endswith(COLUMNAR_SUFFIX), gzipped)
+
+
+def load_book(object_key, if_none_match=None):
+    """캐시된 책(Cached_Book) 반환. 클라이언트의 ETag 와 같으면 Not_Modified
+
+    캐시에 있고 TTL 이내면 S3 를 호출하지 않고, TTL 이 지났으면
+    캐시된 ETag 로 조건부 GET 을 보내 바뀐 경우에만 본문을 다시 받습니다.
+    """
+    entry, stale = book_cache.get(object_key)
+    if entry is not None and stale:
+        fresh = fetch_book(object_key, entry.etag)
+        if fresh is None:
+            entry.validated_at = time.monotonic()
+            book_cache.record(hit=True, saved_bytes=entry.raw_bytes, revalidated=True)
+        else:
+            print(f"S3 객체 변경 감지: {object_key}")
+            entry = fresh
+            book_cache.put(object_key, entry)
+            book_cache.record(hit=False, revalidated=True)
+    elif entry is not None:
+        book_cache.record(hit=True, saved_bytes=entry.raw_bytes)
+    else:
+        # 캐시에 없으면 본문을 받아 캐시에 넣고, 이후 요청(304 포함)은 S3 없이 처리
+        entry = fetch_book(object_key)
+        book_cache.record(hit=False)
+        book_cache.put(object_key, entry)
+
+    matched = matching_etag(if_none_match, entry.etag)
+    if matched:
+        raise Not_Modified(matched)
+    return entry
+
+
+def select_details(book, offset, limit, levels):
+    """details 를 레벨로 거르고 offset/limit 으로 자른 JSON 문자열"""
+    details = book.get('details', [])
+    if levels:
+        details = [item for item in details if item.get('level') in levels]
+    end = None if limit is None else offset + limit
+    view = {key: value for key, value in book.items() if key != 'details'}
+    view.update({
+        'total': len(details),
+        'offset': offset,
+        'limit': limit,
+        'details': details[offset:end]
+    })
+    return json.dumps(view, ensure_ascii=False, separators=(',', ':'))
+
+
+def accepts_gzip(event):
+    accept_encoding = get_header(event, 'accept-encoding') or ''
+    for encoding in accept_encoding.split(','):
+        name, _, q = encoding.strip().partition(';')
+        if name.strip().lower() in ('gzip', '*'):
+            return q.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000')
+    return False
+
+
+def gzip_body(body):
+    return base64.b64encode(gzip.compress(body.encode('utf-8'), compresslevel=GZIP_LEVEL)).decode('ascii')
+
+
+def build_columnar_response(etag, data):
+    """컬럼형 바이너리는 이미 zlib 압축되어 있으므로 gzip 없이 base64 로 전달"""
+    return {
+        'statusCode': 200,
+        'headers': {
+            'Content-Type': COLUMNAR_CONTENT_TYPE,
+            'ETag': etag,
+            'Cache-Control': RESULTS_CACHE_CONTROL
+        },
+        'body': base64.b64encode(data).decode('ascii'),
+        'isBase64Encoded': True
+    }
+
+
+def build_response(event, etag, body, body_bytes, compress):
+    """body_bytes: 본문의 UTF-8 크기, compress: gzip(base64) 본문을 돌려주는 함수"""
+    headers = {
+        # 일본어 등 다국어 문자가 깨지지 않도록 charset=utf-8 설정
+        'Content-Type': 'application/json; charset=utf-8',
+        'ETag': etag,
+        'Cache-Control': RESULTS_CACHE_CONTROL,
+        'Vary': 'Accept-Encoding'
+    }
+    if body_bytes >= GZIP_MIN_BYTES and accepts_gzip(event):
+        headers['Content-Encoding'] = 'gzip'
+        headers['ETag'] = gzip_etag(etag)
+        return {
+            'statusCode': 200,
+            'headers': headers,
+            'body': compress(),
+            'isBase64Encoded': True
+        }
+    return {'statusCode': 200, 'headers': headers, 'body': body}
+
+
+def build_view_response(event, entry, fmt, offset, limit, levels):
+    """파라미터가 있으면 details 를 거르고 잘라서 반환, 없으면 S3 객체 그대로 전달"""
+    if fmt == 'columnar':
+        data = entry.content
+        if offset or limit is not None or levels:
+            indices, total = entry.book.select(levels, offset, limit)
+            data = entry.book.subset(indices, {'total': total, 'offset': offset, 'limit': limit})
+        return build_columnar_response(entry.etag, data)
+    if offset or limit is not None or levels:
+        content_string = select_details(entry.book, offset, limit, levels)
+        return build_response(event, entry.etag, content_string, len(content_string.encode('utf-8')),
+                              lambda: gzip_body(content_string))
+    return build_response(event, entry.etag, entry.content, entry.raw_bytes, entry.gzipped)
+
+
 def lambda_handler(event, context):
     """
     API Gateway로부터 GET 요청을 받아 S3에 저장된 JSON 파일을 반환합니다.
+    쿼리 파라미터: offset, limit (details 페이지), level (JLPT 레벨, 쉼표로 여러 개),
+    shard (manifest / level/N1 / pages/1-50 등 미리 나눠 저장한 샤드),
+    format (json 또는 columnar: Kanji_Columnar 형식 바이너리)
+    Accept-Encoding 에 gzip 이 있으면 압축하고, If-None-Match 가 ETag 와 같으면 304 를 반환합니다.
     """
+    # 요청마다 책 로드/응답 생성 시간과 캐시 적중을 EMF 로그 한 줄로 출력 (CloudWatch 지표)
+    metrics = Job_Metrics('results_api')
+    hits_before = book_cache.hits
+    response = handle_request(event, metrics)
+    metrics.count('book_cache_hits', book_cache.hits - hits_before)
+    metrics.emit(status=response['statusCode'])
+    return response
+
+
+def handle_request(event, metrics):
+    """lambda_handler 본문 (책 로드/응답 생성 시간을 metrics 에 기록)"""
     print(f"Received event: {event}")
 
     try:
         # 2. API Gateway 경로 파라미터에서 파일 이름(book_name) 추출
         # API Gateway 리소스 경로가 /kanji-data/{book_name} 형태일 때,
         # {book_name}에 해당하는 값을 여기서 꺼낼 수 있습니다.
-        path_params = event.get('pathParameters', {})
+        path_params = event.get('pathParameters') or {}
         book_name = path_params.get('book_name')
 
         if not book_name:
@@ -27,32 +360,45 @@ def lambda_handler(event, context):
                 'body': json.dumps({'error': '파일 이름이 지정되지 않았습니다.'})
             }
 
+        try:
+            shard, fmt, offset, limit, levels = parse_view_params(event)
+        except ValueError as e:
+            return {
+                'statusCode': 400,
+                'body': json.dumps({'error': f'잘못된 쿼리 파라미터입니다: {e}'}, ensure_ascii=False)
+            }
+
         # 3. S3 객체 키(전체 경로) 생성
         # 이 경로는 프로세싱 Lambda가 파일을 저장할 때 사용한 규칙과 정확히 일치해야 합니다.
         object_key = f"processed/{book_name}"
+        if shard:
+            # 처리 Lambda 가 결과 옆에 저장한 샤드를 그대로 제공
+            object_key = shard_key(object_key, shard)
+        elif fmt == 'columnar':
+            object_key += COLUMNAR_SUFFIX
         print(f"S3에서 파일 찾는 중: s3://{S3_RESULTS_BUCKET}/{object_key}")
 
-        # 4. S3에서 해당 JSON 파일 가져오기
-        response = s3_client.get_object(
-            Bucket=S3_RESULTS_BUCKET,
-            Key=object_key
-        )
-        
-        # 파일 내용을 문자열로 읽어옵니다.
-        content_string = response['Body'].read().decode('utf-8')
+        # 4. 캐시 또는 S3에서 해당 JSON 파일 가져오기 (If-None-Match 가 같으면 304)
+        try:
+            with metrics.stage('load_book'):
+                entry = load_book(object_key, get_header(event, 'if-none-match'))
+        finally:
+            print(f"책 캐시: {book_cache.stats()}")
 
-        # 5. 성공 응답을 API Gateway 형식에 맞게 반환
+        # 5. 파라미터가 있으면 details 를 거르고 잘라서 반환, 없으면 S3 객체 그대로 전달
+        with metrics.stage('render'):
+            return build_view_response(event, entry, fmt, offset, limit, levels)
+
+    except Not_Modified as e:
+        # 클라이언트가 가진 버전과 같으면 본문 없이 304 반환
         return {
-            'statusCode': 200,
-            'headers': {
-                # 일본어 등 다국어 문자가 깨지지 않도록 charset=utf-8 설정
-                'Content-Type': 'application/json; charset=utf-8'
-            },
-            'body': content_string # S3에서 읽은 JSON 문자열을 그대로 전달
+            'statusCode': 304,
+            'headers': {'ETag': e.etag, 'Cache-Control': RESULTS_CACHE_CONTROL, 'Vary': 'Accept-Encoding'},
+            'body': ''
         }
-
     except s3_client.exceptions.NoSuchKey:
-        # 파일이 S3에 없는 경우 404 Not Found 에러 반환
+        # 파일이 S3에 없는 경우 404 Not Found 에러 반환 (삭제된 객체는 책 캐시에서도 제거)
+        book_cache.discard(object_key)
         return {
             'statusCode': 404,
             'body': json.dumps({'error': '요청한 데이터를 찾을 수 없습니다.'}, ensure_ascii=False)
@@ -63,4 +409,4 @@ def lambda_handler(event, context):
         return {
             'statusCode': 500,
             'body': json.dumps({'error': '서버 내부 오류가 발생했습니다.'}, ensure_ascii=False)
-        }
\ No newline at end of file
+        }
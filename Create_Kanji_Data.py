@@ -1,62 +1,132 @@
-import pypdf
-import re
-from flask import Flask, jsonify
+import argparse
 import boto3
 import json
 from urllib.parse import unquote_plus
-from boto3.dynamodb.conditions import Key, Attr
 import os
 import threading
-import time
+import queue
+from concurrent.futures import ThreadPoolExecutor
 import google.generativeai as genai
 from dotenv import load_dotenv
-from pathlib import Path
-from collections import defaultdict
+from PDF_Kanji_Extractor import (EXTRACT_WORKERS, LOW_MEMORY_PAGE_WINDOW, extract_kanji_with_pages, iter_page_kanji,
+                                 merge_page_kanji, open_pdf)
+from Kanji_Tokenizer import Kanji_Tokenizer
+from S3_PDF_Loader import PDF_Byte_Cache, S3_PDF_Loader
+from SQS_Consumer_Pool import SQS_Consumer_Pool, SQS_WORKERS
+from AI_Enrichment import Enrichment_Usage, Kanji_Enricher
+from AI_Coalescer import Enrichment_Coalescer, create_enrichment_lease
+from Kanji_Cache import shared_kanji_cache, from_dynamodb_item, to_dynamodb_item
+from DynamoDB_Batch_Gateway import DynamoDB_Batch_Gateway, GET_CHUNK
+from Kanji_Results import LOW_MEMORY, Kanji_Detail, build_final_details, build_shards
+from Result_Cache import Result_Cache, pdf_content_hash, result_cache_key
+from Page_Index import INCREMENTAL, Page_Index, Page_Index_Store, entries_from_details, page_fingerprints, reuse_items
+from Kanji_Columnar import write_columnar
+from Result_Store import create_result_store
+from Kanji_API_Server import create_app
+from Pipeline_Metrics import METRICS_PORT, Job_Metrics, pipeline_metrics, start_metrics_server
 
-class App_Runner:
-    def __init__(self):
+# 파이프라인 모드: 추출 -> DynamoDB 조회 -> AI 생성 단계를 큐로 연결해 동시에 실행
+STREAMING_PIPELINE = os.getenv('STREAMING_PIPELINE', '0') == '1'
+PIPELINE_QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', '1000'))
+
+# 실행 모드 (python Create_Kanji_Data.py --mode ...)
+#   all    : 수집 워커 + Flask 개발 서버를 한 프로세스에서 실행 (기존 동작)
+#   worker : SQS 수집 워커만 실행 (RESULT_STORE_DIR 에 결과 저장)
+#   api    : 결과 조회 API 만 실행 (운영은 gunicorn "Kanji_API_Server:create_app()")
+RUN_MODES = ('all', 'worker', 'api')
+
+
+class Ingestion_Worker:
+    """SQS 메시지를 받아 책을 처리하고 결과 저장소에 넣는 수집 워커"""
+
+    def __init__(self, result_store=None):
         load_dotenv()
-        self.app = Flask(__name__)
         self.sqs_jsonMessage = os.getenv('SQS_JSON_URL')
-        self.kanji_instance = None  # 초기에는 없음
+        # 책 이름별 처리 결과 (RESULT_STORE_DIR 가 있으면 API 프로세스와 공유하는 디스크 저장소)
+        self.result_store = result_store if result_store is not None else create_result_store()
+        # boto3 클라이언트/Gemini 모델은 한 번만 만들고 모든 작업에서 재사용
+        self.clients = create_shared_clients()
+        # 같은 PDF(내용 해시)를 다시 받으면 파이프라인 없이 이전 결과 재사용
+        self.result_cache = Result_Cache(self.clients['s3'])
+        # 동시에 처리 중인 책들이 같은 한자를 한 번만 AI 로 생성하도록 모든 작업이 공유
+        self.ai_coalescer = create_ai_coalescer(self.clients)
+        # SQS_WORKERS 개의 책을 동시에 처리하는 소비자 풀
+        self.consumer_pool = SQS_Consumer_Pool(
+            self.clients['sqs'], os.getenv('SQS_PDF_URL'), self.process_message, workers=SQS_WORKERS
+        )
+        # /metrics 요청 때 캐시/병합기/저장소 상태를 게이지로 노출
+        pipeline_metrics.add_collector('kanji_cache', shared_kanji_cache.stats)
+        pipeline_metrics.add_collector('result_cache', self.result_cache.stats)
+        pipeline_metrics.add_collector('ai_coalescer', self.ai_coalescer.stats)
+        pipeline_metrics.add_collector('result_store', self.result_store.stats)
 
-        # SQS 대기 스레드 시작
-        self.start_sqs_listener()
+    def start(self):
+        """백그라운드 스레드로 SQS 수신 시작"""
+        return self.consumer_pool.start()
+
+    def run_forever(self):
+        """현재 스레드에서 SQS 수신 (worker 모드 전용 프로세스)"""
+        print("📥 SQS 수집 워커 시작")
+        if METRICS_PORT:
+            # Flask 앱이 없는 프로세스이므로 /metrics 만 별도 포트로 제공
+            start_metrics_server(METRICS_PORT)
+        try:
+            self.consumer_pool.run_forever()
+        except KeyboardInterrupt:
+            self.consumer_pool.stop()
+
+    def process_message(self, message):
+        """SQS 메시지 하나(책 한 권)를 처리. True 를 반환하면 메시지 삭제
 
-        @self.app.route('/api/kanji/all', methods=['GET'])
-        def kanji_all():
-            if self.kanji_instance:
-                return jsonify(self.kanji_instance.all_data)
-            return jsonify({"message": "아직 데이터 없음"})
+        S3 이벤트가 아닌 메시지는 다시 받아도 처리할 수 없으므로 삭제합니다.
+        처리 중 예외는 재전달되며, 반복 실패는 큐의 DLQ redrive policy 로 격리합니다.
+        """
+        try:
+            location = parse_s3_location(message)
+        except (ValueError, KeyError, TypeError) as e:
+            print(f"[ERROR] 메시지 형식 오류: {e}")
+            location = None
+        if not location:
+            print(f"유효한 S3 이벤트가 없어 메시지를 삭제합니다: {message.get('MessageId')}")
+            return True
 
-        @self.app.route('/')
-        def hello_world():
-            return 'hi'
+        new_kanji_instance = Create_Kanji_Data(clients=self.clients, s3_location=location,
+                                               result_cache=self.result_cache, ai_coalescer=self.ai_coalescer)
+        print(f"결과 캐시: {self.result_cache.stats()}, AI 병합: {self.ai_coalescer.stats()}")
+        if hasattr(new_kanji_instance, 'all_data') and new_kanji_instance.all_data:
+            # 직렬화까지 이 작업 스레드에서 끝내고 저장소에는 완성된 결과만 넣음
+            # 다른 경로의 같은 파일 이름(a/book.pdf, b/book.pdf)이 겹치지 않도록 S3 키 전체를 사용
+            book_name = location[1]
+            with pipeline_metrics.timer('result_store_put', 'container'):
+                self.result_store.put(book_name, new_kanji_instance.all_data,
+                                      new_kanji_instance.shards, new_kanji_instance.columnar)
+            print(f"결과 저장소: {self.result_store.stats()}")
+            print("✅ 새로운 한자 데이터 처리 완료")
+            try:
+                self.clients['sqs'].send_message(
+                    QueueUrl=self.sqs_jsonMessage,
+                    MessageBody='complete'  # 데이터 처리 완료 메시지
+                )
+                print("📤 SQS로 JSON 메시지 전송 완료")
+            except Exception as e:
+                print(f"[ERROR] SQS 전송 실패: {e}")
+        return True
 
-    def start_sqs_listener(self):
-        listener_thread = threading.Thread(target=self.sqs_listener_loop)
-        listener_thread.daemon = True
-        listener_thread.start()
 
-    def sqs_listener_loop(self):
-        while True:
-            print("📥 SQS 메시지 감지 대기 중...")
-            new_kanji_instance = Create_Kanji_Data()
-            self.kanji_instance = new_kanji_instance
-            if hasattr(new_kanji_instance, 'all_data') and new_kanji_instance.all_data:
-                print("✅ 새로운 한자 데이터 처리 완료")
-                try:
-                    sqs = boto3.client('sqs', region_name=os.getenv('AWS_REGION'))
-                    sqs.send_message(
-                        QueueUrl=self.sqs_jsonMessage,
-                        MessageBody='complete'  # 데이터 처리 완료 메시지
-                    )
-                    print("📤 SQS로 JSON 메시지 전송 완료")
-                except Exception as e:
-                    print(f"[ERROR] SQS 전송 실패: {e}")
-                    
+class App_Runner:
+    """개발용 단일 프로세스 실행: 수집 워커 스레드 + Flask 개발 서버 (같은 결과 저장소 공유)"""
+
+    def __init__(self):
+        self.worker = Ingestion_Worker()
+        self.result_store = self.worker.result_store
+        self.app = create_app(self.result_store)
+
+        # SQS 대기 스레드 시작
+        self.worker.start()
+
     def run(self):
         self.app.run(host='0.0.0.0', port=5000)
+
 # class App_Runner:
 #     def __init__(self):
 #         load_dotenv() # .env 파일 로드
@@ -117,42 +187,141 @@ class App_Runner:
 #     def run(self):
 #         self.app.run(host='0.0.0.0', port=5000)
     
+def create_shared_clients():
+    """boto3 클라이언트와 Gemini 모델 생성 (스레드 간 공유 가능)"""
+    region = os.getenv('AWS_REGION')
+    genai.configure(api_key=os.getenv('GOOGLE_API_KEY'))
+    return {
+        'sqs': boto3.client('sqs', region_name=region),
+        'sns': boto3.client('sns', region_name=region),
+        's3': boto3.client('s3', region_name=region),
+        'dynamodb': boto3.client('dynamodb', region_name=region),
+        'model': genai.GenerativeModel("gemini-1.5-flash"),
+    }
+
+
+def create_ai_coalescer(clients, gateway=None):
+    """모든 작업이 공유하는 AI 생성 엔진 + 요청 병합기 (생성 결과 저장 + DynamoDB 리스)"""
+    # 응답 일부가 깨지면 빠진 한자만 다시 요청 (한자별 개별 호출 폴백 대신)
+    enricher = Kanji_Enricher(clients['model'], Create_Kanji_Data.build_batch_prompt,
+                              Create_Kanji_Data.placeholder_items)
+    gateway = gateway or DynamoDB_Batch_Gateway(clients['dynamodb'], os.getenv('DYNAMODB_TABLE_NAME'))
+    return Enrichment_Coalescer(enricher, gateway, shared_kanji_cache, create_enrichment_lease(clients['dynamodb']))
+
+
+def parse_s3_location(message):
+    """sns를 통해 sqs로 전달된 메시지에서 (bucket, key) 추출, 없으면 None"""
+    body = json.loads(message['Body'])
+    s3_event = json.loads(body['Message'])
+    print(s3_event)
+    
+    bucket = None
+    key = None
+    
+    for record in s3_event.get('Records', []):
+        # S3 이벤트에서 버킷과 객체 키 추출
+        bucket = record.get('s3', {}).get('bucket', {}).get('name')
+        key = record.get('s3', {}).get('object', {}).get('key')
+        if key:
+            key = unquote_plus(key)
+            print(f"추출된 키: {key}")
+    
+    if bucket and key:
+        return bucket, key
+    return None
+
+
 # 전체적인 한자 데이터 생성 및 처리 클래스
 class Create_Kanji_Data():
-    def __init__(self):
+    def __init__(self, extract_workers=EXTRACT_WORKERS, clients=None, s3_location=None,
+                 streaming=STREAMING_PIPELINE, result_cache=None, ai_coalescer=None,
+                 incremental=INCREMENTAL, page_index_store=None, low_memory=LOW_MEMORY):
+        """clients 를 넘기면 공유 클라이언트를 재사용하고,
+        s3_location=(bucket, key) 를 넘기면 SQS 폴링 없이 해당 PDF를 바로 처리"""
+        # 단계별 시간/항목 수 (처리가 끝나면 EMF 로그 한 줄 + /metrics 누적)
+        mode = 'incremental' if incremental else 'streaming' if streaming else 'serial'
+        self.metrics = Job_Metrics('container', mode=mode, low_memory=low_memory)
         self.page_num = 0
-        self.sqs = boto3.client('sqs', region_name=os.getenv('AWS_REGION'))
-        self.sns = boto3.client('sns', region_name=os.getenv('AWS_REGION'))
-        self.s3 = boto3.client('s3', region_name=os.getenv('AWS_REGION'))
+        self.extract_workers = extract_workers  # PDF 추출 프로세스 수 (1이면 직렬)
+        self.streaming = streaming  # True 면 단계별 파이프라인으로 처리
+        self.incremental = incremental  # True 면 이전 페이지 색인과 비교해 바뀐 페이지만 처리
+        # True 면 PdfReader 객체 캐시를 페이지 창마다 비우고, 배열 기반 페이지 맵과 __slots__ details 사용
+        self.low_memory = low_memory
+        clients = clients or create_shared_clients()
+        self.sqs = clients['sqs']
+        self.sns = clients['sns']
+        self.s3 = clients['s3']
+        # 저메모리 모드에서는 프로세스 공용 PDF 캐시에 원본을 남기지 않음 (크기 0 캐시)
+        self.pdf_loader = S3_PDF_Loader(self.s3, PDF_Byte_Cache(0) if low_memory else None)
+        self.pdf_bytes = None
         self.response = None
-        genai.configure(api_key=os.getenv('GOOGLE_API_KEY'))
-        self.model = genai.GenerativeModel("gemini-1.5-flash")
-        self.dynamodb = boto3.client('dynamodb', region_name=os.getenv('AWS_REGION'))
+        self.model = clients['model']
+        # 이 작업이 요청한 한자 몫의 AI 호출 수 (다른 작업과 합쳐 요청한 배치는 한자 수 비율로 나눔)
+        self.ai_usage = Enrichment_Usage()
+        self.dynamodb = clients['dynamodb']
+        self.kanji_cache = shared_kanji_cache  # DynamoDB 앞단 한자 사전 캐시 (프로세스 공유)
+        self.db_gateway = DynamoDB_Batch_Gateway(self.dynamodb, os.getenv('DYNAMODB_TABLE_NAME'))
         self.sns_messageARN = os.getenv('SNS_ARN')
         self.sqs_queueURL = os.getenv('SQS_PDF_URL')
         self.sqs_jsonMessage = os.getenv('SQS_JSON_URL')
-        self.pdf_path = self.poll_sqs_and_process()
+        self.result_cache = result_cache or Result_Cache(self.s3)
+        self.page_index_store = page_index_store or (Page_Index_Store(self.s3) if incremental else None)
+        # 같은 한자의 동시 AI 생성을 하나로 합치고 결과를 DynamoDB/캐시에 저장
+        self.ai_coalescer = ai_coalescer or create_ai_coalescer(clients, self.db_gateway)
+        self.enricher = self.ai_coalescer.enricher  # 공유 엔진 (배치 크기/동시 요청 수)
+        if s3_location:
+            bucket, key = s3_location
+            print(f"🆕 새로운 PDF 감지: s3://{bucket}/{key}")
+            self.pdf_path = self.process_pdf_from_s3(bucket, key)
+        else:
+            self.pdf_path = self.poll_sqs_and_process()
         self.all_data = {
             'book_name': self.pdf_path,
             'details': [],
             'pages_len': '',
             'max_words': 0
         }
-        
-        # PDF 내용과 페이지 정보를 한 번에 추출 (최적화)
-        self.kanji_data, self.kanji_page_map = self.extract_kanji_data_with_pages(self.pdf_path)
-        self.find_data_kanji(self.kanji_data)  # 바로 실행
+
+        # 내용과 토크나이저 설정이 같은 PDF를 이미 처리했다면 book_name 만 바꿔서 재사용
+        content_hash = (result_cache_key(pdf_content_hash(self.pdf_bytes), Kanji_Tokenizer().settings)
+                        if self.pdf_bytes else None)
+        cached = self.result_cache.get(content_hash, self.pdf_path) if content_hash else None
+        self.metrics.count('result_cache_hits', int(cached is not None))
+        if cached is not None:
+            self.all_data = cached
+        else:
+            if self.incremental:
+                # 같은 책의 이전 업로드와 지문이 다른 페이지만 추출 (파이프라인 모드보다 우선)
+                self.run_incremental(self.pdf_bytes)
+            elif self.streaming:
+                # 추출 중에 새 한자를 바로 조회/AI 생성 단계로 흘려보냄
+                self.run_streaming_pipeline(self.pdf_bytes)
+            else:
+                # PDF 내용과 페이지 정보를 한 번에 추출 (최적화)
+                self.kanji_data, self.kanji_page_map = self.extract_kanji_data_with_pages(self.pdf_bytes)
+                self.find_data_kanji(self.kanji_data)  # 바로 실행
+
+            if content_hash:
+                self.result_cache.put(content_hash, self.all_data)
+        if self.low_memory:
+            self.pdf_bytes = None  # 직렬화 단계 전에 원본 PDF 해제
+
+        with self.metrics.stage('serialize'):
+            # 레벨별 / 페이지 구간별 샤드 + manifest (/api/kanji/shards/... 에서 제공)
+            self.shards = build_shards(self.all_data)
+            # 컬럼형 바이너리 (/api/kanji/all?format=columnar)
+            self.columnar = write_columnar(self.all_data)
+        self.emit_metrics()
     
     def process_pdf_from_s3(self, bucket, key):
-        # 저장 폴더가 없으면 생성
-        os.makedirs("s3PDF", exist_ok=True)
-        local_path = f"s3PDF/{key}"
-
-        # S3에서 PDF 다운로드
-        self.s3.download_file(bucket, key, local_path)
-        print(f"PDF 다운로드 완료: {local_path}")
+        # 디스크에 저장하지 않고 메모리 버퍼로 바로 읽음 (bucket/key/ETag 캐시 사용)
+        with self.metrics.stage('s3_download'):
+            self.pdf_bytes = self.pdf_loader.load(bucket, key)
+        self.metrics.count('pdf_bytes', len(self.pdf_bytes))
+        print(f"PDF 로드 완료: s3://{bucket}/{key} ({len(self.pdf_bytes)} bytes)")
         
-        return local_path
+        # book_name 호환을 위해 기존 로컬 경로 형식을 그대로 반환
+        return f"s3PDF/{key}"
 
     def poll_sqs_and_process(self):
         print("SQS 폴링 시작...")
@@ -169,23 +338,10 @@ class Create_Kanji_Data():
                 continue
 
             for message in messages:
-                body = json.loads(message['Body'])
-                s3_event = json.loads(body['Message'])
-                # sns를 통해 sqs로 전달된 메시지에서 s3 이벤트 정보 추출
-                print(s3_event)
-                
-                bucket = None
-                key = None
+                location = parse_s3_location(message)
                 
-                for record in s3_event.get('Records', []):
-                    # S3 이벤트에서 버킷과 객체 키 추출
-                    bucket = record.get('s3', {}).get('bucket', {}).get('name')
-                    key = record.get('s3', {}).get('object', {}).get('key')
-                    if key:
-                        key = unquote_plus(key)
-                        print(f"추출된 키: {key}")
-                
-                if bucket and key:
+                if location:
+                    bucket, key = location
                     print(f"🆕 새로운 PDF 감지: s3://{bucket}/{key}")
                     local_path = self.process_pdf_from_s3(bucket, key)
 
@@ -199,11 +355,11 @@ class Create_Kanji_Data():
                 else:
                     print("유효한 S3 이벤트가 없습니다.")
             
-    def extract_kanji_data_with_pages(self, pdf_path):
+    def extract_kanji_data_with_pages(self, pdf_source, on_new_kanji=None):
         """PDF에서 한자 데이터와 해당 한자가 있는 페이지 정보를 함께 추출"""
         try:
             print("PDF 추출 시작")
-            reader = pypdf.PdfReader(pdf_path)
+            reader = open_pdf(pdf_source)
         except Exception as e:
             print(f"PDF 파일 열기 실패: {e}")
             return [], {}
@@ -211,50 +367,24 @@ class Create_Kanji_Data():
         # 페이지 수 저장
         self.all_data['pages_len'] = len(reader.pages)
         
-        # 한자와 페이지 매핑을 위한 딕셔너리
-        kanji_page_map = defaultdict(list)
-        unique_kanji = set()
-        
-        pattern = r'[\u4E00-\u9FFF]+(?:[\u3040-\u309F]+[\u4E00-\u9FFF]*)*'
-        
-        # 한 번의 순회로 한자와 페이지 정보 수집
-        for page_num, page in enumerate(reader.pages):
-            page_text = page.extract_text()
-            if not page_text:
-                continue
-                
-            # 페이지에서 한자 추출
-            kanjis_in_page = re.findall(pattern, page_text)
-            
-            # 한자와 페이지 매핑
-            for kanji in kanjis_in_page:
-                kanji = kanji.strip()
-                if kanji:
-                    unique_kanji.add(kanji)
-                    kanji_page_map[kanji].append(page_num + 1)
+        # 한 번의 순회로 한자와 페이지 정보 수집 (extract_workers > 1 이면 프로세스 풀로 분할)
+        with self.metrics.stage('extract'):
+            kanji_list, kanji_page_map, self.kanji_counts = extract_kanji_with_pages(
+                reader, pdf_source, self.extract_workers, on_new_kanji, low_memory=self.low_memory
+            )
+        self.metrics.count('pages', len(reader.pages))
+        self.metrics.count('kanji', len(kanji_list))
         
-        kanji_list = list(unique_kanji)
         print(f'{len(kanji_list)}개의 한자 추출 완료')
         self.all_data['max_words'] = len(kanji_list)  # 최대 단어 수 저장
         
         return kanji_list, kanji_page_map
 
-    def generate_kanji_data_batch(self, kanji_list, batch_size=10):
-        """여러 한자를 동시에 처리하여 AI로 데이터 생성"""
-        if not kanji_list:
-            return []
-            
-        results = []
-        
-        # 배치 크기로 나누어 처리
-        for i in range(0, len(kanji_list), batch_size):
-            batch = kanji_list[i:i+batch_size]
-            batch_str = ", ".join(batch)
-            
-            print(f"AI 데이터 생성 시작: 배치 {i//batch_size + 1} ({len(batch)} 한자)")
-            
-            # 개선된 프롬프트: 여러 한자를 한 번에 처리
-            prompt = f"""다음 일본 한자에 대한 정보를 JSON 배열 형태로 생성해주세요: {batch_str}
+    @staticmethod
+    def build_batch_prompt(batch):
+        """여러 한자를 한 번에 처리하는 프롬프트"""
+        batch_str = ", ".join(batch)
+        return f"""다음 일본 한자에 대한 정보를 JSON 배열 형태로 생성해주세요: {batch_str}
             
             각 항목에는 한자(kanji), 읽는 법(furigana), 한국어 의미(means), JLPT 레벨(JLPT)이 포함되어야 합니다.
             JLPT 레벨은 N1, N2, N3, N4, N5 중 하나로 꼭 지정해주세요.
@@ -278,180 +408,256 @@ class Create_Kanji_Data():
             
             응답은 JSON 배열만 포함해야하며, 다른 텍스트나 설명은 포함하지 마세요.
             """
+
+    @staticmethod
+    def placeholder_items(batch):
+        """나눠서 다시 요청해도 생성하지 못한 한자는 '정보 없음'으로 채움"""
+        return [{
+            "kanji": kanji,
+            "furigana": "",
+            "means": "정보 없음",
+            "JLPT": "OTHER"  # 기본값
+        } for kanji in batch]
+
+    def generate_kanji_data_batch(self, kanji_list):
+        """여러 한자 배치를 동시에 AI로 생성 (동시 요청 수/초당 요청 수 제한)
+
+        다른 작업이 생성 중인 한자는 그 결과를 함께 쓰고, 생성 결과는 병합기가
+        DynamoDB 와 캐시에 한 번만 저장합니다 (UnprocessedItems 는 백오프 후 재시도).
+        """
+        return self.ai_coalescer.enrich(kanji_list, self.ai_usage)
+
+    def lookup_known_kanji(self, kanji_list):
+        """캐시/DynamoDB 에서 한자 조회 -> (찾은 DynamoDB 형식 항목, 못 찾은 한자 목록)"""
+        with self.metrics.stage('dynamodb_lookup'):
+            # 캐시에 있는 한자는 DynamoDB 조회 생략
+            cached_items, kanji_to_query = self.kanji_cache.get_many(kanji_list)
+            found_items = [to_dynamodb_item(item) for item in cached_items.values()]
+            self.metrics.count('kanji_cache_hits', len(cached_items))
             
+            # 100개 단위 배치를 동시에 DynamoDB 조회 (UnprocessedKeys 는 백오프 후 재시도)
             try:
-                response = self.model.generate_content(prompt)
-                content = response.text
-                # ```json 태그 제거 및 JSON 변환
-                clean_text = re.sub(r"```(?:json)?", "", content).strip()
-                batch_results = json.loads(clean_text)
+                items, unprocessed = self.db_gateway.batch_get(kanji_to_query)
+                found_kanjis = {item['kanji']['S'] for item in items}
+                
+                # 찾은 항목 저장
+                found_items.extend(items)
+                self.kanji_cache.put_many([from_dynamodb_item(item) for item in items])
+                
+                # 못 찾은 항목 식별 (재시도 후에도 미처리된 키는 기존처럼 못 찾은 것으로 처리)
+                not_found_kanjis = [kan for kan in kanji_to_query if kan not in found_kanjis]
+                self.metrics.count('dynamodb_found', len(found_kanjis))
+                
+                print(f"DynamoDB 조회: {len(found_kanjis)}개 찾음, {len(not_found_kanjis)}개 못 찾음 "
+                      f"(미처리 {len(unprocessed)}개), {self.db_gateway.stats()}")
                 
-                # 배치 결과를 전체 결과에 추가
-                results.extend(batch_results)
-                print(f"배치 {i//batch_size + 1} 생성 완료: {len(batch_results)} 항목")
             except Exception as e:
-                print(f"AI 데이터 생성 중 오류 발생: {e}")
-                # 오류 발생 시 개별 처리로 폴백
-                for kanji in batch:
-                    try:
-                        single_prompt = f"""다음 일본 한자에 대한 정보를 JSON 형태로 생성해주세요: {kanji}
-                        
-                        한자(kanji), 읽는 법(furigana), 한국어 의미(means), JLPT 레벨(JLPT)이 포함되어야 합니다.
-                        다음 형식의 JSON 객체로만 응답해주세요:
-                        
-                        {{
-                          "kanji": "한자",
-                          "furigana": "읽는법",
-                          "means": "한국어 의미",
-                          "JLPT": "N1/N2/N3/N4/N5 중 하나"
-                        }}
-                        """
-                        single_response = self.model.generate_content(single_prompt)
-                        single_content = single_response.text
-                        clean_single = re.sub(r"```(?:json)?", "", single_content).strip()
-                        single_result = json.loads(clean_single)
-                        results.append(single_result)
-                        print(f"개별 처리 완료: {kanji}")
-                    except Exception as inner_e:
-                        print(f"개별 한자 처리 중 오류: {inner_e}")
-                        # 최소한의 결과라도 제공
-                        results.append({
-                            "kanji": kanji,
-                            "furigana": "",
-                            "means": "정보 없음",
-                            "JLPT": "OTHER"  # 기본값
-                        })
+                print(f"[ERROR] DynamoDB 요청 실패: {e}")
+                self.metrics.count('dynamodb_errors')
+                # 오류 발생 시 모든 한자를 못 찾은 것으로 처리
+                not_found_kanjis = list(kanji_to_query)
         
-        return results
+        return found_items, not_found_kanjis
 
-    def store_in_dynamodb_batch(self, items):
-        """여러 항목을 DynamoDB에 일괄 저장"""
-        if not items:
-            return
-            
-        # DynamoDB batch_write_item은 최대 25개 항목으로 제한
-        batch_size = 25
+    def enrich_missing_kanji(self, not_found_kanjis):
+        """못 찾은 한자를 AI로 생성하고 DynamoDB/캐시에 저장 -> DynamoDB 형식 항목 목록"""
+        if not not_found_kanjis:
+            return []
+        print(f"{len(not_found_kanjis)}개의 한자를 AI로 생성합니다")
+        # 생성된 데이터는 병합기에서 DynamoDB와 캐시에 저장 (write-through)
+        with self.metrics.stage('ai_enrich'):
+            ai_generated_items = self.generate_kanji_data_batch(not_found_kanjis)
+        self.metrics.count('ai_requested', len(not_found_kanjis))
         
-        for i in range(0, len(items), batch_size):
-            batch = items[i:i+batch_size]
-            request_items = []
-            
-            for item in batch:
-                request_items.append({
-                    'PutRequest': {
-                        'Item': {
-                            'kanji': {'S': item['kanji']},
-                            'furigana': {'S': item['furigana']},
-                            'means': {'S': item['means']},
-                            'JLPT': {'S': item['JLPT']}
-                        }
-                    }
-                })
-            
-            try:
-                response = self.dynamodb.batch_write_item(
-                    RequestItems={
-                        os.getenv('DYNAMODB_TABLE_NAME'): request_items
-                    }
-                )
-                
-                # 실패한 항목이 있으면 재시도
-                unprocessed = response.get('UnprocessedItems', {}).get(os.getenv('DYNAMODB_TABLE_NAME'), [])
-                if unprocessed:
-                    print(f"{len(unprocessed)}개 항목 처리 실패, 재시도 필요")
-                    # 여기에 재시도 로직 추가 가능
-            except Exception as e:
-                print(f"[ERROR] DynamoDB 일괄 저장 실패: {e}")
+        # AI 생성 데이터를 DynamoDB 형식으로 변환
+        ai_db_items = []
+        for item in ai_generated_items:
+            ai_db_items.append({
+                'kanji': {'S': item['kanji']},
+                'furigana': {'S': item['furigana']},
+                'means': {'S': item['means']},
+                'JLPT': {'S': item['JLPT']}
+            })
+        return ai_db_items
+
+    def build_details(self, kanji_order, found_items, ai_items):
+        """찾은 항목과 AI 생성 항목을 한자 첫 등장 순서대로 details 로 변환
+
+        단계별 처리 순서와 상관없이 직렬/파이프라인 모드의 결과가 같습니다.
+        """
+        with self.metrics.stage('build_details'):
+            record_type = Kanji_Detail if self.low_memory else dict
+            self.all_data['details'].extend(
+                build_final_details(kanji_order, found_items + ai_items, self.kanji_page_map, record_type)
+            )
+        
+        print(f"전체 {len(self.all_data['details'])}개의 한자 데이터 처리 완료")
+        print(f"한자 캐시: {self.kanji_cache.stats()}")
+        self.kanji_cache.save_snapshot()
+
+    def emit_metrics(self):
+        """작업 지표에 이 작업의 DynamoDB 조회 재시도 / AI 호출 수를 더해 EMF 로그로 출력"""
+        enricher_stats = self.ai_usage.stats()
+        self.metrics.count('dynamodb_retries', self.db_gateway.retries)
+        self.metrics.count('llm_calls', enricher_stats['calls'])
+        self.metrics.count('llm_retries', enricher_stats['retries'])
+        self.metrics.count('llm_placeholders', enricher_stats['placeholders'])
+        self.metrics.emit(book_name=self.pdf_path)
 
     def find_data_kanji(self, kanji_data):
         print("데이터 검색 및 JSON 변환 시작")
         
-        # 중복 제거 및 공백 처리
-        kanji_data = list(set([kan.strip() for kan in kanji_data if isinstance(kan, str) and kan.strip()]))
+        # 중복 제거 및 공백 처리 (순서 유지)
+        kanji_data = list(dict.fromkeys(kan.strip() for kan in kanji_data if isinstance(kan, str) and kan.strip()))
         
-        # DynamoDB 키 형식으로 변환
-        keys = [{'kanji': {'S': kan}} for kan in kanji_data]
+        found_items, not_found_kanjis = self.lookup_known_kanji(kanji_data)
         
-        # 배치 크기 설정 (최대 100개)
-        batch_size = 100
-        all_found_items = []
-        not_found_kanjis = []
+        # 못 찾은 한자에 대해 AI 모델로 데이터 생성 (배치 처리)
+        ai_items = self.enrich_missing_kanji(not_found_kanjis)
         
-        # 배치로 DynamoDB 조회
-        for i in range(0, len(keys), batch_size):
-            batch_keys = keys[i:i+batch_size]
-            requested_kanjis = [key['kanji']['S'] for key in batch_keys]
-            
-            try:
-                response = self.dynamodb.batch_get_item(RequestItems={
-                    os.getenv('DYNAMODB_TABLE_NAME'): {
-                        'Keys': batch_keys,
-                        'ProjectionExpression': 'kanji, furigana, JLPT, means'
-                    }
-                })
-                
-                # 찾은 항목 처리
-                items = response.get('Responses', {}).get(os.getenv('DYNAMODB_TABLE_NAME'), [])
-                found_kanjis = [item['kanji']['S'] for item in items]
-                
-                # 찾은 항목 저장
-                all_found_items.extend(items)
-                
-                # 못 찾은 항목 식별
-                batch_not_found = list(set(requested_kanjis) - set(found_kanjis))
-                not_found_kanjis.extend(batch_not_found)
-                
-                print(f"배치 {i//batch_size + 1}: {len(found_kanjis)}개 찾음, {len(batch_not_found)}개 못 찾음")
-                
-            except Exception as e:
-                print(f"[ERROR] DynamoDB 요청 실패: {e}")
-                # 오류 발생 시 이 배치의 모든 한자를 못 찾은 것으로 처리
-                not_found_kanjis.extend(requested_kanjis)
+        self.build_details(kanji_data, found_items, ai_items)
+
+    def run_incremental(self, pdf_source):
+        """이전 페이지 색인과 지문이 같은 페이지는 단어 목록을 재사용하고 바뀐 페이지만 추출
+
+        이전 결과에 있던 한자는 조회/AI 생성 없이 그 항목을 쓰고, 새로 나타난 한자만
+        조회합니다. 첫 등장 순서와 첫 페이지는 페이지별 단어 목록에서 다시 계산하므로
+        결과는 전체 처리와 같습니다. 처리가 끝나면 새 색인을 저장합니다.
+        """
+        try:
+            print("증분 모드로 처리 시작")
+            reader = open_pdf(pdf_source)
+        except Exception as e:
+            print(f"PDF 파일 열기 실패: {e}")
+            return
+
+        tokenizer = Kanji_Tokenizer()
+        with self.metrics.stage('fingerprint'):
+            fingerprints = page_fingerprints(reader)
+        previous = self.page_index_store.get(self.pdf_path)
+        if previous is not None and not previous.compatible(tokenizer):
+            print("토크나이저 설정이 바뀌어 전체 페이지를 다시 추출합니다")
+            previous = None
+        words_by_fingerprint = previous.words_by_fingerprint() if previous is not None else {}
+        # 페이지 위치가 아니라 지문으로 비교 (앞쪽에 페이지가 추가/삭제되어도 나머지는 재사용)
+        changed_pages = [page_num for page_num, fingerprint in enumerate(fingerprints)
+                         if fingerprint not in words_by_fingerprint]
+
+        with self.metrics.stage('extract'):
+            page_window = LOW_MEMORY_PAGE_WINDOW if self.low_memory else None
+            for page_num, counts in iter_page_kanji(reader, pdf_source, self.extract_workers,
+                                                    tokenizer, changed_pages, page_window):
+                words_by_fingerprint[fingerprints[page_num]] = counts
+            page_words = [words_by_fingerprint[fingerprint] for fingerprint in fingerprints]
+            self.kanji_data, self.kanji_page_map, self.kanji_counts = merge_page_kanji(
+                enumerate(page_words), compact=self.low_memory
+            )
+
+        self.all_data['pages_len'] = len(fingerprints)
+        self.all_data['max_words'] = len(self.kanji_data)
+        self.metrics.count('pages', len(fingerprints))
+        self.metrics.count('pages_extracted', len(changed_pages))
+        self.metrics.count('kanji', len(self.kanji_data))
+
+        reused_items, new_kanji = reuse_items(previous.entries if previous is not None else {}, self.kanji_data)
+        self.metrics.count('kanji_reused', len(reused_items))
+        print(f"페이지 {len(fingerprints)}개 중 {len(changed_pages)}개 추출, "
+              f"한자 {len(self.kanji_data)}개 중 {len(new_kanji)}개 새로 조회")
+
+        found_items, not_found_kanjis = self.lookup_known_kanji(new_kanji) if new_kanji else ([], [])
+        ai_items = self.enrich_missing_kanji(not_found_kanjis)
+        self.build_details(self.kanji_data, reused_items + found_items, ai_items)
+
+        self.page_index_store.put(self.pdf_path, Page_Index(
+            tokenizer.settings, list(zip(fingerprints, page_words)), entries_from_details(self.all_data['details'])
+        ))
+
+    def run_streaming_pipeline(self, pdf_source):
+        """추출 -> 조회(100개 배치) -> AI 생성 단계를 겹쳐서 실행
+
+        처음 발견된 한자는 크기 제한 큐로 조회 스레드에 전달되고,
+        못 찾은 한자는 AI 배치 크기만큼 모이는 즉시 AI 생성 스레드 풀로 넘어갑니다.
+        """
+        print("파이프라인 모드로 처리 시작")
+        lookup_queue = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        found_items = []
+        ai_items = []
+        errors = []
         
-        # 못 찾은 한자에 대해 AI 모델로 데이터 생성 (배치 처리)
-        if not_found_kanjis:
-            print(f"{len(not_found_kanjis)}개의 한자를 AI로 생성합니다")
-            ai_generated_items = self.generate_kanji_data_batch(not_found_kanjis)
-            
-            # 생성된 데이터를 DynamoDB에 저장
-            self.store_in_dynamodb_batch(ai_generated_items)
-            
-            # AI 생성 데이터를 DynamoDB 형식으로 변환
-            ai_db_items = []
-            for item in ai_generated_items:
-                ai_db_items.append({
-                    'kanji': {'S': item['kanji']},
-                    'furigana': {'S': item['furigana']},
-                    'means': {'S': item['means']},
-                    'JLPT': {'S': item['JLPT']}
-                })
-            
-            # 찾은 항목과 AI 생성 항목 합치기
-            all_found_items.extend(ai_db_items)
+        lookup_thread = threading.Thread(
+            target=self._pipeline_lookup_stage, args=(lookup_queue, found_items, ai_items, errors)
+        )
+        lookup_thread.start()
+        try:
+            self.kanji_data, self.kanji_page_map = self.extract_kanji_data_with_pages(
+                pdf_source, on_new_kanji=lookup_queue.put
+            )
+        finally:
+            lookup_queue.put(None)  # 추출 종료 신호
+            lookup_thread.join()
         
-        # 모든 데이터를 JSON으로 변환
-        for idx, data in enumerate(all_found_items, 1):
-            kanji = data['kanji']['S']
-            
-            # 페이지 정보 가져오기 (미리 저장한 맵에서)
-            page = self.kanji_page_map.get(kanji, [0])[0]  # 첫 번째 발견 페이지
-            
-            json_data = {
-                'vocabulary_book_order': idx,
-                'kanji': kanji,
-                'furigana': data['furigana']['S'],
-                'means': data['means']['S'],
-                'level': data['JLPT']['S'],
-                'page': page
-            }
-            
-            self.all_data['details'].append(json_data)
+        if errors:
+            raise errors[0]
+        self.build_details(self.kanji_data, found_items, ai_items)
+
+    def _pipeline_lookup_stage(self, lookup_queue, found_items, ai_items, errors):
+        ai_batch_size = self.enricher.batch_size
+        pending_lookup = []
+        pending_enrich = []
+        enrich_futures = []
+        extraction_done = False
         
-        print(f"전체 {len(self.all_data['details'])}개의 한자 데이터 처리 완료")
+        try:
+            with ThreadPoolExecutor(max_workers=self.enricher.concurrency) as enrich_executor:
+                def flush_lookup():
+                    found, not_found = self.lookup_known_kanji(pending_lookup)
+                    found_items.extend(found)
+                    pending_enrich.extend(not_found)
+                    pending_lookup.clear()
+                    # AI 배치 크기만큼 모이면 바로 생성 시작
+                    while len(pending_enrich) >= ai_batch_size:
+                        batch = pending_enrich[:ai_batch_size]
+                        del pending_enrich[:ai_batch_size]
+                        enrich_futures.append(enrich_executor.submit(self.enrich_missing_kanji, batch))
+                
+                while True:
+                    kanji = lookup_queue.get()
+                    if kanji is None:
+                        extraction_done = True
+                        break
+                    pending_lookup.append(kanji)
+                    if len(pending_lookup) >= GET_CHUNK:
+                        flush_lookup()
+                
+                if pending_lookup:
+                    flush_lookup()
+                if pending_enrich:
+                    enrich_futures.append(enrich_executor.submit(self.enrich_missing_kanji, list(pending_enrich)))
+                
+                for future in enrich_futures:
+                    ai_items.extend(future.result())
+        except Exception as e:
+            print(f"[ERROR] 파이프라인 처리 실패: {e}")
+            errors.append(e)
+            # 추출 스레드가 큐에서 막히지 않도록 남은 항목을 비움
+            while not extraction_done and lookup_queue.get() is not None:
+                pass
         
-app_runner = App_Runner()  # Flask 앱 초기화 및 타이머 시작
-app = app_runner.app  # Flask 앱 인스턴스 가져오기
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--mode', choices=RUN_MODES, default=os.getenv('RUN_MODE', 'all'))
+    args = parser.parse_args()
+
+    if args.mode == 'worker':
+        Ingestion_Worker().run_forever()
+    elif args.mode == 'api':
+        create_app().run(host='0.0.0.0', port=5000)
+    else:
+        App_Runner().run()  # 수집 워커 + Flask 개발 서버
+
+
+# import 시에는 아무것도 실행하지 않음 (SQS 스레드/서버는 main() 에서만 시작)
 if __name__ == '__main__':
-    app_runner.run()  # Flask 서버 실행
+    main()
     
     
\ No newline at end of file
@@ -0,0 +1,145 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from Pipeline_Metrics import pipeline_metrics
+
+# =================================================================
+# DynamoDB 배치 게이트웨이 (Create_Kanji_Data / Lambda 공용)
+# - batch_get_item(100개) / batch_write_item(25개) 청크를 동시에 요청
+# - UnprocessedKeys / UnprocessedItems 와 스로틀링 오류는 지수 백오프로 재시도
+# - 소비한 읽기/쓰기 용량(ConsumedCapacity)과 재시도 횟수를 집계
+# =================================================================
+
+GET_CHUNK = 100
+WRITE_CHUNK = 25
+DEFAULT_PROJECTION = 'kanji, furigana, JLPT, means'
+THROTTLING_ERRORS = ('ProvisionedThroughputExceededException', 'ThrottlingException',
+                     'RequestLimitExceeded', 'InternalServerError')
+
+
+def is_throttling_error(error):
+    code = getattr(error, 'response', {}).get('Error', {}).get('Code', '')
+    return code in THROTTLING_ERRORS
+
+
+class DynamoDB_Batch_Gateway:
+    def __init__(self, client, table_name, max_retries=8, base_delay=0.05, max_delay=5.0, max_workers=4):
+        self.client = client
+        self.table_name = table_name
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_workers = max_workers
+        self.read_capacity = 0.0
+        self.write_capacity = 0.0
+        self.retries = 0
+        self._lock = threading.Lock()
+
+    def stats(self):
+        return {
+            'read_capacity': self.read_capacity,
+            'write_capacity': self.write_capacity,
+            'retries': self.retries
+        }
+
+    def batch_get(self, kanji_list, projection=DEFAULT_PROJECTION):
+        """(찾은 DynamoDB 항목 목록, 재시도 후에도 처리되지 않은 한자 목록) 반환
+
+        테이블에 없는 한자는 두 목록 어디에도 포함되지 않으므로,
+        호출 측에서 요청 목록과 찾은 목록을 비교해 판단합니다.
+        """
+        chunks = [kanji_list[i:i + GET_CHUNK] for i in range(0, len(kanji_list), GET_CHUNK)]
+        found_items = []
+        unprocessed = []
+        for items, failed in self._run_chunks(self._get_chunk, chunks, projection):
+            found_items.extend(items)
+            unprocessed.extend(failed)
+        return found_items, unprocessed
+
+    def batch_write(self, items):
+        """일반 dict 항목들을 저장하고, 재시도 후에도 저장하지 못한 항목 목록 반환"""
+        # 같은 배치에 중복 키가 있으면 요청 전체가 거부되므로 한자 기준으로 중복 제거
+        unique_items = list({item['kanji']: item for item in items if item.get('kanji')}.values())
+        chunks = [unique_items[i:i + WRITE_CHUNK] for i in range(0, len(unique_items), WRITE_CHUNK)]
+        failed_items = []
+        for failed in self._run_chunks(self._write_chunk, chunks):
+            failed_items.extend(failed)
+        return failed_items
+
+    def _run_chunks(self, fn, chunks, *args):
+        if not chunks:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(chunks))) as executor:
+            return list(executor.map(lambda chunk: fn(chunk, *args), chunks))
+
+    def _get_chunk(self, kanji_chunk, projection):
+        request_items = {self.table_name: {
+            'Keys': [{'kanji': {'S': kanji}} for kanji in kanji_chunk],
+            'ProjectionExpression': projection
+        }}
+        found_items = []
+        for attempt in range(self.max_retries + 1):
+            response = self._call(self.client.batch_get_item, request_items, attempt, 'dynamodb_batch_get')
+            if response is not None:
+                self._add_capacity(response, 'read')
+                found_items.extend(response.get('Responses', {}).get(self.table_name, []))
+                unprocessed = response.get('UnprocessedKeys', {})
+                if not unprocessed.get(self.table_name, {}).get('Keys'):
+                    return found_items, []
+                request_items = unprocessed
+            if attempt < self.max_retries:
+                self._backoff(attempt)
+
+        remaining = [key['kanji']['S'] for key in request_items[self.table_name]['Keys']]
+        print(f"[ERROR] DynamoDB 조회 재시도 초과: {len(remaining)}개 미처리")
+        return found_items, remaining
+
+    def _write_chunk(self, item_chunk):
+        request_items = {self.table_name: [
+            {'PutRequest': {'Item': {
+                'kanji': {'S': item['kanji']},
+                'furigana': {'S': item.get('furigana', '')},
+                'means': {'S': item.get('means', '')},
+                'JLPT': {'S': item.get('JLPT', 'OTHER')}
+            }}} for item in item_chunk
+        ]}
+        for attempt in range(self.max_retries + 1):
+            response = self._call(self.client.batch_write_item, request_items, attempt, 'dynamodb_batch_write')
+            if response is not None:
+                self._add_capacity(response, 'write')
+                unprocessed = response.get('UnprocessedItems', {})
+                if not unprocessed.get(self.table_name):
+                    return []
+                request_items = unprocessed
+            if attempt < self.max_retries:
+                self._backoff(attempt)
+
+        remaining = {request['PutRequest']['Item']['kanji']['S'] for request in request_items[self.table_name]}
+        print(f"[ERROR] DynamoDB 저장 재시도 초과: {len(remaining)}개 미처리")
+        return [item for item in item_chunk if item['kanji'] in remaining]
+
+    def _call(self, api, request_items, attempt, stage):
+        """스로틀링 오류는 None 을 반환해 재시도하고, 그 외 오류는 그대로 전달"""
+        try:
+            with pipeline_metrics.timer(stage):
+                return api(RequestItems=request_items, ReturnConsumedCapacity='TOTAL')
+        except Exception as e:
+            if not is_throttling_error(e):
+                raise
+            print(f"DynamoDB 스로틀링 ({attempt + 1}/{self.max_retries + 1}): {e}")
+            return None
+
+    def _backoff(self, attempt):
+        with self._lock:
+            self.retries += 1
+        pipeline_metrics.increment('dynamodb_retries')
+        time.sleep(random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt))))
+
+    def _add_capacity(self, response, kind):
+        units = sum(c.get('CapacityUnits', 0) for c in response.get('ConsumedCapacity', []))
+        with self._lock:
+            if kind == 'read':
+                self.read_capacity += units
+            else:
+                self.write_capacity += units
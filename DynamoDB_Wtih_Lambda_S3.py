@@ -1,9 +1,19 @@
 import os
 import json
 import boto3
-import re
-import time
+from concurrent.futures import ThreadPoolExecutor
 import google.generativeai as genai
+from AI_Enrichment import Enrichment_Usage, Kanji_Enricher
+from AI_Coalescer import Enrichment_Coalescer, create_enrichment_lease
+from Kanji_Cache import shared_kanji_cache, from_dynamodb_item, to_dynamodb_item
+from DynamoDB_Batch_Gateway import DynamoDB_Batch_Gateway
+from Kanji_Results import (LOW_MEMORY, Kanji_Detail, Kanji_Occurrences, add_entries, details_from_entries,
+                           put_result_shards)
+from Kanji_Columnar import COLUMNAR_CONTENT_TYPE, COLUMNAR_SUFFIX, write_columnar
+from Result_Cache import RESULT_CACHE_BUCKET, Kanji_List_Hasher, Result_Cache, kanji_list_hash, result_cache_key
+from Page_Index import INCREMENTAL, entries_from_details, reuse_items
+from S3_Result_Writer import read_result_body, upload_result_json
+from Pipeline_Metrics import Job_Metrics
 
 # =================================================================
 # 1. 초기화 (핸들러 함수 밖에서 실행하여 재사용)
@@ -12,27 +22,28 @@ GOOGLE_API_KEY = os.getenv('GOOGLE_API_KEY')
 DYNAMODB_TABLE_NAME = os.getenv('DYNAMODB_TABLE_NAME')
 S3_RESULTS_BUCKET = os.getenv('S3_RESULTS_BUCKET') # 최종 JSON을 저장할 S3 버킷
 SQS_NOTIFICATION_URL = os.getenv('SQS_NOTIFICATION_URL') # Spring 알림용 SQS URL
+# 저메모리 모드에서 DynamoDB 를 한 번에 조회할 한자 수 (응답 항목을 이만큼씩만 메모리에 보관)
+LOW_MEMORY_LOOKUP_KANJI = int(os.getenv('LOW_MEMORY_LOOKUP_KANJI', '2000'))
+# SQS 배치 하나에서 동시에 처리할 레코드(책) 수
+BATCH_RECORD_WORKERS = int(os.getenv('BATCH_RECORD_WORKERS', '4'))
+SQS_MAX_BATCH = 10  # send_message_batch 한 번에 보낼 수 있는 최대 메시지 수
 
 genai.configure(api_key=GOOGLE_API_KEY)
 model = genai.GenerativeModel("gemini-1.5-flash")
 dynamodb_client = boto3.client('dynamodb')
 s3_client = boto3.client('s3')
 sqs_client = boto3.client('sqs')
+# 같은 한자 목록(내용 해시)의 결과는 재사용. 별도 버킷이 없으면 결과 버킷의 result-cache/ 사용
+result_cache = Result_Cache(s3_client, RESULT_CACHE_BUCKET or S3_RESULTS_BUCKET)
 
 # =================================================================
 # Helper Functions
 # =================================================================
 
-def generate_ai_data(kanji_list, batch_size=100):
-    """Gemini AI를 사용하여 찾지 못한 한자 데이터를 생성합니다."""
-    if not kanji_list:
-        return []
-    results = []
-    for i in range(0, len(kanji_list), batch_size):
-        batch = kanji_list[i:i + batch_size]
-        batch_str = ", ".join(batch)
-        print(f"AI 데이터 생성 시작: 배치 {i // batch_size + 1} ({len(batch)} 한자)")
-        prompt = f"""다음 일본 한자에 대한 정보를 JSON 배열 형태로 생성해주세요: {batch_str}
+def build_ai_prompt(batch):
+    """찾지 못한 한자 배치에 대한 Gemini 프롬프트"""
+    batch_str = ", ".join(batch)
+    return f"""다음 일본 한자에 대한 정보를 JSON 배열 형태로 생성해주세요: {batch_str}
         각 항목에는 한자(kanji), 읽는 법(furigana), 한국어 의미(means), JLPT 레벨(JLPT)이 포함되어야 합니다.
         JLPT 레벨은 N1, N2, N3, N4, N5, OTHER 중 하나로 꼭 지정해주세요.
         반드시 다음 형식의 JSON 배열로만 응답해주세요:
@@ -42,156 +53,267 @@ def generate_ai_data(kanji_list, batch_size=100):
         ]
         응답은 JSON 배열만 포함해야하며, 다른 텍스트나 설명은 포함하지 마세요.
         """
-        try:
-            response = model.generate_content(prompt)
-            content = response.text
-            clean_text = re.sub(r"```(?:json)?", "", content).strip()
-            batch_results = json.loads(clean_text)
-            results.extend(batch_results)
-            print(f"배치 {i // batch_size + 1} 생성 완료: {len(batch_results)} 항목")
-        except Exception as e:
-            print(f"AI 데이터 생성 중 오류 발생: {e}. 해당 배치를 건너뜁니다.")
-            for kanji in batch:
-                results.append({"kanji": kanji, "furigana": "", "means": "정보 없음", "JLPT": "OTHER"})
-        
-        time.sleep(1)
-    return results
 
-def store_new_kanji_in_dynamodb(items):
-    """새로 생성된 한자 데이터를 DynamoDB에 저장합니다."""
-    if not items:
-        return
+def placeholder_items(batch):
+    """배치 생성 실패 시 해당 배치를 '정보 없음'으로 채웁니다."""
+    print("해당 배치를 건너뜁니다.")
+    return [{"kanji": kanji, "furigana": "", "means": "정보 없음", "JLPT": "OTHER"} for kanji in batch]
+
+# 고정 sleep 대신 토큰 버킷 속도 제한 + 동시 배치 요청
+ai_enricher = Kanji_Enricher(model, build_ai_prompt, placeholder_items, batch_size=100)
+# 배치 안에서 동시에 처리 중인 레코드들의 같은 한자는 한 번만 생성 (AI_LEASE=1 이면 DynamoDB 리스로
+# 다른 Lambda/컨테이너와도 중복 생성하지 않음), 생성 결과의 DynamoDB 저장과 한자 캐시 반영도 병합기에서 한 번만 수행
+ai_coalescer = Enrichment_Coalescer(
+    ai_enricher, DynamoDB_Batch_Gateway(dynamodb_client, DYNAMODB_TABLE_NAME), shared_kanji_cache,
+    create_enrichment_lease(dynamodb_client)
+)
+
+def generate_ai_data(kanji_list, usage=None):
+    """Gemini AI를 사용하여 찾지 못한 한자 데이터를 생성하고 DynamoDB에 저장합니다."""
+    return ai_coalescer.enrich(kanji_list, usage)
+
+def load_previous_entries(output_key):
+    """같은 책의 이전 처리 결과에서 재사용할 한자 항목 (INCREMENTAL 모드, 없으면 빈 dict)"""
     try:
-        dynamodb = boto3.resource('dynamodb')
-        table = dynamodb.Table(DYNAMODB_TABLE_NAME)
-        with table.batch_writer() as batch:
-            for item in items:
-                plain_item = {
-                    'kanji': item.get('kanji', ''),
-                    'furigana': item.get('furigana', ''),
-                    'means': item.get('means', ''),
-                    'JLPT': item.get('JLPT', 'OTHER')
-                }
-                batch.put_item(Item=plain_item)
-        print(f"✅ {len(items)}개의 새 항목을 DynamoDB에 저장했습니다.")
+        response = s3_client.get_object(Bucket=S3_RESULTS_BUCKET, Key=output_key)
+    except s3_client.exceptions.NoSuchKey:
+        return {}
     except Exception as e:
-        print(f"❌ DynamoDB 일괄 저장 실패: {e}")
+        print(f"[ERROR] 이전 결과 조회 실패: {e}")
+        return {}
+    return entries_from_details(json.loads(read_result_body(response)).get('details', []))
+
+def load_kanji_input(body):
+    """추출 Lambda 입력 JSON -> (입력 dict, 한자별 페이지 맵, 결과 캐시 키)
+
+    저메모리 모드는 kanji_data 항목을 파싱하는 즉시 해시에 넣고 첫 페이지/페이지 수만 남겨
+    전체 페이지 목록을 메모리에 두지 않습니다 (입력의 kanji_data 는 None 목록이 됨).
+    """
+    if not LOW_MEMORY:
+        data = json.loads(body)
+        # 데이터 중복 제거 (첫 등장 순서 유지, 한자 -> 페이지 목록)
+        kanji_page_map = {}
+        for item in data['kanji_data']:
+            kanji = item.get('kanji')
+            if kanji and kanji not in kanji_page_map:
+                kanji_page_map[kanji] = item['pages']
+        return data, kanji_page_map, result_cache_key(kanji_list_hash(data['kanji_data'], data.get('total_pages', 0)))
+
+    hasher = Kanji_List_Hasher()
+    kanji_page_map = Kanji_Occurrences()
+
+    def reduce_item(obj):
+        # object_hook 은 문서 순서대로 안쪽 객체부터 호출되므로 kanji_data 항목 순서가 유지됨
+        if 'kanji' not in obj:
+            return obj
+        hasher.update(obj)
+        kanji = obj['kanji']
+        if kanji and kanji not in kanji_page_map:
+            pages = obj.get('pages') or [0]
+            kanji_page_map.add(kanji, pages[0], len(pages))
+        return None
+
+    data = json.loads(body, object_hook=reduce_item)
+    return data, kanji_page_map, result_cache_key(hasher.hexdigest(data.get('total_pages', 0)))
 
 # =================================================================
 # Lambda Handler (메인 실행 함수)
 # =================================================================
 
-def lambda_handler(event, context):
-    for record in event['Records']:
-        book_name_for_error = "Unknown"
-        try:
-            # 1. SQS 메시지 파싱 및 S3에서 데이터 다운로드
-            message = json.loads(record['body'])
-            s3_bucket = message['s3_bucket']
-            s3_key = message['s3_key']
-            print(f"새 작업 수신. 데이터 위치: s3://{s3_bucket}/{s3_key}")
+def process_record(record):
+    """SQS 레코드(책 한 권) 하나를 처리하고 (성공 여부, Spring 알림 메시지) 반환"""
+    book_name_for_error = "Unknown"
+    # 레코드(책 한 권)마다 단계별 시간/항목 수를 EMF 로그 한 줄로 출력 (CloudWatch 지표)
+    metrics = Job_Metrics('processing_lambda')
+    # 이 레코드가 요청한 한자 몫의 AI 호출 수 (다른 레코드와 합쳐 요청한 배치는 한자 수 비율로 나눔)
+    ai_usage = Enrichment_Usage()
+    gateway = None
+    status = 'failed'
+    try:
+        # 1. SQS 메시지 파싱 및 S3에서 데이터 다운로드
+        message = json.loads(record['body'])
+        s3_bucket = message['s3_bucket']
+        s3_key = message['s3_key']
+        print(f"새 작업 수신. 데이터 위치: s3://{s3_bucket}/{s3_key}")
 
+        with metrics.stage('s3_download'):
             response = s3_client.get_object(Bucket=s3_bucket, Key=s3_key)
-            content_string = response['Body'].read().decode('utf-8')
-            data_from_s3 = json.loads(content_string)
-            
-            book_name = data_from_s3['book_name']
-            book_name_for_error = os.path.basename(book_name)
-            
-            # 2. 데이터 중복 제거
-            kanji_data_list_with_duplicates = data_from_s3['kanji_data']
-            unique_kanji_data = []
-            seen_kanji = set()
-            for item in kanji_data_list_with_duplicates:
-                kanji = item.get('kanji')
-                if kanji and kanji not in seen_kanji:
-                    unique_kanji_data.append(item)
-                    seen_kanji.add(kanji)
-            kanji_data_list = unique_kanji_data
-            
-            kanji_list_to_query = [item['kanji'] for item in kanji_data_list]
-            kanji_page_map = {item['kanji']: item['pages'] for item in kanji_data_list}
+            # 문자열로 디코딩한 사본 없이 bytes 를 바로 파싱
+            data_from_s3, kanji_page_map, content_hash = load_kanji_input(response['Body'].read())
+        
+        book_name = data_from_s3['book_name']
+        book_name_for_error = os.path.basename(book_name)
+        total_pages = data_from_s3.get('total_pages', 0)
+        del data_from_s3  # 입력 JSON 해제 (필요한 부분은 kanji_page_map 에만 남음)
+        
+        # 2. 내용 해시로 결과 캐시 확인 (적중 시 3~4단계 생략, book_name 만 변경)
+        final_json_output = result_cache.get(content_hash, book_name)
+        cache_hit = final_json_output is not None
+        metrics.count('result_cache_hits', int(cache_hit))
+        if not cache_hit:
+            kanji_list_to_query = list(kanji_page_map)
+            metrics.count('kanji', len(kanji_list_to_query))
             print(f"데이터 로드 완료: {book_name}, 중복 제거 후 {len(kanji_list_to_query)}개 한자")
 
-            # 3. DynamoDB 조회, AI 증강, DB 저장을 배치 단위로 반복
-            keys_to_process = [{'kanji': {'S': kan}} for kan in kanji_list_to_query]
-            batch_size = 100
-            all_processed_items = []
+            # 증분 모드: 같은 책의 이전 결과에 있던 한자는 그 항목을 쓰고 새 한자만 조회
+            # (순서와 첫 페이지는 이번 입력의 페이지 목록으로 다시 계산)
+            new_kanji = kanji_list_to_query
+            # 한자 -> (furigana, means, level). 재사용/캐시/DB/AI 순서로 먼저 들어온 항목 유지
+            entries = {}
+            if INCREMENTAL:
+                with metrics.stage('load_previous'):
+                    previous_entries = load_previous_entries(f"processed/{book_name_for_error}")
+                reused_items, new_kanji = reuse_items(previous_entries, kanji_list_to_query)
+                add_entries(entries, reused_items)
+                metrics.count('kanji_reused', len(reused_items))
+                print(f"이전 결과 재사용: {len(reused_items)}개, 새 한자 {len(new_kanji)}개")
+
+            # 3. DynamoDB 조회 후 못 찾은 한자를 모아 AI 증강 (배치를 동시에 요청), DB 저장
+            # warm 컨테이너의 한자 캐시에 있는 항목은 DynamoDB 조회 생략
+            cached_items, kanji_to_query = shared_kanji_cache.get_many(new_kanji)
+            add_entries(entries, (to_dynamodb_item(item) for item in cached_items.values()))
+            metrics.count('kanji_cache_hits', len(cached_items))
             print("데이터 증강 및 저장 작업 시작...")
 
-            for i in range(0, len(keys_to_process), batch_size):
-                batch_keys = keys_to_process[i:i + batch_size]
-                requested_kanjis = [key['kanji']['S'] for key in batch_keys]
-                
-                print(f"--- 배치 {i//batch_size + 1} / {(len(keys_to_process) + batch_size - 1)//batch_size} 처리 시작 ---")
-
-                db_response = dynamodb_client.batch_get_item(RequestItems={DYNAMODB_TABLE_NAME: {'Keys': batch_keys}})
-                found_items_in_batch = db_response.get('Responses', {}).get(DYNAMODB_TABLE_NAME, [])
-                all_processed_items.extend(found_items_in_batch)
-                
-                found_kanjis_set = {item['kanji']['S'] for item in found_items_in_batch}
-                not_found_kanjis_in_batch = [kan for kan in requested_kanjis if kan not in found_kanjis_set]
-                print(f"DB 조회: {len(found_items_in_batch)}개 찾음, {len(not_found_kanjis_in_batch)}개 못 찾음")
-
-                if not_found_kanjis_in_batch:
-                    ai_generated_items = generate_ai_data(not_found_kanjis_in_batch)
-                    if ai_generated_items:
-                        store_new_kanji_in_dynamodb(ai_generated_items)
-                        for item in ai_generated_items:
-                            all_processed_items.append({
-                                'kanji': {'S': item.get('kanji', '')}, 'furigana': {'S': item.get('furigana', '')},
-                                'means': {'S': item.get('means', '')}, 'JLPT': {'S': item.get('JLPT', 'OTHER')}
-                            })
-                print(f"--- 배치 {i//batch_size + 1} 처리 완료 ---")
-
-            # 4. 최종 JSON 데이터 생성
-            final_details = []
-            original_order_map = {item['kanji']: item for item in kanji_data_list}
-            sorted_processed_items = sorted(all_processed_items, key=lambda x: list(original_order_map.keys()).index(x['kanji']['S']))
-
-            for idx, data in enumerate(sorted_processed_items, 1):
-                kanji = data['kanji']['S']
-                page = kanji_page_map.get(kanji, [0])[0]
-                final_details.append({
-                    'vocabulary_book_order': idx, 'kanji': kanji, 'furigana': data['furigana']['S'],
-                    'means': data['means']['S'], 'level': data['JLPT']['S'], 'page': page
-                })
-            
+            # 100개 단위 배치를 동시에 조회, UnprocessedKeys 는 백오프 후 재시도
+            gateway = DynamoDB_Batch_Gateway(dynamodb_client, DYNAMODB_TABLE_NAME)
+            # 저메모리 모드는 LOW_MEMORY_LOOKUP_KANJI 개씩 조회해 DynamoDB 형식 응답을 바로 entries 로 변환
+            lookup_size = LOW_MEMORY_LOOKUP_KANJI if LOW_MEMORY else len(kanji_to_query)
+            found_count = 0
+            unprocessed_kanjis = []
+            for start in range(0, len(kanji_to_query), max(1, lookup_size)):
+                with metrics.stage('dynamodb_lookup'):
+                    found_items, unprocessed = gateway.batch_get(kanji_to_query[start:start + lookup_size])
+                add_entries(entries, found_items)
+                shared_kanji_cache.put_many([from_dynamodb_item(item) for item in found_items])
+                found_count += len(found_items)
+                unprocessed_kanjis.extend(unprocessed)
+                del found_items
+
+            not_found_kanjis = [kan for kan in kanji_to_query if kan not in entries]
+            metrics.count('dynamodb_found', found_count)
+            print(f"DB 조회: {found_count}개 찾음, {len(not_found_kanjis)}개 못 찾음 (미처리 {len(unprocessed_kanjis)}개)")
+
+            if not_found_kanjis:
+                with metrics.stage('ai_enrich'):
+                    ai_generated_items = generate_ai_data(not_found_kanjis, ai_usage)
+                metrics.count('ai_requested', len(not_found_kanjis))
+                add_entries(entries, (to_dynamodb_item(item) for item in ai_generated_items))
+            print("--- 데이터 증강 및 저장 완료 ---")
+            print(f"한자 캐시: {shared_kanji_cache.stats()}, DynamoDB: {gateway.stats()}, "
+                  f"AI 병합: {ai_coalescer.stats()}")
+            shared_kanji_cache.save_snapshot()
+
+            # 4. 최종 JSON 데이터 생성 (첫 등장 순서, 한 번의 순회)
+            with metrics.stage('build_details'):
+                final_details = details_from_entries(kanji_list_to_query, entries, kanji_page_map,
+                                                     Kanji_Detail if LOW_MEMORY else dict)
+            del entries
+        
             final_json_output = {
                 'book_name': book_name, 'details': final_details,
-                'pages_len': data_from_s3.get('total_pages', 0),
+                'pages_len': total_pages,
                 'max_words': len(final_details)
             }
 
-            # 5. 최종 결과를 S3에 저장
+        # 5. 최종 결과를 S3에 저장
+        with metrics.stage('s3_upload'):
             output_key = f"processed/{book_name_for_error}"
+            # compact JSON 을 조각 단위로 직렬화하며 업로드 (큰 결과는 멀티파트, RESULT_GZIP=1 이면 gzip)
+            upload = upload_result_json(s3_client, S3_RESULTS_BUCKET, output_key, final_json_output)
+            metrics.count('output_bytes', upload['stored_bytes'])
+            print(f"✅ 처리 완료. 최종 결과 저장: s3://{S3_RESULTS_BUCKET}/{output_key} "
+                  f"(JSON {upload['json_bytes']} bytes, 저장 {upload['stored_bytes']} bytes, 파트 {upload['parts']}개)")
+            if not cache_hit:
+                # 방금 올린 결과 객체를 서버 측 복사로 결과 캐시에 저장 (결과를 다시 직렬화하지 않음)
+                result_cache.put_copy(content_hash, final_json_output, S3_RESULTS_BUCKET, output_key,
+                                      upload['json_bytes'])
+            print(f"결과 캐시: {result_cache.stats()}")
+            # 같은 결과를 컬럼형 바이너리로도 저장 (GET API format=columnar)
             s3_client.put_object(
-                Bucket=S3_RESULTS_BUCKET, Key=output_key,
-                Body=json.dumps(final_json_output, ensure_ascii=False, indent=2),
-                ContentType='application/json'
+                Bucket=S3_RESULTS_BUCKET, Key=output_key + COLUMNAR_SUFFIX,
+                Body=write_columnar(final_json_output), ContentType=COLUMNAR_CONTENT_TYPE
             )
-            print(f"✅ 처리 완료. 최종 결과 저장: s3://{S3_RESULTS_BUCKET}/{output_key}")
+            # 레벨별 / 페이지 구간별 샤드와 manifest 를 결과 옆에 저장 (GET API 에서 바로 제공)
+            shard_count = put_result_shards(s3_client, S3_RESULTS_BUCKET, output_key, final_json_output)
+            print(f"샤드 {shard_count}개 + manifest 저장: s3://{S3_RESULTS_BUCKET}/{output_key}.shards/")
 
-            # 6. Spring에 작업 완료 알림 SQS 메시지 전송
-            notification_message = {
-                'status': 'complete', 'bookName': book_name_for_error,
-                'message': '한자 데이터 처리가 성공적으로 완료되었습니다.'
-            }
-            sqs_client.send_message(
-                QueueUrl=SQS_NOTIFICATION_URL, MessageBody=json.dumps(notification_message)
-            )
-            print(f"✅ Spring으로 작업 완료 알림 전송: {book_name_for_error}")
+        # 6. Spring 완료 알림은 배치의 모든 레코드가 끝난 뒤 send_message_batch 로 함께 전송
+        status = 'complete'
+        return True, {
+            'status': 'complete', 'bookName': book_name_for_error,
+            'message': '한자 데이터 처리가 성공적으로 완료되었습니다.'
+        }
 
+    except Exception as e:
+        print(f"❌ 에러 발생: {e}")
+        return False, {'status': 'FAILED_complete', 'bookName': book_name_for_error, 'error': str(e)}
+    finally:
+        # DynamoDB 재시도는 이 레코드의 gateway 기준
+        if gateway is not None:
+            metrics.count('dynamodb_retries', gateway.retries)
+        usage = ai_usage.stats()
+        for name in ('calls', 'retries', 'placeholders'):
+            metrics.count(f"llm_{name}", usage[name])
+        metrics.emit(book_name=book_name_for_error, status=status)
+
+
+def send_notifications(messages):
+    """Spring 알림 메시지들을 send_message_batch 로 10개씩 보내고, 보내지 못한 메시지의 위치 목록 반환"""
+    unsent = []
+    for start in range(0, len(messages), SQS_MAX_BATCH):
+        batch = messages[start:start + SQS_MAX_BATCH]
+        try:
+            response = sqs_client.send_message_batch(
+                QueueUrl=SQS_NOTIFICATION_URL,
+                Entries=[{'Id': str(start + idx), 'MessageBody': json.dumps(message)}
+                         for idx, message in enumerate(batch)]
+            )
+            failed = response.get('Failed', [])
+            if failed:
+                print(f"[ERROR] 알림 SQS 전송 실패 {len(failed)}건: {failed}")
+            unsent.extend(int(entry['Id']) for entry in failed)
         except Exception as e:
-            print(f"❌ 에러 발생: {e}")
-            try:
-                error_message = {'status': 'FAILED_complete', 'bookName': book_name_for_error, 'error': str(e)}
-                sqs_client.send_message(
-                    QueueUrl=SQS_NOTIFICATION_URL, MessageBody=json.dumps(error_message)
-                )
-                print(f"💀 Spring으로 작업 실패 알림 전송: {book_name_for_error}")
-            except Exception as sqs_e:
-                print(f"알림 SQS 전송 실패: {sqs_e}")
-            raise e
-            
-    return {'statusCode': 200, 'body': json.dumps('성공적으로 처리되었습니다.')}
\ No newline at end of file
+            print(f"[ERROR] 알림 SQS 일괄 전송 실패: {e}")
+            unsent.extend(range(start, start + len(batch)))
+    return unsent
+
+
+def lambda_handler(event, context):
+    """SQS 배치의 레코드(책)를 최대 BATCH_RECORD_WORKERS 개씩 동시에 처리
+
+    실패한 레코드만 batchItemFailures 로 돌려주어 SQS 가 그 메시지만 다시 전달합니다
+    (이벤트 소스 매핑에 ReportBatchItemFailures 설정 필요). 완료/실패 알림은 모든 레코드가
+    끝난 뒤 send_message_batch 로 보내고, 완료 알림을 보내지 못한 레코드도 실패로 돌려줍니다.
+    다시 전달된 레코드는 결과 캐시로 조회/AI 생성만 건너뛰고, processed/ 결과, .kjcol, 샤드를
+    다시 업로드한 뒤 알림을 다시 보냅니다 (실패한 레코드는 FAILED_complete 알림도 다시 전송).
+    """
+    records = event['Records']
+    # 배치 전체의 AI 호출 수는 엔진 누적값의 차이 (레코드별 몫은 각 레코드 지표에 기록)
+    batch_metrics = Job_Metrics('processing_lambda_batch')
+    enricher_before = ai_enricher.stats()
+
+    workers = max(1, min(BATCH_RECORD_WORKERS, len(records)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        outcomes = list(executor.map(process_record, records))
+
+    with batch_metrics.stage('notify'):
+        unsent = set(send_notifications([message for _, message in outcomes]))
+    failures = []
+    for index, (record, (succeeded, message)) in enumerate(zip(records, outcomes)):
+        if succeeded and index not in unsent:
+            print(f"✅ Spring으로 작업 완료 알림 전송: {message['bookName']}")
+            continue
+        if not succeeded and index not in unsent:
+            print(f"💀 Spring으로 작업 실패 알림 전송: {message['bookName']}")
+        failures.append({'itemIdentifier': record.get('messageId')})
+
+    enricher_after = ai_enricher.stats()
+    batch_metrics.count('records', len(records))
+    batch_metrics.count('records_failed', len(failures))
+    batch_metrics.count('notifications_unsent', len(unsent))
+    for name in ('calls', 'retries', 'placeholders'):
+        batch_metrics.count(f"llm_{name}", enricher_after[name] - enricher_before[name])
+    batch_metrics.emit(workers=workers)
+    print(f"배치 처리 완료: {len(records)}건 중 {len(failures)}건 실패 (재전달 대상)")
+    return {'batchItemFailures': failures}
@@ -0,0 +1,47 @@
+import time
+from flask import Flask, Response, g, request
+from dotenv import load_dotenv
+from Result_Store import create_result_store, register_result_routes
+from Pipeline_Metrics import PROMETHEUS_CONTENT_TYPE, pipeline_metrics
+
+# =================================================================
+# 결과 조회 HTTP API 앱 팩토리 (수집 워커와 분리된 서빙 모드)
+# - boto3 / Gemini / pypdf 를 불러오지 않아 워커 프로세스 기동이 가벼움
+# - RESULT_STORE_DIR 를 수집 워커와 같게 지정하면 여러 프로세스가 결과를 공유
+# - /metrics: 이 프로세스의 단계별 지표 (Prometheus 텍스트 형식)
+# 실행 예: RESULT_STORE_DIR=/var/kanji-results gunicorn -w 4 -b 0.0.0.0:5000 "Kanji_API_Server:create_app()"
+# =================================================================
+
+
+def create_app(result_store=None):
+    """결과 조회 라우트만 가진 Flask 앱 생성 (result_store 가 없으면 환경변수 기준으로 생성)"""
+    load_dotenv()
+    app = Flask(__name__)
+    if result_store is None:
+        result_store = create_result_store()
+    app.config['RESULT_STORE'] = result_store
+    pipeline_metrics.add_collector('result_store', result_store.stats)
+
+    register_result_routes(app, result_store)
+
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        # 라우트 패턴 기준으로 묶음 (책 이름별로 지표가 늘어나지 않도록)
+        if request.url_rule is not None and request.url_rule.rule != '/metrics':
+            pipeline_metrics.observe(request.url_rule.rule, time.perf_counter() - g.request_started, 'api')
+            pipeline_metrics.increment(f"status_{response.status_code}", service='api')
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        return Response(pipeline_metrics.render_prometheus(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+    @app.route('/')
+    def hello_world():
+        return 'hi'
+
+    return app
@@ -0,0 +1,189 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from Kanji_Snapshot import KANJI_SNAPSHOT_PATH, Kanji_Snapshot, load_snapshot
+
+# =================================================================
+# DynamoDB 앞단의 한자 사전 캐시
+# - 프로세스 내 LRU (최대 항목 수 + TTL)
+# - 선택적으로 로컬 디스크 스냅샷에 저장하여 재시작 후에도 캐시 유지
+# - AI 생성 항목은 write-through 로 바로 캐시에 반영
+# - 테이블 스냅샷(Kanji_Snapshot)이 있으면 LRU 미스를 네트워크 없이 스냅샷에서 조회
+# 캐시 항목은 {'kanji', 'furigana', 'means', 'JLPT'} 형태의 일반 dict 입니다.
+# =================================================================
+
+KANJI_CACHE_MAX_ENTRIES = int(os.getenv('KANJI_CACHE_MAX_ENTRIES', '50000'))
+KANJI_CACHE_TTL = float(os.getenv('KANJI_CACHE_TTL', str(24 * 60 * 60)))
+KANJI_CACHE_SNAPSHOT = os.getenv('KANJI_CACHE_SNAPSHOT')  # 예: /tmp/kanji_cache.json
+
+
+def from_dynamodb_item(db_item):
+    """DynamoDB 타입 형식 -> 일반 dict"""
+    return {
+        'kanji': db_item['kanji']['S'],
+        'furigana': db_item.get('furigana', {}).get('S', ''),
+        'means': db_item.get('means', {}).get('S', ''),
+        'JLPT': db_item.get('JLPT', {}).get('S', 'OTHER')
+    }
+
+
+def to_dynamodb_item(item):
+    """일반 dict -> DynamoDB 타입 형식"""
+    return {
+        'kanji': {'S': item.get('kanji', '')},
+        'furigana': {'S': item.get('furigana', '')},
+        'means': {'S': item.get('means', '')},
+        'JLPT': {'S': item.get('JLPT', 'OTHER')}
+    }
+
+
+class Kanji_Dictionary_Cache:
+    def __init__(self, max_entries=KANJI_CACHE_MAX_ENTRIES, ttl=KANJI_CACHE_TTL, snapshot_path=None,
+                 table_snapshot=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.snapshot_path = snapshot_path
+        self.table_snapshot = table_snapshot
+        self.hits = 0
+        self.snapshot_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # kanji -> (만료 시각, 항목)
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._snapshot_users = {}  # 조회 중인 스냅샷 -> 사용 중인 스레드 수
+        self._snapshot_lock = threading.Lock()
+        if snapshot_path:
+            self.load_snapshot()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_many(self, kanji_list):
+        """(찾은 항목 dict{kanji: item}, 못 찾은 한자 목록) 반환"""
+        found = {}
+        lru_missing = []
+        now = time.time()
+        with self._lock:
+            for kanji in kanji_list:
+                entry = self._entries.get(kanji)
+                if entry is not None and entry[0] > now:
+                    self._entries.move_to_end(kanji)
+                    found[kanji] = entry[1]
+                else:
+                    if entry is not None:
+                        del self._entries[kanji]  # 만료
+                    lru_missing.append(kanji)
+            self.hits += len(found)
+
+        missing = []
+        table_snapshot = self._acquire_table_snapshot()
+        try:
+            for kanji in lru_missing:
+                item = table_snapshot.get(kanji) if table_snapshot else None
+                if item is not None:
+                    found[kanji] = item
+                else:
+                    missing.append(kanji)
+        finally:
+            if table_snapshot is not None:
+                self._release_table_snapshot(table_snapshot)
+
+        with self._lock:
+            self.snapshot_hits += len(lru_missing) - len(missing)
+            self.misses += len(missing)
+        return found, missing
+
+    def _acquire_table_snapshot(self):
+        """현재 스냅샷을 사용 중으로 표시하고 반환. 파일이 refresh 로 교체되었으면 다시 연다"""
+        with self._snapshot_lock:
+            table_snapshot = self.table_snapshot
+            if table_snapshot is not None and table_snapshot.changed_on_disk():
+                try:
+                    reloaded = Kanji_Snapshot(table_snapshot.path)
+                except Exception as e:
+                    print(f"[ERROR] 한자 스냅샷 재로드 실패: {e}")
+                else:
+                    self.table_snapshot = reloaded
+                    print(f"한자 스냅샷 재로드: version {reloaded.version}")
+                    # 이전 스냅샷은 조회 중인 스레드가 없을 때 닫음 (mmap 해제)
+                    if not self._snapshot_users.get(table_snapshot):
+                        table_snapshot.close()
+                    table_snapshot = reloaded
+            if table_snapshot is not None:
+                self._snapshot_users[table_snapshot] = self._snapshot_users.get(table_snapshot, 0) + 1
+            return table_snapshot
+
+    def _release_table_snapshot(self, table_snapshot):
+        with self._snapshot_lock:
+            users = self._snapshot_users.pop(table_snapshot) - 1
+            if users:
+                self._snapshot_users[table_snapshot] = users
+            elif table_snapshot is not self.table_snapshot:
+                # 교체된 스냅샷을 마지막으로 쓰던 스레드
+                table_snapshot.close()
+
+    def put_many(self, items):
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            for item in items:
+                kanji = item.get('kanji')
+                if not kanji:
+                    continue
+                self._entries[kanji] = (expires_at, item)
+                self._entries.move_to_end(kanji)
+                self._dirty = True
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        total = self.hits + self.snapshot_hits + self.misses
+        return {
+            'hits': self.hits,
+            'snapshot_hits': self.snapshot_hits,
+            'misses': self.misses,
+            'hit_rate': round((self.hits + self.snapshot_hits) / total, 4) if total else 0.0,
+            'size': len(self._entries)
+        }
+
+    def save_snapshot(self):
+        """변경이 있을 때만 스냅샷 파일을 원자적으로 교체"""
+        if not self.snapshot_path or not self._dirty:
+            return
+        with self._lock:
+            entries = [[expires_at, item] for expires_at, item in self._entries.values()]
+            self._dirty = False
+        # 처리 Lambda 는 배치의 레코드를 동시에 처리하므로 스레드마다 다른 임시 파일에 기록
+        tmp_path = f"{self.snapshot_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'saved_at': time.time(), 'entries': entries}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.snapshot_path)
+            print(f"한자 캐시 스냅샷 저장: {len(entries)}개 -> {self.snapshot_path}")
+        except Exception as e:
+            print(f"[ERROR] 한자 캐시 스냅샷 저장 실패: {e}")
+
+    def load_snapshot(self):
+        if not os.path.exists(self.snapshot_path):
+            return
+        try:
+            with open(self.snapshot_path, encoding='utf-8') as f:
+                snapshot = json.load(f)
+        except Exception as e:
+            print(f"[ERROR] 한자 캐시 스냅샷 로드 실패: {e}")
+            return
+
+        now = time.time()
+        with self._lock:
+            for expires_at, item in snapshot.get('entries', []):
+                if expires_at > now:
+                    self._entries[item['kanji']] = (expires_at, item)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        print(f"한자 캐시 스냅샷 로드: {len(self._entries)}개")
+
+
+# 같은 프로세스(컨테이너 / warm Lambda)의 모든 작업이 공유하는 캐시
+shared_kanji_cache = Kanji_Dictionary_Cache(snapshot_path=KANJI_CACHE_SNAPSHOT,
+                                            table_snapshot=load_snapshot(KANJI_SNAPSHOT_PATH))
@@ -0,0 +1,189 @@
+import json
+import struct
+import sys
+import zlib
+from array import array
+
+# =================================================================
+# 단어장 컬럼형 바이너리 형식 (.kjcol, 외부 라이브러리 없음)
+# details 의 dict 목록을 열 단위로 저장해 키 이름 반복을 없앱니다.
+#
+# 파일 구조 (little endian)
+#   header : magic(8s) | version(H) | flags(H) | rows(I) | body_len(I)
+#   body   : (flags & COMPRESSED 이면 zlib 압축)
+#     meta      : len(I) | JSON (book_name, pages_len, max_words 등 details 외 항목)
+#     strings   : count(I) | blob_len(I) | 끝 오프셋 배열(I * count, 문자 단위) | utf-8 blob
+#                 (kanji/furigana/means 중복 제거, blob 을 한 번에 디코딩해 잘라 씀)
+#     levels    : count(I) | 문자열 번호 배열(I * count)  (level 사전)
+#     columns   : order(I) | page(I) | kanji(I) | furigana(I) | means(I) | level 코드(B, 사전 번호)
+# =================================================================
+
+MAGIC = b'KJCOL001'
+FORMAT_VERSION = 1
+COMPRESSED = 0x1
+HEADER = struct.Struct('<8sHHII')
+U32 = struct.Struct('<I')
+COLUMNAR_SUFFIX = '.kjcol'
+COLUMNAR_CONTENT_TYPE = 'application/vnd.kanji-columnar'
+# 레벨 1 도 6 과 크기 차이가 10% 정도이고 압축 시간은 1/5
+ZLIB_LEVEL = 1
+
+INT_COLUMNS = ('vocabulary_book_order', 'page', 'kanji', 'furigana', 'means')
+
+
+def _to_bytes(values, typecode):
+    data = array(typecode, values)
+    if sys.byteorder != 'little':
+        data.byteswap()
+    return data.tobytes()
+
+
+def _from_bytes(buffer, pos, count, typecode):
+    data = array(typecode)
+    end = pos + data.itemsize * count
+    data.frombytes(buffer[pos:end])
+    if sys.byteorder != 'little':
+        data.byteswap()
+    return data, end
+
+
+def write_columnar(book, compress=True):
+    """결과 dict(all_data / final_json_output 형식)를 컬럼형 bytes 로 변환"""
+    details = book.get('details', [])
+    meta = {key: value for key, value in book.items() if key != 'details'}
+
+    strings = {}  # 문자열 -> 번호 (등장 순서)
+
+    def intern(value):
+        value = '' if value is None else str(value)
+        index = strings.get(value)
+        if index is None:
+            index = strings[value] = len(strings)
+        return index
+
+    levels = {}
+    columns = {name: [] for name in INT_COLUMNS}
+    level_codes = []
+    for item in details:
+        columns['vocabulary_book_order'].append(item.get('vocabulary_book_order', 0))
+        columns['page'].append(item.get('page', 0))
+        columns['kanji'].append(intern(item.get('kanji')))
+        columns['furigana'].append(intern(item.get('furigana')))
+        columns['means'].append(intern(item.get('means')))
+        level = item.get('level') or 'OTHER'
+        code = levels.get(level)
+        if code is None:
+            code = levels[level] = len(levels)
+        level_codes.append(code)
+    if len(levels) > 0xFF:
+        raise ValueError(f"level 종류가 너무 많습니다: {len(levels)}")
+    level_ids = [intern(level) for level in levels]
+
+    ends = []
+    total = 0
+    for value in strings:
+        total += len(value)
+        ends.append(total)
+    blob = ''.join(strings).encode('utf-8')
+
+    meta_bytes = json.dumps(meta, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    parts = [U32.pack(len(meta_bytes)), meta_bytes,
+             U32.pack(len(strings)), U32.pack(len(blob)), _to_bytes(ends, 'I'), blob,
+             U32.pack(len(level_ids)), _to_bytes(level_ids, 'I')]
+    parts.extend(_to_bytes(columns[name], 'I') for name in INT_COLUMNS)
+    parts.append(_to_bytes(level_codes, 'B'))
+    body = b''.join(parts)
+
+    flags = 0
+    if compress:
+        body = zlib.compress(body, ZLIB_LEVEL)
+        flags |= COMPRESSED
+    return HEADER.pack(MAGIC, FORMAT_VERSION, flags, len(details), len(body)) + body
+
+
+class Columnar_Book:
+    """컬럼형 bytes 를 읽어 전체/일부 details 를 만들거나 부분 파일을 다시 씁니다."""
+
+    def __init__(self, data):
+        magic, version, flags, self.rows, body_len = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError("단어장 컬럼 형식이 아닙니다.")
+        body = bytes(data[HEADER.size:HEADER.size + body_len])
+        if flags & COMPRESSED:
+            body = zlib.decompress(body)
+
+        meta_len = U32.unpack_from(body, 0)[0]
+        pos = U32.size + meta_len
+        self.meta = json.loads(body[U32.size:pos].decode('utf-8'))
+
+        string_count = U32.unpack_from(body, pos)[0]
+        blob_len = U32.unpack_from(body, pos + U32.size)[0]
+        ends, pos = _from_bytes(body, pos + U32.size * 2, string_count, 'I')
+        self.strings = self._split_strings(body[pos:pos + blob_len].decode('utf-8'), ends)
+        pos += blob_len
+
+        level_count = U32.unpack_from(body, pos)[0]
+        level_ids, pos = _from_bytes(body, pos + U32.size, level_count, 'I')
+        self.levels = [self.strings[i] for i in level_ids]
+
+        self.columns = {}
+        for name in INT_COLUMNS:
+            self.columns[name], pos = _from_bytes(body, pos, self.rows, 'I')
+        self.columns['level'], pos = _from_bytes(body, pos, self.rows, 'B')
+
+    @staticmethod
+    def _split_strings(blob, ends):
+        starts = [0]
+        starts.extend(ends[:-1])
+        return [blob[start:end] for start, end in zip(starts, ends)]
+
+    def __len__(self):
+        return self.rows
+
+    def select(self, levels=None, offset=0, limit=None):
+        """level 로 거르고 offset/limit 으로 자른 행 번호 목록과 거른 뒤 전체 개수"""
+        if levels:
+            codes = {code for code, level in enumerate(self.levels) if level in levels}
+            level_column = self.columns['level']
+            indices = [i for i in range(self.rows) if level_column[i] in codes]
+        else:
+            indices = range(self.rows)
+        end = None if limit is None else offset + limit
+        return list(indices[offset:end]), len(indices)
+
+    def details(self, indices=None):
+        """행 번호 목록(없으면 전체)의 details dict 목록"""
+        indices = range(self.rows) if indices is None else indices
+        strings = self.strings
+        levels = self.levels
+        order = self.columns['vocabulary_book_order']
+        page = self.columns['page']
+        kanji = self.columns['kanji']
+        furigana = self.columns['furigana']
+        means = self.columns['means']
+        level = self.columns['level']
+        return [{
+            'vocabulary_book_order': order[i],
+            'kanji': strings[kanji[i]],
+            'furigana': strings[furigana[i]],
+            'means': strings[means[i]],
+            'level': levels[level[i]],
+            'page': page[i]
+        } for i in indices]
+
+    def to_dict(self):
+        book = dict(self.meta)
+        book['details'] = self.details()
+        return book
+
+    def subset(self, indices, extra_meta=None, compress=True):
+        """선택한 행만 담은 컬럼형 bytes (GET 의 level/offset/limit 응답용)"""
+        book = dict(self.meta)
+        book.update(extra_meta or {})
+        book['details'] = self.details(indices)
+        return write_columnar(book, compress)
+
+
+def read_columnar(data):
+    """컬럼형 bytes -> 결과 dict"""
+    return Columnar_Book(data).to_dict()
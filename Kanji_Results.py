@@ -0,0 +1,259 @@
+import json
+import os
+import re
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+
+# =================================================================
+# 최종 결과(details) 생성 (Create_Kanji_Data / Lambda 공용)
+# 저메모리 모드(LOW_MEMORY=1): 한자별 페이지 목록 대신 배열 기반 Kanji_Occurrences,
+# details 항목은 dict 대신 __slots__ 레코드(Kanji_Detail), 결과 JSON 은 조각으로 나누어 기록
+# =================================================================
+
+LOW_MEMORY = os.getenv('LOW_MEMORY', '0') == '1'
+DETAIL_FIELDS = ('vocabulary_book_order', 'kanji', 'furigana', 'means', 'level', 'page')
+# 결과 JSON 을 조각으로 쓸 때 한 조각에 담는 details 항목 수
+JSON_CHUNK_ITEMS = int(os.getenv('JSON_CHUNK_ITEMS', '500'))
+
+
+class Kanji_Detail:
+    """details 항목 하나 (dict 보다 작음). dict 처럼 [] / get() 으로 읽을 수 있음"""
+    __slots__ = DETAIL_FIELDS
+
+    def __init__(self, vocabulary_book_order, kanji, furigana, means, level, page):
+        self.vocabulary_book_order = vocabulary_book_order
+        self.kanji = kanji
+        self.furigana = furigana
+        self.means = means
+        self.level = level
+        self.page = page
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key, default=None):
+        return getattr(self, key, default) if key in DETAIL_FIELDS else default
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in DETAIL_FIELDS}
+
+    def __eq__(self, other):
+        if isinstance(other, Kanji_Detail):
+            other = other.to_dict()
+        return self.to_dict() == other if isinstance(other, dict) else NotImplemented
+
+
+class Kanji_Occurrences:
+    """한자별 첫 페이지 / 등장 페이지 수 / 전체 등장 횟수 (한자별 페이지 번호 목록 대신)
+
+    한자 -> 위치 dict 하나와 고정 크기 배열 세 개만 사용합니다.
+    반복 순서 = 첫 등장 순서이며 first_page() 로 build_final_details 에 전달됩니다.
+    """
+    __slots__ = ('positions', 'first_pages', 'page_counts', 'counts')
+
+    def __init__(self):
+        self.positions = {}  # 한자 -> 배열 위치
+        self.first_pages = array('I')
+        self.page_counts = array('I')
+        self.counts = array('Q')
+
+    def add(self, kanji, page, pages=1, count=1):
+        """처음 보는 한자면 True"""
+        position = self.positions.get(kanji)
+        if position is None:
+            self.positions[kanji] = len(self.first_pages)
+            self.first_pages.append(page)
+            self.page_counts.append(pages)
+            self.counts.append(count)
+            return True
+        self.page_counts[position] += pages
+        self.counts[position] += count
+        return False
+
+    def first_page(self, kanji):
+        position = self.positions.get(kanji)
+        return self.first_pages[position] if position is not None else 0
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __iter__(self):
+        return iter(self.positions)
+
+    def __contains__(self, kanji):
+        return kanji in self.positions
+
+
+def add_entries(entries, items):
+    """DynamoDB 형식 항목들을 entries(한자 -> (furigana, means, level))에 추가 (먼저 들어온 항목 유지)"""
+    for item in items:
+        kanji = item['kanji']['S']
+        if kanji not in entries:
+            entries[kanji] = (item['furigana']['S'], item['means']['S'], item['JLPT']['S'])
+    return entries
+
+
+def build_final_details(kanji_order, items, kanji_page_map, record_type=dict):
+    """한자 첫 등장 순서대로 details 목록을 한 번의 순회로 생성
+
+    kanji_order: 첫 등장 순서의 한자 목록
+    items: DynamoDB 형식 항목들 (조회 결과 + AI 생성 결과, 순서 무관)
+    kanji_page_map: 한자 -> 등장 페이지 목록 (또는 Kanji_Occurrences)
+    같은 한자의 항목이 여러 개면 첫 번째 항목을 사용하고,
+    kanji_order 에 없는 한자(AI가 바꿔서 돌려준 경우 등)는 마지막에 붙입니다.
+    """
+    return details_from_entries(kanji_order, add_entries({}, items), kanji_page_map, record_type)
+
+
+def details_from_entries(kanji_order, entries, kanji_page_map, record_type=dict):
+    """entries(한자 -> (furigana, means, level)) 로 details 생성 (record_type: dict 또는 Kanji_Detail)"""
+    first_page = getattr(kanji_page_map, 'first_page', None)
+    if first_page is None:
+        def first_page(kanji):
+            return kanji_page_map.get(kanji, [0])[0]  # 첫 번째 발견 페이지
+
+    final_details = []
+
+    def append(kanji, entry):
+        furigana, means, level = entry
+        final_details.append(record_type(
+            vocabulary_book_order=len(final_details) + 1, kanji=kanji, furigana=furigana,
+            means=means, level=level, page=first_page(kanji)
+        ))
+
+    ordered = set()
+    for kanji in kanji_order:
+        entry = entries.get(kanji)
+        if entry is not None and kanji not in ordered:
+            ordered.add(kanji)
+            append(kanji, entry)
+
+    for kanji, entry in entries.items():
+        if kanji not in ordered:
+            append(kanji, entry)
+
+    return final_details
+
+
+# =================================================================
+# 레벨별 / 페이지 구간별 샤드 + manifest
+# 한 레벨이나 페이지 범위만 필요한 클라이언트가 전체 JSON 을 받지 않도록
+# 결과 JSON 옆(<결과 키>.shards/)에 압축 형식(compact) JSON 으로 저장합니다.
+# =================================================================
+
+PAGE_BLOCK_SIZE = int(os.getenv('PAGE_BLOCK_SIZE', '50'))
+SHARD_SUFFIX = '.shards/'
+SHARD_NAME_PATTERN = re.compile(r'^(manifest|level/[A-Za-z0-9_-]+|pages/\d+-\d+)$')
+
+
+def json_default(value):
+    """Kanji_Detail 등 to_dict() 가 있는 객체를 JSON 으로 직렬화"""
+    to_dict = getattr(value, 'to_dict', None)
+    if to_dict is None:
+        raise TypeError(f"JSON 으로 직렬화할 수 없는 객체: {type(value).__name__}")
+    return to_dict()
+
+
+def dumps_compact(data):
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'), default=json_default)
+
+
+def iter_result_json(result, chunk_items=JSON_CHUNK_ITEMS):
+    """결과 dict 를 compact JSON 문자열 조각으로 생성 (details 는 chunk_items 개씩)
+
+    전체 문자열을 한 번에 만들지 않으므로 조각을 바로 파일/업로드로 흘려보낼 수 있고,
+    이어 붙인 결과는 dumps_compact(result) 와 같습니다.
+    """
+    yield '{'
+    for index, (key, value) in enumerate(result.items()):
+        prefix = (',' if index else '') + dumps_compact(key) + ':'
+        if key != 'details':
+            yield prefix + dumps_compact(value)
+            continue
+        yield prefix + '['
+        for start in range(0, len(value), chunk_items):
+            yield (',' if start else '') + ','.join(dumps_compact(item) for item in value[start:start + chunk_items])
+        yield ']'
+    yield '}'
+
+
+def write_result_json(result, fileobj, chunk_items=JSON_CHUNK_ITEMS):
+    """결과를 fileobj(바이너리)에 조각 단위로 기록하고 기록한 바이트 수 반환"""
+    written = 0
+    for chunk in iter_result_json(result, chunk_items):
+        data = chunk.encode('utf-8')
+        fileobj.write(data)
+        written += len(data)
+    return written
+
+
+def shard_key(object_key, shard_name):
+    """processed/책.pdf + level/N1 -> processed/책.pdf.shards/level/N1.json"""
+    return f"{object_key}{SHARD_SUFFIX}{shard_name}.json"
+
+
+def level_shard_name(level):
+    return 'level/' + (re.sub(r'[^A-Za-z0-9_-]', '_', level or '') or 'OTHER')
+
+
+def build_shards(result, page_block_size=PAGE_BLOCK_SIZE):
+    """{샤드 이름: 샤드 dict} 반환 ('manifest' 포함)
+
+    details 는 대부분 첫 페이지 순서지만, 페이지 정보가 없는 항목(예: AI 가 다른 한자로
+    돌려준 항목, page 0)은 끝에 붙으므로 페이지 구간 샤드가 연속 구간이라고 가정하지 않습니다.
+    manifest 에는 구간마다 전체 details 에서의 연속 구간 목록 runs([offset, count], ...)를 기록합니다.
+    """
+    details = result.get('details', [])
+    book_name = result.get('book_name')
+    levels = {}
+    blocks = {}  # 구간 -> (항목 목록, [[offset, count], ...])
+    for offset, item in enumerate(details):
+        levels.setdefault(level_shard_name(item.get('level')), []).append(item)
+        block = (max(item.get('page') or 1, 1) - 1) // page_block_size
+        items, runs = blocks.setdefault(block, ([], []))
+        items.append(item)
+        if runs and runs[-1][0] + runs[-1][1] == offset:
+            runs[-1][1] += 1
+        else:
+            runs.append([offset, 1])
+
+    shards = {}
+    manifest = {
+        'book_name': book_name,
+        'pages_len': result.get('pages_len'),
+        'max_words': result.get('max_words'),
+        'page_block_size': page_block_size,
+        'levels': {},
+        'page_blocks': []
+    }
+    for name, items in levels.items():
+        shards[name] = {'book_name': book_name, 'shard': name, 'details': items}
+        manifest['levels'][name.split('/', 1)[1]] = {'shard': name, 'count': len(items)}
+    for block, (items, runs) in sorted(blocks.items()):
+        start = block * page_block_size + 1
+        name = f"pages/{start}-{start + page_block_size - 1}"
+        shards[name] = {'book_name': book_name, 'shard': name, 'details': items}
+        manifest['page_blocks'].append({'shard': name, 'first_page': start,
+                                        'last_page': start + page_block_size - 1,
+                                        'count': len(items), 'runs': runs})
+    shards['manifest'] = manifest
+    return shards
+
+
+def put_result_shards(s3_client, bucket, object_key, result, max_workers=8):
+    """샤드와 manifest 를 S3 에 동시에 저장하고 샤드 수 반환 (manifest 는 마지막에 저장)"""
+    shards = build_shards(result)
+    manifest = shards.pop('manifest')
+
+    def put(name, data):
+        s3_client.put_object(Bucket=bucket, Key=shard_key(object_key, name),
+                             Body=dumps_compact(data).encode('utf-8'), ContentType='application/json')
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for future in [executor.submit(put, name, data) for name, data in shards.items()]:
+            future.result()
+    put('manifest', manifest)
+    return len(shards)
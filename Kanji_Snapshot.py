@@ -0,0 +1,184 @@
+import argparse
+import json
+import mmap
+import os
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+
+# =================================================================
+# 한자 테이블 스냅샷 (DynamoDB 전체 Scan -> 로컬 파일 -> mmap 조회)
+#
+# 파일 구조 (little endian)
+#   header : magic(8s) | version(Q) | count(I) | reserved(I)
+#   index  : count 개의 레코드 오프셋(I), 데이터 영역 시작 기준
+#   data   : key_len(H) | key(utf-8) | value_len(H) | value(JSON [furigana, means, JLPT])
+# 레코드는 key 바이트 순으로 정렬되어 있어 이진 탐색으로 조회합니다.
+#
+# 갱신: python Kanji_Snapshot.py refresh --path kanji_snapshot.bin
+# =================================================================
+
+KANJI_SNAPSHOT_PATH = os.getenv('KANJI_SNAPSHOT_PATH')
+SCAN_SEGMENTS = int(os.getenv('KANJI_SNAPSHOT_SEGMENTS', '8'))
+
+MAGIC = b'KJSNAP01'
+HEADER = struct.Struct('<8sQII')
+OFFSET = struct.Struct('<I')
+LENGTH = struct.Struct('<H')
+
+
+def scan_table(dynamodb_client, table_name, segments=SCAN_SEGMENTS):
+    """병렬 Scan 으로 테이블 전체 항목을 일반 dict 목록으로 반환"""
+    def scan_segment(segment):
+        items = []
+        kwargs = {
+            'TableName': table_name,
+            'Segment': segment,
+            'TotalSegments': segments,
+            'ProjectionExpression': 'kanji, furigana, JLPT, means'
+        }
+        while True:
+            response = dynamodb_client.scan(**kwargs)
+            for db_item in response.get('Items', []):
+                items.append({
+                    'kanji': db_item['kanji']['S'],
+                    'furigana': db_item.get('furigana', {}).get('S', ''),
+                    'means': db_item.get('means', {}).get('S', ''),
+                    'JLPT': db_item.get('JLPT', {}).get('S', 'OTHER')
+                })
+            if 'LastEvaluatedKey' not in response:
+                return items
+            kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    with ThreadPoolExecutor(max_workers=segments) as executor:
+        results = executor.map(scan_segment, range(segments))
+        return [item for segment_items in results for item in segment_items]
+
+
+def write_snapshot(items, path, version=None):
+    """항목 목록을 스냅샷 파일로 원자적으로 저장하고 version 반환"""
+    version = version or int(time.time())
+    records = {}
+    for item in items:
+        key = item['kanji'].encode('utf-8')
+        value = json.dumps([item.get('furigana', ''), item.get('means', ''), item.get('JLPT', 'OTHER')],
+                           ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        if len(key) <= 0xFFFF and len(value) <= 0xFFFF:
+            records[key] = value
+
+    keys = sorted(records)
+    offsets = []
+    data = bytearray()
+    for key in keys:
+        offsets.append(len(data))
+        value = records[key]
+        data += LENGTH.pack(len(key)) + key + LENGTH.pack(len(value)) + value
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, version, len(keys), 0))
+        f.write(b''.join(OFFSET.pack(offset) for offset in offsets))
+        f.write(data)
+    os.replace(tmp_path, path)
+    return version
+
+
+def file_identity(stat):
+    return stat.st_ino, stat.st_mtime_ns
+
+
+class Kanji_Snapshot:
+    """mmap 으로 연 스냅샷 파일에서 네트워크 없이 한자 조회"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            # 매핑한 파일 자체의 (inode, mtime). 경로로 따로 stat 하면 그 사이에 교체된 파일을 기록할 수 있음
+            self.identity = file_identity(os.fstat(f.fileno()))
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.version, self.count, _ = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"한자 스냅샷 형식이 아닙니다: {path}")
+        self._index_start = HEADER.size
+        self._data_start = HEADER.size + OFFSET.size * self.count
+
+    def __len__(self):
+        return self.count
+
+    def _key_at(self, idx):
+        pos = self._data_start + OFFSET.unpack_from(self._mm, self._index_start + OFFSET.size * idx)[0]
+        key_len = LENGTH.unpack_from(self._mm, pos)[0]
+        return pos + LENGTH.size, key_len
+
+    def get(self, kanji):
+        """한자 항목 dict 또는 None"""
+        target = kanji.encode('utf-8')
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            key_pos, key_len = self._key_at(mid)
+            key = self._mm[key_pos:key_pos + key_len]
+            if key < target:
+                lo = mid + 1
+            elif key > target:
+                hi = mid
+            else:
+                value_pos = key_pos + key_len
+                value_len = LENGTH.unpack_from(self._mm, value_pos)[0]
+                value_pos += LENGTH.size
+                furigana, means, jlpt = json.loads(self._mm[value_pos:value_pos + value_len])
+                return {'kanji': kanji, 'furigana': furigana, 'means': means, 'JLPT': jlpt}
+        return None
+
+    def changed_on_disk(self):
+        try:
+            return file_identity(os.stat(self.path)) != self.identity
+        except OSError:
+            return False
+
+    def close(self):
+        self._mm.close()
+
+
+def load_snapshot(path=KANJI_SNAPSHOT_PATH):
+    """스냅샷 파일이 있으면 열고, 없거나 손상되었으면 None"""
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        snapshot = Kanji_Snapshot(path)
+        print(f"한자 스냅샷 로드: {snapshot.count}개 (version {snapshot.version})")
+        return snapshot
+    except Exception as e:
+        print(f"[ERROR] 한자 스냅샷 로드 실패: {e}")
+        return None
+
+
+def refresh_snapshot(path, table_name, dynamodb_client=None, segments=SCAN_SEGMENTS):
+    """DynamoDB 테이블을 다시 Scan 하여 스냅샷 교체"""
+    dynamodb_client = dynamodb_client or boto3.client('dynamodb', region_name=os.getenv('AWS_REGION'))
+    start = time.time()
+    items = scan_table(dynamodb_client, table_name, segments)
+    version = write_snapshot(items, path)
+    print(f"✅ 한자 스냅샷 갱신: {len(items)}개, version {version}, {time.time() - start:.1f}초 -> {path}")
+    return version
+
+
+def main():
+    parser = argparse.ArgumentParser(description='한자 테이블 스냅샷 관리')
+    parser.add_argument('command', choices=['refresh', 'info'])
+    parser.add_argument('--path', default=KANJI_SNAPSHOT_PATH or 'kanji_snapshot.bin')
+    parser.add_argument('--table', default=os.getenv('DYNAMODB_TABLE_NAME'))
+    parser.add_argument('--segments', type=int, default=SCAN_SEGMENTS)
+    args = parser.parse_args()
+
+    if args.command == 'refresh':
+        refresh_snapshot(args.path, args.table, segments=args.segments)
+    else:
+        snapshot = Kanji_Snapshot(args.path)
+        print(f"{args.path}: version {snapshot.version}, {snapshot.count}개")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+import os
+import re
+import unicodedata
+from collections import Counter
+
+# =================================================================
+# 일본어 텍스트 토크나이저 (PDF 한자 추출용)
+# - 패턴은 모듈 로드 시 한 번만 컴파일
+# - NFKC 정규화(TOKENIZER_NORMALIZE=1, 기본 꺼짐): 전각/반각, CJK 호환 한자(U+F900~),
+#   강희자전 부수(U+2F00~) 등을 표준 문자로 통일 (PDF에서 부수 코드로 추출되는 한자 보정)
+#   호환 한자/부수가 표준 한자와 합쳐져 추출 결과가 바뀌므로 명시적으로 켤 때만 사용
+# - 페이지 단위로 Counter 를 만들어 등장 횟수를 한 번에 집계
+#
+# 모드
+#   kanji    : 한자 + 오쿠리가나 (기존 추출 패턴과 동일)
+#   katakana : kanji + 2글자 이상의 가타카나 단어
+#   compound : 한자 반복 기호(々)와 개수사(ヶ/ケ)를 포함한 복합어 + 가타카나 단어
+# =================================================================
+
+TOKENIZER_MODE = os.getenv('TOKENIZER_MODE', 'kanji')
+TOKENIZER_NORMALIZE = os.getenv('TOKENIZER_NORMALIZE', '0') == '1'
+
+KANJI = '一-鿿'
+HIRAGANA = '぀-ゟ'
+KATAKANA_WORD = '[ァ-ヺー]{2,}'
+COMPOUND_KANJI = '㐀-䶿一-鿿々ヶケ'
+
+PATTERNS = {
+    'kanji': re.compile(f'[{KANJI}]+(?:[{HIRAGANA}]+[{KANJI}]*)*'),
+    'katakana': re.compile(f'[{KANJI}]+(?:[{HIRAGANA}]+[{KANJI}]*)*|{KATAKANA_WORD}'),
+    'compound': re.compile(f'[{COMPOUND_KANJI}]+(?:[{HIRAGANA}]+[{COMPOUND_KANJI}]*)*|{KATAKANA_WORD}'),
+}
+
+
+class Kanji_Tokenizer:
+    def __init__(self, mode=TOKENIZER_MODE, normalize=TOKENIZER_NORMALIZE):
+        if mode not in PATTERNS:
+            raise ValueError(f"지원하지 않는 토크나이저 모드: {mode}")
+        self.mode = mode
+        self.normalize = normalize
+        self._findall = PATTERNS[mode].findall
+
+    @property
+    def settings(self):
+        """추출 결과를 바꾸는 설정 (페이지 색인 / 결과 캐시 키에 사용)"""
+        return [self.mode, self.normalize]
+
+    def normalize_text(self, text):
+        return unicodedata.normalize('NFKC', text) if self.normalize else text
+
+    def tokenize(self, text):
+        """등장 순서대로 단어 목록 반환"""
+        if not text:
+            return []
+        return self._findall(self.normalize_text(text))
+
+    def count_page(self, text):
+        """페이지 텍스트의 단어별 등장 횟수 (첫 등장 순서 유지)"""
+        return Counter(self.tokenize(text))
@@ -0,0 +1,144 @@
+import gc
+import io
+import os
+import pypdf
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from Kanji_Tokenizer import Kanji_Tokenizer, TOKENIZER_MODE, TOKENIZER_NORMALIZE
+from Kanji_Results import Kanji_Occurrences
+
+# =================================================================
+# PDF 페이지 한자 추출 (직렬 / 멀티 프로세스)
+# 워커 프로세스가 import 하므로 이 모듈은 부작용 없이 유지해야 합니다.
+# =================================================================
+
+# 워커 수 기본값 (1이면 직렬 처리)
+EXTRACT_WORKERS = int(os.getenv('EXTRACT_WORKERS', '1'))
+# 워커 하나가 이 페이지 수보다 적게 받으면 병렬화 이득이 없음
+MIN_PAGES_PER_WORKER = 8
+# 저메모리 모드에서 PdfReader 의 객체 캐시를 비우는 페이지 간격
+# (pypdf 는 읽은 간접 객체(글꼴, 내용 스트림)를 PdfReader 가 살아 있는 동안 resolved_objects 에
+#  보관하고, 페이지와 서로 참조해서 순환 GC 가 돌기 전에는 해제되지 않음.
+#  3000자 글꼴 기준 페이지당 약 250KB. PdfReader 를 다시 여는 것보다 싸고(xref 재파싱 없음)
+#  10페이지마다 비워도 추출 시간은 5% 정도만 늘어남)
+LOW_MEMORY_PAGE_WINDOW = int(os.getenv('LOW_MEMORY_PAGE_WINDOW', '10'))
+
+# 워커 프로세스마다 한 번만 여는 PdfReader / 토크나이저
+_worker_reader = None
+_worker_tokenizer = None
+_worker_page_window = None
+
+
+def open_pdf(pdf_source):
+    """경로, 파일 객체 또는 bytes 로 PdfReader 생성"""
+    if isinstance(pdf_source, (bytes, bytearray)):
+        pdf_source = io.BytesIO(pdf_source)
+    return pypdf.PdfReader(pdf_source)
+
+
+def kanji_in_page(page, tokenizer):
+    """한 페이지의 단어별 등장 횟수 Counter (첫 등장 순서 유지)"""
+    return tokenizer.count_page(page.extract_text())
+
+
+def _init_worker(pdf_source, mode, normalize, page_window=None):
+    """워커 초기화: 각 워커가 PDF를 직접 엽니다."""
+    global _worker_reader, _worker_tokenizer, _worker_page_window
+    _worker_reader = open_pdf(pdf_source)
+    _worker_page_window = page_window
+    _worker_tokenizer = Kanji_Tokenizer(mode, normalize)
+
+
+def _extract_pages(page_numbers):
+    """워커에서 page_numbers 페이지를 처리하여 (페이지 번호, 단어 Counter) 목록 반환"""
+    return [(page_num, kanji_in_page(page, _worker_tokenizer))
+            for page_num, page in iter_pages(_worker_reader, page_numbers, _worker_page_window)]
+
+
+def split_page_range(pages_len, workers):
+    """페이지 범위를 워커 수의 4배 정도 청크로 분할 (부하 분산)"""
+    chunk_count = max(1, workers * 4)
+    chunk_size = max(MIN_PAGES_PER_WORKER, -(-pages_len // chunk_count))
+    return [(start, min(start + chunk_size, pages_len))
+            for start in range(0, pages_len, chunk_size)]
+
+
+def iter_pages(reader, page_numbers, page_window=None):
+    """(페이지 번호, 페이지)를 생성. page_window 페이지마다 PdfReader 의 객체 캐시를 비우고
+    이미 읽은 페이지의 순환 참조를 바로 수거 (메모리가 책 길이가 아니라 창 크기에 비례)"""
+    for position, page_num in enumerate(page_numbers):
+        if page_window and position and position % page_window == 0:
+            reader.resolved_objects.clear()
+            gc.collect(1)  # 창 안에서 만든 객체만 검사 (전체 GC 는 힙이 큰 프로세스에서 느림)
+        yield page_num, reader.pages[page_num]
+
+
+def iter_page_kanji(reader, pdf_source, workers=None, tokenizer=None, page_numbers=None, page_window=None):
+    """페이지 순서대로 (페이지 번호, 단어 Counter)를 생성
+
+    workers가 2 이상이고 페이지가 충분하면 프로세스 풀로 나누어 처리하고,
+    결과는 항상 페이지 순서로 병합합니다.
+    page_numbers 를 넘기면 그 페이지들만 추출합니다 (증분 처리에서 바뀐 페이지).
+    page_window 를 넘기면 그 페이지 수마다 PdfReader 의 객체 캐시를 비웁니다 (저메모리 모드).
+    """
+    workers = EXTRACT_WORKERS if workers is None else workers
+    tokenizer = tokenizer or Kanji_Tokenizer(TOKENIZER_MODE, TOKENIZER_NORMALIZE)
+    if page_numbers is None:
+        page_numbers = range(len(reader.pages))
+    pages_len = len(page_numbers)
+
+    if workers <= 1 or pages_len < workers * MIN_PAGES_PER_WORKER:
+        for page_num, page in iter_pages(reader, page_numbers, page_window):
+            yield page_num, kanji_in_page(page, tokenizer)
+        return
+
+    ranges = split_page_range(pages_len, workers)
+    print(f"병렬 PDF 추출: {workers}개 워커, {len(ranges)}개 청크")
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(pdf_source, tokenizer.mode, tokenizer.normalize, page_window)) as executor:
+        futures = [executor.submit(_extract_pages, list(page_numbers[start:end])) for start, end in ranges]
+        # 제출 순서 = 페이지 순서이므로 순서대로 결과를 기다리면 병합 순서가 보장됨
+        for future in futures:
+            for page_num, counts in future.result():
+                yield page_num, counts
+
+
+def extract_kanji_with_pages(reader, pdf_source, workers=None, on_new_kanji=None, tokenizer=None,
+                             low_memory=False):
+    """PDF 전체에서 (한자 목록(첫 등장 순서), 한자별 페이지 맵, 한자별 등장 횟수)를 추출
+
+    페이지 맵에는 등장 횟수와 상관없이 페이지당 한 번만 기록합니다.
+    on_new_kanji 를 넘기면 처음 발견된 한자마다 즉시 호출합니다 (파이프라인 모드).
+    low_memory 면 PdfReader 의 객체 캐시를 LOW_MEMORY_PAGE_WINDOW 페이지마다 비우고
+    페이지 맵/등장 횟수 대신 Kanji_Occurrences 를 돌려줍니다.
+    """
+    page_window = LOW_MEMORY_PAGE_WINDOW if low_memory else None
+    page_counts = iter_page_kanji(reader, pdf_source, workers, tokenizer, page_window=page_window)
+    return merge_page_kanji(page_counts, on_new_kanji, compact=low_memory)
+
+
+def merge_page_kanji(page_counts, on_new_kanji=None, compact=False):
+    """페이지 순서의 (페이지 번호, 단어 Counter) 들을 (한자 목록, 페이지 맵, 등장 횟수)로 병합
+
+    compact 면 페이지 맵과 등장 횟수 자리에 같은 Kanji_Occurrences 를 돌려줍니다.
+    """
+    if compact:
+        occurrences = Kanji_Occurrences()
+        for page_num, counts in page_counts:
+            for kanji, count in counts.items():
+                if occurrences.add(kanji, page_num + 1, 1, count) and on_new_kanji is not None:
+                    on_new_kanji(kanji)
+        return list(occurrences), occurrences, occurrences
+
+    # defaultdict 는 삽입 순서를 유지하므로 키 순서 = 첫 등장 순서
+    kanji_page_map = defaultdict(list)
+    kanji_counts = Counter()
+
+    for page_num, counts in page_counts:
+        for kanji in counts:
+            if on_new_kanji is not None and kanji not in kanji_page_map:
+                on_new_kanji(kanji)
+            kanji_page_map[kanji].append(page_num + 1)
+        kanji_counts.update(counts)
+
+    return list(kanji_page_map), kanji_page_map, kanji_counts
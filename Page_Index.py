@@ -0,0 +1,257 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+from urllib.parse import quote
+from pypdf.generic import IndirectObject
+from Result_Cache import RESULT_CACHE_BUCKET
+
+# =================================================================
+# 증분 처리용 페이지 색인 (Create_Kanji_Data 의 INCREMENTAL 모드)
+# - 페이지 지문: 내용 스트림 + 글꼴(ToUnicode)/Form XObject 데이터의 해시
+#   텍스트 추출(extract_text)보다 훨씬 싸고, 추출 결과를 바꾸는 입력만 포함
+# - 색인: 페이지 순서의 (지문, 단어별 등장 횟수) + 이전 결과의 한자 항목
+#   같은 책을 다시 올리면 지문이 같은 페이지는 이전 단어 목록을 재사용하고
+#   바뀐 페이지만 추출, 이전 결과에 없던 한자만 조회/AI 생성
+# - 글꼴을 다시 서브셋해서 ToUnicode 가 바뀐 PDF 는 모든 페이지가 바뀐 것으로 처리 (전체 추출)
+# - 저장소: S3 버킷(prefix/책 이름.json.gz) 또는 PAGE_INDEX_DIR 로컬 디렉터리
+#   (Result_Cache 와 같은 구성: 지정한 경우에만 사용, 전체 크기 제한, 오래된 파일부터 삭제)
+# =================================================================
+
+INCREMENTAL = os.getenv('INCREMENTAL', '0') == '1'
+PAGE_INDEX_BUCKET = os.getenv('PAGE_INDEX_BUCKET') or RESULT_CACHE_BUCKET
+PAGE_INDEX_PREFIX = os.getenv('PAGE_INDEX_PREFIX', 'page-index/')
+PAGE_INDEX_DIR = os.getenv('PAGE_INDEX_DIR')
+PAGE_INDEX_DIR_MAX_BYTES = int(os.getenv('PAGE_INDEX_DIR_MAX_BYTES', str(256 * 1024 * 1024)))
+PAGE_INDEX_VERSION = 1
+# AI 생성 실패로 채운 항목은 재사용하지 않고 다시 조회/생성
+PLACEHOLDER_MEANS = '정보 없음'
+
+
+def _stream_data(obj):
+    """스트림 또는 스트림 배열의 디코딩된 바이트"""
+    obj = obj.get_object() if obj is not None else None
+    if obj is None:
+        return b''
+    if isinstance(obj, list):
+        return b'\n'.join(_stream_data(part) for part in obj)
+    return obj.get_data() if hasattr(obj, 'get_data') else b''
+
+
+def _object_digest(ref, cache, build):
+    """간접 객체는 번호별로 한 번만 해시 (여러 페이지가 같은 글꼴/XObject 를 공유)"""
+    key = ref.idnum if isinstance(ref, IndirectObject) else None
+    if key is not None and key in cache:
+        return cache[key]
+    digest = build(ref.get_object())
+    if key is not None:
+        cache[key] = digest
+    return digest
+
+
+def _encoding_data(encoding):
+    """/Encoding 의 내용: CMap 스트림(Type0)은 디코딩된 데이터, 사전은 /BaseEncoding + /Differences, 이름은 그대로"""
+    encoding = encoding.get_object() if encoding is not None else None
+    if hasattr(encoding, 'get_data'):
+        return encoding.get_data()
+    if hasattr(encoding, 'get'):
+        differences = encoding.get('/Differences')
+        differences = differences.get_object() if differences is not None else None
+        return f"{encoding.get('/BaseEncoding')}|{differences}".encode('utf-8')
+    return str(encoding).encode('utf-8')
+
+
+def _font_digest(font):
+    digest = hashlib.blake2b(digest_size=16)
+    for name in ('/Subtype', '/BaseFont'):
+        digest.update(str(font.get(name)).encode('utf-8'))
+    digest.update(_encoding_data(font.get('/Encoding')))
+    digest.update(_stream_data(font.get('/ToUnicode')))
+    return digest.digest()
+
+
+def _resources_digest(resources, cache):
+    digest = hashlib.blake2b(digest_size=16)
+    resources = resources.get_object() if resources is not None else None
+    if not resources:
+        return digest.digest()
+
+    fonts = resources.get('/Font')
+    fonts = fonts.get_object() if fonts is not None else {}
+    for name in sorted(fonts):
+        digest.update(name.encode('utf-8'))
+        digest.update(_object_digest(fonts[name], cache, _font_digest))
+
+    def form_digest(xobject):
+        # 텍스트를 담을 수 있는 Form XObject 만 (이미지는 추출 결과와 무관)
+        if xobject.get('/Subtype') != '/Form':
+            return b''
+        form = hashlib.blake2b(xobject.get_data(), digest_size=16)
+        form.update(_resources_digest(xobject.get('/Resources'), cache))
+        return form.digest()
+
+    xobjects = resources.get('/XObject')
+    xobjects = xobjects.get_object() if xobjects is not None else {}
+    for name in sorted(xobjects):
+        digest.update(name.encode('utf-8'))
+        digest.update(_object_digest(xobjects[name], cache, form_digest))
+    return digest.digest()
+
+
+def page_fingerprint(page, cache=None):
+    """페이지 텍스트 추출 결과를 결정하는 입력의 해시 (hex)"""
+    cache = {} if cache is None else cache
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(page.get('/Rotate', 0)).encode('utf-8'))
+    digest.update(_stream_data(page.get('/Contents')))
+    digest.update(_resources_digest(page.get('/Resources'), cache))
+    return digest.hexdigest()
+
+
+def page_fingerprints(reader):
+    """모든 페이지의 지문 (공유 글꼴/XObject 는 한 번만 해시)"""
+    cache = {}
+    return [page_fingerprint(page, cache) for page in reader.pages]
+
+
+def entries_from_details(details):
+    """details -> {한자: [furigana, means, level]} ('정보 없음' 항목 제외)"""
+    return {entry['kanji']: [entry['furigana'], entry['means'], entry['level']]
+            for entry in details if entry['means'] != PLACEHOLDER_MEANS}
+
+
+def reuse_items(entries, kanji_list):
+    """이전 결과 항목으로 (재사용한 DynamoDB 형식 항목, 새로 조회할 한자 목록)"""
+    items = []
+    new_kanji = []
+    for kanji in kanji_list:
+        entry = entries.get(kanji)
+        if entry is None:
+            new_kanji.append(kanji)
+            continue
+        furigana, means, level = entry
+        items.append({'kanji': {'S': kanji}, 'furigana': {'S': furigana},
+                      'means': {'S': means}, 'JLPT': {'S': level}})
+    return items, new_kanji
+
+
+class Page_Index:
+    """책 한 권의 페이지별 (지문, 단어별 등장 횟수)와 결과 한자 항목"""
+    __slots__ = ('tokenizer', 'pages', 'entries')
+
+    def __init__(self, tokenizer, pages, entries):
+        self.tokenizer = list(tokenizer)  # [모드, 정규화 여부] (바뀌면 이전 단어 목록을 쓰지 않음)
+        self.pages = pages  # [(지문, {단어: 횟수}), ...] 페이지 순서
+        self.entries = entries  # 한자 -> [furigana, means, level]
+
+    def compatible(self, tokenizer):
+        return self.tokenizer == tokenizer.settings
+
+    def words_by_fingerprint(self):
+        return {fingerprint: words for fingerprint, words in self.pages}
+
+    def to_bytes(self):
+        body = json.dumps({
+            'version': PAGE_INDEX_VERSION,
+            'tokenizer': self.tokenizer,
+            'pages': self.pages,
+            'entries': self.entries
+        }, ensure_ascii=False, separators=(',', ':'))
+        return gzip.compress(body.encode('utf-8'), compresslevel=6)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """형식 버전이 다르면 None (전체 처리)"""
+        index = json.loads(gzip.decompress(data))
+        if index.get('version') != PAGE_INDEX_VERSION:
+            return None
+        return cls(index['tokenizer'], [tuple(page) for page in index['pages']], index['entries'])
+
+
+class Page_Index_Store:
+    def __init__(self, s3_client=None, bucket=PAGE_INDEX_BUCKET, prefix=PAGE_INDEX_PREFIX,
+                 local_dir=PAGE_INDEX_DIR, local_max_bytes=PAGE_INDEX_DIR_MAX_BYTES):
+        """bucket 이 있으면 S3, 없고 local_dir 이 있으면 로컬 디렉터리를 저장소로 사용 (키: 책 이름)
+
+        둘 다 없으면 색인을 저장하지 않습니다 (매번 전체 처리).
+        """
+        self.s3 = s3_client
+        self.bucket = bucket if s3_client is not None else None
+        self.prefix = prefix
+        self.local_dir = local_dir
+        self.local_max_bytes = local_max_bytes
+        self._lock = threading.Lock()
+
+    def get(self, book_name):
+        """이전 색인, 없거나 읽지 못하면 None"""
+        try:
+            data = self._read(book_name)
+            return Page_Index.from_bytes(data) if data is not None else None
+        except Exception as e:
+            print(f"[ERROR] 페이지 색인 조회 실패 ({book_name}): {e}")
+            return None
+
+    def put(self, book_name, index):
+        """색인 저장. 실패해도 처리 결과에는 영향 없음 (다음 업로드가 전체 처리)"""
+        try:
+            self._write(book_name, index.to_bytes())
+        except Exception as e:
+            print(f"[ERROR] 페이지 색인 저장 실패 ({book_name}): {e}")
+
+    def _name(self, book_name):
+        return f"{quote(book_name, safe='')}.json.gz"
+
+    def _read(self, book_name):
+        if self.bucket:
+            try:
+                response = self.s3.get_object(Bucket=self.bucket, Key=self.prefix + self._name(book_name))
+            except self.s3.exceptions.NoSuchKey:
+                return None
+            return response['Body'].read()
+
+        if not self.local_dir:
+            return None
+        path = os.path.join(self.local_dir, self._name(book_name))
+        if not os.path.exists(path):
+            return None
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def _write(self, book_name, body):
+        if self.bucket:
+            self.s3.put_object(Bucket=self.bucket, Key=self.prefix + self._name(book_name),
+                               Body=body, ContentType='application/json', ContentEncoding='gzip')
+            return
+        if not self.local_dir:
+            return
+
+        os.makedirs(self.local_dir, exist_ok=True)
+        path = os.path.join(self.local_dir, self._name(book_name))
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(body)
+        os.replace(tmp_path, path)
+        self._evict_local()
+
+    def _evict_local(self):
+        """로컬 디렉터리 전체 크기가 local_max_bytes 를 넘으면 오래 전에 저장한 색인부터 삭제"""
+        with self._lock:
+            files = []
+            with os.scandir(self.local_dir) as entries:
+                for entry in entries:
+                    if entry.name.endswith('.json.gz'):
+                        try:
+                            stat = entry.stat()
+                        except FileNotFoundError:
+                            continue
+                        files.append((stat.st_mtime, stat.st_size, entry.path))
+            total = sum(size for _, size, _ in files)
+            for _, size, path in sorted(files):
+                if total <= self.local_max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
@@ -0,0 +1,245 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# =================================================================
+# 파이프라인 단계별 지표 (컨테이너 / 처리 Lambda / GET Lambda 공용, 외부 의존성 없음)
+# - Job_Metrics: 작업 하나(책 한 권, 요청 하나)의 단계별 시간과 항목 수/캐시 적중/재시도 수를
+#   CloudWatch EMF(Embedded Metric Format) JSON 한 줄로 로그에 출력 -> CloudWatch 가 지표로 추출
+# - Metrics_Registry: 프로세스 누적 값 (단계 시간 히스토그램, 카운터, 구성 요소 상태)을
+#   Prometheus 텍스트 형식으로 제공 (Flask /metrics, worker 모드는 METRICS_PORT)
+# - 단계 기록 한 번 = perf_counter 두 번 + 짧은 잠금 두 번 (수 µs, 운영에서 켜 둔 채로 사용)
+#   PIPELINE_METRICS=0 이면 기록/출력을 모두 생략
+# - gunicorn 처럼 프로세스가 여러 개면 /metrics 는 요청을 받은 프로세스의 값만 보여 줌
+# =================================================================
+
+PIPELINE_METRICS = os.getenv('PIPELINE_METRICS', '1') == '1'
+METRICS_NAMESPACE = os.getenv('METRICS_NAMESPACE', 'KanjiPipeline')
+# worker 모드(Flask 없음)에서 /metrics 를 제공할 포트 (0 이면 사용 안 함)
+METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+# 단계 시간 히스토그램 구간 (초)
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+DURATION_METRIC = 'kanji_stage_duration_seconds'
+EVENTS_METRIC = 'kanji_events_total'
+COMPONENT_METRIC = 'kanji_component_value'
+
+
+class Stage_Timer:
+    """with 블록 시간을 record(name, 초, *extra) 로 전달 (contextmanager 보다 호출 비용이 적음)"""
+    __slots__ = ('record', 'name', 'extra', 'start')
+
+    def __init__(self, record, name, *extra):
+        self.record = record
+        self.name = name
+        self.extra = extra
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.record(self.name, time.perf_counter() - self.start, *self.extra)
+        return False
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(labels):
+    return ','.join(f'{name}="{escape_label(value)}"' for name, value in labels if value is not None)
+
+
+def flatten_stats(stats, prefix=''):
+    """stats() dict 에서 숫자 값만 (이름, 값) 으로 펼침 (중첩 dict 는 이름_하위이름)"""
+    for name, value in stats.items():
+        if isinstance(value, dict):
+            yield from flatten_stats(value, f"{prefix}{name}_")
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield f"{prefix}{name}", value
+
+
+class Metrics_Registry:
+    """프로세스 누적 지표. 여러 작업 스레드에서 동시에 기록"""
+
+    def __init__(self, enabled=PIPELINE_METRICS, buckets=DURATION_BUCKETS):
+        self.enabled = enabled
+        self.buckets = buckets
+        self._durations = {}  # (service, stage) -> [구간별 개수(+Inf 포함), 합계, 개수]
+        self._counters = {}  # (service, name) -> 값
+        self._collectors = {}  # 구성 요소 이름 -> stats() 함수 (/metrics 요청 때 호출)
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds, service=None):
+        if not self.enabled:
+            return
+        index = bisect_left(self.buckets, seconds)
+        with self._lock:
+            entry = self._durations.get((service, stage))
+            if entry is None:
+                entry = self._durations[(service, stage)] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += seconds
+            entry[2] += 1
+
+    def increment(self, name, value=1, service=None):
+        if not self.enabled or not value:
+            return
+        with self._lock:
+            self._counters[(service, name)] = self._counters.get((service, name), 0) + value
+
+    def timer(self, stage, service=None):
+        return Stage_Timer(self.observe, stage, service)
+
+    def add_collector(self, name, collect):
+        """collect() 가 돌려주는 dict 의 숫자 값을 /metrics 에 게이지로 노출 (같은 이름은 교체)"""
+        with self._lock:
+            self._collectors[name] = collect
+
+    def snapshot(self):
+        """{'durations': {(service, stage): (개수, 합계)}, 'counters': {(service, name): 값}}"""
+        with self._lock:
+            return {
+                'durations': {key: (entry[2], entry[1]) for key, entry in self._durations.items()},
+                'counters': dict(self._counters)
+            }
+
+    def render_prometheus(self):
+        with self._lock:
+            durations = {key: (list(entry[0]), entry[1], entry[2]) for key, entry in self._durations.items()}
+            counters = dict(self._counters)
+            collectors = list(self._collectors.items())
+
+        bounds = [f"{bound:g}" for bound in self.buckets] + ['+Inf']
+        lines = [f"# HELP {DURATION_METRIC} 파이프라인 단계 처리 시간", f"# TYPE {DURATION_METRIC} histogram"]
+        for (service, stage), (counts, total, count) in sorted(durations.items(), key=sort_key):
+            labels = format_labels((('service', service), ('stage', stage)))
+            cumulative = 0
+            for bound, bucket_count in zip(bounds, counts):
+                cumulative += bucket_count
+                lines.append(f'{DURATION_METRIC}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"{DURATION_METRIC}_sum{{{labels}}} {total:.6f}")
+            lines.append(f"{DURATION_METRIC}_count{{{labels}}} {count}")
+
+        lines += [f"# HELP {EVENTS_METRIC} 처리 항목 수, 캐시 적중, 재시도 수", f"# TYPE {EVENTS_METRIC} counter"]
+        for (service, name), value in sorted(counters.items(), key=sort_key):
+            lines.append(f"{EVENTS_METRIC}{{{format_labels((('service', service), ('name', name)))}}} {value}")
+
+        lines += [f"# HELP {COMPONENT_METRIC} 캐시/병합기/저장소 현재 상태", f"# TYPE {COMPONENT_METRIC} gauge"]
+        for component, collect in sorted(collectors):
+            try:
+                values = list(flatten_stats(collect()))
+            except Exception as e:
+                print(f"[ERROR] 지표 수집 실패 ({component}): {e}")
+                continue
+            for name, value in values:
+                labels = format_labels((('component', component), ('name', name)))
+                lines.append(f"{COMPONENT_METRIC}{{{labels}}} {value}")
+        return '\n'.join(lines) + '\n'
+
+
+def sort_key(entry):
+    (service, name), _ = entry
+    return service or '', name
+
+
+# 프로세스 하나의 모든 작업/구성 요소가 공유
+pipeline_metrics = Metrics_Registry()
+
+
+class Job_Metrics:
+    """작업 하나(책 한 권 / 요청 하나)의 지표. emit() 에서 EMF JSON 한 줄로 출력
+
+    stage() 로 잰 시간과 count() 로 센 값은 프로세스 누적 지표에도 함께 기록합니다.
+    여러 스레드에서 같은 단계를 기록하면 시간은 합산됩니다 (파이프라인 모드의 겹친 단계).
+    """
+
+    def __init__(self, service, registry=None, **properties):
+        self.service = service
+        self.registry = registry if registry is not None else pipeline_metrics
+        self.enabled = self.registry.enabled
+        self.properties = properties  # 지표가 아닌 로그 필드 (책 이름 등, 차원으로 쓰지 않음)
+        self.timings = {}
+        self.counts = {}
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+
+    def stage(self, name):
+        return Stage_Timer(self.add_time, name)
+
+    def add_time(self, name, seconds):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.timings[name] = self.timings.get(name, 0.0) + seconds
+        self.registry.observe(name, seconds, self.service)
+
+    def count(self, name, value=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + value
+        self.registry.increment(name, value, self.service)
+
+    def to_emf(self, **properties):
+        with self._lock:
+            timings = dict(self.timings)
+            counts = dict(self.counts)
+        definitions = ([{'Name': f"{name}_seconds", 'Unit': 'Seconds'} for name in timings]
+                       + [{'Name': name, 'Unit': 'Count'} for name in counts])
+        record = {
+            '_aws': {
+                'Timestamp': int(time.time() * 1000),
+                'CloudWatchMetrics': [{
+                    'Namespace': METRICS_NAMESPACE,
+                    'Dimensions': [['Service']],
+                    'Metrics': definitions
+                }]
+            },
+            'Service': self.service,
+            **self.properties,
+            **properties
+        }
+        record.update({f"{name}_seconds": round(seconds, 6) for name, seconds in timings.items()})
+        record.update(counts)
+        return record
+
+    def emit(self, **properties):
+        """전체 시간을 기록하고 EMF 로그 한 줄 출력 (비활성화 상태면 None)"""
+        if not self.enabled:
+            return None
+        self.add_time('total', time.perf_counter() - self._started)
+        record = self.to_emf(**properties)
+        print(json.dumps(record, ensure_ascii=False, separators=(',', ':')))
+        return record
+
+
+def start_metrics_server(port=METRICS_PORT, registry=None, host='0.0.0.0'):
+    """/metrics 만 제공하는 HTTP 서버를 데몬 스레드로 시작 (Flask 가 없는 worker 모드용)"""
+    registry = registry if registry is not None else pipeline_metrics
+
+    class Metrics_Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?', 1)[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = registry.render_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', PROMETHEUS_CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # 수집 요청마다 로그를 남기지 않음
+
+    server = ThreadingHTTPServer((host, port), Metrics_Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"📈 지표 서버 시작: http://{host}:{server.server_port}/metrics")
+    return server
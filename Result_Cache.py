@@ -0,0 +1,285 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from Kanji_Results import LOW_MEMORY, dumps_compact, write_result_json
+from S3_Result_Writer import read_result_body, upload_result_json
+
+# =================================================================
+# 내용 해시 기반 결과 캐시 (Create_Kanji_Data / Lambda 공용)
+# - 같은 교재를 다른 이름으로 다시 올려도 전체 파이프라인을 건너뜀
+# - 키: 결과 형식 버전 + PDF 바이트의 SHA-256 + 토크나이저 설정 (컨테이너)
+#       또는 결과 형식 버전 + 추출된 한자 목록의 SHA-256 (Lambda)
+# - 저장소: S3 버킷(prefix/키.json) 또는 RESULT_CACHE_DIR 로컬 디렉터리(전체 크기 제한, 오래된 파일부터 삭제),
+#   둘 다 없으면 프로세스 내 LRU 만 사용. 앞단 LRU 는 결과 JSON 바이트 수로 제한
+# - 저장은 결과를 compact JSON 조각으로 직렬화하면서 바로 기록 (전체 문자열을 만들지 않음),
+#   이미 S3 에 올린 결과(처리 Lambda 의 processed/)는 서버 측 복사로 저장 (다시 직렬화하지 않음)
+#   저메모리 모드(LOW_MEMORY=1)는 프로세스 내 LRU 를 쓰지 않음
+# - RESULT_CACHE_TTL 초가 지난 결과는 사용하지 않음 (DynamoDB 사전 수정이 결과에 반영되도록)
+# - 적중 시 저장된 결과를 그대로 쓰고 book_name 만 바꿉니다.
+# =================================================================
+
+RESULT_CACHE_ENABLED = os.getenv('RESULT_CACHE', '1') == '1'
+RESULT_CACHE_BUCKET = os.getenv('RESULT_CACHE_BUCKET')
+RESULT_CACHE_PREFIX = os.getenv('RESULT_CACHE_PREFIX', 'result-cache/')
+# 지정한 경우에만 로컬 디스크에 저장 (기본은 버킷이 없으면 메모리만)
+RESULT_CACHE_DIR = os.getenv('RESULT_CACHE_DIR')
+RESULT_CACHE_DIR_MAX_BYTES = int(os.getenv('RESULT_CACHE_DIR_MAX_BYTES', str(256 * 1024 * 1024)))
+RESULT_CACHE_MEMORY_BYTES = 0 if LOW_MEMORY else int(os.getenv('RESULT_CACHE_MEMORY_BYTES', str(32 * 1024 * 1024)))
+# 0 이면 만료 없음
+RESULT_CACHE_TTL = float(os.getenv('RESULT_CACHE_TTL', str(7 * 24 * 3600)))
+# 결과 JSON 형식이 바뀌면 올려서 이전 캐시 항목을 쓰지 않게 함
+RESULT_CACHE_VERSION = 1
+
+
+def pdf_content_hash(pdf_bytes):
+    """PDF 원본 바이트의 해시"""
+    return hashlib.sha256(pdf_bytes).hexdigest()
+
+
+class Kanji_List_Hasher:
+    """kanji_list_hash 를 항목 하나씩 계산 (입력 JSON 을 파싱하면서 해시, 저메모리 모드)"""
+    __slots__ = ('digest',)
+
+    def __init__(self):
+        self.digest = hashlib.sha256(b'[')
+
+    def update(self, item):
+        self.digest.update(dumps_compact([item.get('kanji'), item.get('pages')]).encode('utf-8'))
+        self.digest.update(b',')
+
+    def hexdigest(self, total_pages):
+        digest = self.digest.copy()
+        digest.update(dumps_compact(total_pages).encode('utf-8') + b']')
+        return digest.hexdigest()
+
+
+def kanji_list_hash(kanji_data, total_pages):
+    """Lambda 입력(한자 + 페이지 목록, 전체 페이지 수)의 해시. book_name 은 제외
+
+    [[한자, 페이지 목록], ..., 전체 페이지 수] 의 compact JSON 을 항목 단위로 해시에 넣어
+    입력 전체 크기의 문자열을 만들지 않습니다.
+    """
+    hasher = Kanji_List_Hasher()
+    for item in kanji_data:
+        hasher.update(item)
+    return hasher.hexdigest(total_pages)
+
+
+def result_cache_key(content_hash, settings=()):
+    """내용 해시 + 결과를 바꾸는 설정(토크나이저 모드/정규화 등) + 결과 형식 버전의 캐시 키"""
+    key = dumps_compact([RESULT_CACHE_VERSION, content_hash, list(settings)])
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def with_book_name(result, book_name):
+    """캐시된 결과에서 book_name 만 바꾼 사본 (details 는 공유)"""
+    result = dict(result)
+    result['book_name'] = book_name
+    return result
+
+
+class _Byte_Counter:
+    """기록한 바이트 수만 세는 파일 객체 (저장소 없이 메모리 LRU 크기만 필요할 때)"""
+
+    def write(self, data):
+        return len(data)
+
+
+class Result_Cache:
+    def __init__(self, s3_client=None, bucket=RESULT_CACHE_BUCKET, prefix=RESULT_CACHE_PREFIX,
+                 local_dir=RESULT_CACHE_DIR, local_max_bytes=RESULT_CACHE_DIR_MAX_BYTES,
+                 memory_bytes=RESULT_CACHE_MEMORY_BYTES, ttl=RESULT_CACHE_TTL, enabled=RESULT_CACHE_ENABLED):
+        """bucket 이 있으면 S3, 없고 local_dir 이 있으면 로컬 디렉터리를 저장소로 사용
+
+        cache_key 인자는 result_cache_key() 로 만든 키입니다.
+        """
+        self.s3 = s3_client
+        self.bucket = bucket if s3_client is not None else None
+        self.prefix = prefix
+        self.local_dir = local_dir
+        self.local_max_bytes = local_max_bytes
+        self.memory_bytes = memory_bytes
+        self.ttl = ttl
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.pipeline_runs_avoided = 0
+        self._memory = OrderedDict()  # 키 -> (결과, JSON 바이트 수, 저장 시각)
+        self._memory_used = 0
+        self._lock = threading.Lock()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'expired': self.expired,
+                'pipeline_runs_avoided': self.pipeline_runs_avoided,
+                'memory_bytes': self._memory_used
+            }
+
+    def _fresh(self, stored_at):
+        return not self.ttl or time.time() - stored_at < self.ttl
+
+    def get(self, cache_key, book_name):
+        """적중 시 book_name 을 바꾼 결과, 아니면 None (TTL 이 지난 결과는 미스)"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._memory.get(cache_key)
+            if entry is not None:
+                self._memory.move_to_end(cache_key)
+        result = None
+        if entry is not None and self._fresh(entry[2]):
+            result = entry[0]
+        else:
+            if entry is not None:
+                self._forget(cache_key)
+            try:
+                stored = self._read(cache_key)
+            except Exception as e:
+                print(f"[ERROR] 결과 캐시 조회 실패: {e}")
+                stored = None
+            if stored is not None:
+                result, size, stored_at = stored
+                if self._fresh(stored_at):
+                    self._remember(cache_key, result, size, stored_at)
+                else:
+                    with self._lock:
+                        self.expired += 1
+                    result = None
+
+        with self._lock:
+            if result is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.pipeline_runs_avoided += 1
+        print(f"♻️ 결과 캐시 적중: {cache_key[:12]} -> {book_name}")
+        return with_book_name(result, book_name)
+
+    def put(self, cache_key, result):
+        """처리 결과 저장. 실패해도 파이프라인 결과에는 영향 없음"""
+        if not self.enabled or not result.get('details'):
+            return
+        try:
+            size = self._write(cache_key, result)
+        except Exception as e:
+            print(f"[ERROR] 결과 캐시 저장 실패: {e}")
+            return
+        self._remember(cache_key, result, size, time.time())
+
+    def put_copy(self, cache_key, result, source_bucket, source_key, json_bytes):
+        """S3 에 이미 올린 결과 객체(json_bytes 크기의 JSON)를 서버 측 복사로 저장
+
+        S3 저장소가 아니면 put 과 같이 결과를 직렬화해 저장합니다.
+        """
+        if not self.enabled or not result.get('details'):
+            return
+        if not self.bucket:
+            self.put(cache_key, result)
+            return
+        try:
+            # Content-Type/Content-Encoding 을 포함한 메타데이터를 그대로 복사
+            self.s3.copy_object(Bucket=self.bucket, Key=self._object_key(cache_key),
+                                CopySource={'Bucket': source_bucket, 'Key': source_key})
+        except Exception as e:
+            print(f"[ERROR] 결과 캐시 저장 실패: {e}")
+            return
+        self._remember(cache_key, result, json_bytes, time.time())
+
+    def _remember(self, cache_key, result, size, stored_at):
+        # 한도보다 큰 결과는 메모리에 두지 않음 (저장소에서 다시 읽음)
+        if not self.memory_bytes or size > self.memory_bytes:
+            return
+        with self._lock:
+            old = self._memory.pop(cache_key, None)
+            if old is not None:
+                self._memory_used -= old[1]
+            self._memory[cache_key] = (result, size, stored_at)
+            self._memory_used += size
+            while self._memory_used > self.memory_bytes:
+                _, (_, evicted_size, _) = self._memory.popitem(last=False)
+                self._memory_used -= evicted_size
+
+    def _forget(self, cache_key):
+        with self._lock:
+            old = self._memory.pop(cache_key, None)
+            if old is not None:
+                self._memory_used -= old[1]
+
+    def _object_key(self, cache_key):
+        return f"{self.prefix}{cache_key}.json"
+
+    def _local_path(self, cache_key):
+        return os.path.join(self.local_dir, f"{cache_key}.json")
+
+    def _read(self, cache_key):
+        """(결과, JSON 바이트 수, 저장 시각), 없으면 None"""
+        if self.bucket:
+            try:
+                response = self.s3.get_object(Bucket=self.bucket, Key=self._object_key(cache_key))
+            except self.s3.exceptions.NoSuchKey:
+                return None
+            body = read_result_body(response)
+            return json.loads(body), len(body), response['LastModified'].timestamp()
+
+        if not self.local_dir:
+            return None
+        path = self._local_path(cache_key)
+        try:
+            stored_at = os.stat(path).st_mtime
+            with open(path, 'rb') as f:
+                body = f.read()
+        except FileNotFoundError:
+            return None
+        if not self._fresh(stored_at):
+            self._remove_local(path)
+        return json.loads(body), len(body), stored_at
+
+    def _write(self, cache_key, result):
+        """결과를 저장소에 스트리밍으로 기록하고 JSON 바이트 수 반환"""
+        if self.bucket:
+            # 큰 결과는 멀티파트, RESULT_GZIP=1 이면 gzip (처리 결과 업로드와 같은 방식)
+            return upload_result_json(self.s3, self.bucket, self._object_key(cache_key), result)['json_bytes']
+        if not self.local_dir:
+            return write_result_json(result, _Byte_Counter()) if self.memory_bytes else 0
+
+        os.makedirs(self.local_dir, exist_ok=True)
+        path = self._local_path(cache_key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            size = write_result_json(result, f)
+        os.replace(tmp_path, path)
+        self._evict_local()
+        return size
+
+    def _evict_local(self):
+        """로컬 디렉터리 전체 크기가 local_max_bytes 를 넘으면 오래 전에 저장한 파일부터 삭제"""
+        with self._lock:
+            files = []
+            with os.scandir(self.local_dir) as entries:
+                for entry in entries:
+                    if entry.name.endswith('.json'):
+                        try:
+                            stat = entry.stat()
+                        except FileNotFoundError:
+                            continue
+                        files.append((stat.st_mtime, stat.st_size, entry.path))
+            total = sum(size for _, size, _ in files)
+            for _, size, path in sorted(files):
+                if total <= self.local_max_bytes:
+                    break
+                self._remove_local(path)
+                total -= size
+
+    @staticmethod
+    def _remove_local(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,334 @@
+import hashlib
+import json
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+from flask import Response, jsonify, request
+from Kanji_Columnar import COLUMNAR_CONTENT_TYPE
+from Kanji_Results import SHARD_NAME_PATTERN, dumps_compact
+
+# =================================================================
+# 여러 책의 처리 결과 저장소 (App_Runner / Flask 라우트)
+# - 책 이름(S3 객체 키 전체) 기준, 전체 크기(바이트) 제한 LRU
+# - 결과는 저장할 때 한 번만 직렬화(JSON / 컬럼형 / 샤드)하고 요청마다 bytes 를 그대로 전달
+# - 항목은 만든 뒤 바꾸지 않고 잠금 안에서 통째로 교체하므로 읽는 쪽이 중간 상태를 보지 않음
+# - RESULT_STORE_DIR 을 지정하면 디스크 저장소를 사용해 수집 워커 프로세스와
+#   여러 HTTP 워커 프로세스(gunicorn 등)가 같은 결과를 공유
+#
+# 디스크 번들 파일 구조 (<책 이름의 sha256>.book, 원자적 교체)
+#   header : magic(8s) | index_len(I)
+#   index  : JSON {"summary": {...}, "parts": [[이름, 길이], ...]}
+#   data   : parts 순서대로 이어 붙인 bytes (json / columnar / shard:<이름>)
+# =================================================================
+
+RESULT_STORE_MAX_BYTES = int(os.getenv('RESULT_STORE_MAX_BYTES', str(512 * 1024 * 1024)))
+RESULT_STORE_DIR = os.getenv('RESULT_STORE_DIR')
+RESULT_STORE_DISK_MAX_BYTES = int(os.getenv('RESULT_STORE_DISK_MAX_BYTES', str(4 * 1024 * 1024 * 1024)))
+JSON_MIMETYPE = 'application/json'
+
+BUNDLE_MAGIC = b'KJBOOK01'
+BUNDLE_HEADER = struct.Struct('<8sI')
+BUNDLE_SUFFIX = '.book'
+LATEST_FILE = 'LATEST'
+
+
+class Stored_Book:
+    __slots__ = ('book_name', 'pages_len', 'max_words', 'json_body', 'columnar', 'shards', 'size', 'stored_at',
+                 'version')
+
+    def __init__(self, book_name, pages_len, max_words, json_body, columnar=None, shards=None, stored_at=None):
+        self.book_name = book_name
+        self.pages_len = pages_len
+        self.max_words = max_words
+        self.json_body = json_body
+        self.columnar = columnar
+        self.shards = shards or {}
+        self.size = (len(self.json_body) + len(columnar or b'')
+                     + sum(len(body) for body in self.shards.values()))
+        self.stored_at = stored_at or time.time()
+        self.version = None  # 디스크 저장소: 읽어 온 번들 파일의 (mtime_ns, 크기)
+
+    @classmethod
+    def from_result(cls, book_name, all_data, shards=None, columnar=None):
+        """all_data / 샤드 dict 를 직렬화해서 생성"""
+        return cls(book_name, all_data.get('pages_len'), all_data.get('max_words'),
+                   dumps_compact(all_data).encode('utf-8'), columnar,
+                   {name: dumps_compact(shard).encode('utf-8') for name, shard in (shards or {}).items()})
+
+    def to_bundle(self):
+        parts = [('json', self.json_body)]
+        if self.columnar is not None:
+            parts.append(('columnar', self.columnar))
+        parts.extend((f"shard:{name}", body) for name, body in self.shards.items())
+        index = dumps_compact({
+            'summary': {'book_name': self.book_name, 'pages_len': self.pages_len,
+                        'max_words': self.max_words, 'stored_at': self.stored_at},
+            'parts': [[name, len(body)] for name, body in parts]
+        }).encode('utf-8')
+        return b''.join([BUNDLE_HEADER.pack(BUNDLE_MAGIC, len(index)), index] + [body for _, body in parts])
+
+    @classmethod
+    def from_bundle(cls, data):
+        index, pos = read_bundle_index(data)
+        json_body = None
+        columnar = None
+        shards = {}
+        for name, length in index['parts']:
+            body = data[pos:pos + length]
+            pos += length
+            if name == 'json':
+                json_body = body
+            elif name == 'columnar':
+                columnar = body
+            else:
+                shards[name.split(':', 1)[1]] = body
+        summary = index['summary']
+        return cls(summary['book_name'], summary['pages_len'], summary['max_words'], json_body,
+                   columnar, shards, summary['stored_at'])
+
+    def summary(self):
+        return {
+            'book_name': self.book_name,
+            'pages_len': self.pages_len,
+            'max_words': self.max_words,
+            'bytes': self.size,
+            'stored_at': self.stored_at
+        }
+
+
+class Result_Store:
+    def __init__(self, max_bytes=RESULT_STORE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.evictions = 0
+        self._books = OrderedDict()  # 책 이름 -> Stored_Book
+        self._latest = None
+        self._lock = threading.Lock()
+
+    def put(self, book_name, all_data, shards=None, columnar=None):
+        """결과를 직렬화해서 저장 (잠금 밖에서 직렬화하고 교체만 잠금 안에서)"""
+        return self.put_book(Stored_Book.from_result(book_name, all_data, shards, columnar))
+
+    def put_book(self, book):
+        book_name = book.book_name
+        with self._lock:
+            old = self._books.pop(book_name, None)
+            if old is not None:
+                self.current_bytes -= old.size
+            self._books[book_name] = book
+            self.current_bytes += book.size
+            self._latest = book
+            # 방금 넣은 책은 한도를 넘더라도 남겨 둠
+            while self.current_bytes > self.max_bytes and len(self._books) > 1:
+                _, evicted = self._books.popitem(last=False)
+                self.current_bytes -= evicted.size
+                self.evictions += 1
+                if evicted is self._latest:
+                    self._latest = None
+        return book
+
+    def get(self, book_name):
+        with self._lock:
+            book = self._books.get(book_name)
+            if book is not None:
+                self._books.move_to_end(book_name)
+            return book
+
+    def latest(self):
+        with self._lock:
+            return self._latest
+
+    def list_books(self):
+        with self._lock:
+            books = list(self._books.values())
+        return [book.summary() for book in reversed(books)]
+
+    def stats(self):
+        with self._lock:
+            return {'books': len(self._books), 'bytes': self.current_bytes, 'evictions': self.evictions}
+
+
+def read_bundle_index(data):
+    """번들 bytes(또는 앞부분)에서 (index dict, 데이터 시작 위치)"""
+    magic, index_len = BUNDLE_HEADER.unpack_from(data, 0)
+    if magic != BUNDLE_MAGIC:
+        raise ValueError("결과 번들 형식이 아닙니다.")
+    start = BUNDLE_HEADER.size
+    return json.loads(bytes(data[start:start + index_len]).decode('utf-8')), start + index_len
+
+
+class Disk_Result_Store:
+    """디스크 번들 파일로 여러 프로세스가 공유하는 저장소 (Result_Store 와 같은 인터페이스)
+
+    파일은 임시 파일에 쓴 뒤 os.replace 로 교체하므로 읽는 프로세스는 항상 완성된 번들을 봅니다.
+    각 프로세스는 (mtime, 크기)가 같은 동안 읽은 번들을 메모리(Result_Store LRU)에 둡니다.
+    버전은 메모리의 Stored_Book 에 함께 저장하므로 LRU 에서 밀려나면 같이 사라집니다.
+    파일 이름은 책 이름(경로 포함) 전체의 해시라서 a/book.pdf 와 b/book.pdf 가 겹치지 않습니다.
+    """
+
+    def __init__(self, directory=RESULT_STORE_DIR, max_bytes=RESULT_STORE_MAX_BYTES,
+                 disk_max_bytes=RESULT_STORE_DISK_MAX_BYTES):
+        self.directory = directory
+        self.disk_max_bytes = disk_max_bytes
+        self.evictions = 0
+        self._memory = Result_Store(max_bytes)
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, book_name):
+        digest = hashlib.sha256(book_name.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, digest + BUNDLE_SUFFIX)
+
+    def _write_atomic(self, path, data):
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def put(self, book_name, all_data, shards=None, columnar=None):
+        book = Stored_Book.from_result(book_name, all_data, shards, columnar)
+        path = self._path(book_name)
+        self._write_atomic(path, book.to_bundle())
+        self._write_atomic(os.path.join(self.directory, LATEST_FILE), book_name.encode('utf-8'))
+        stat = os.stat(path)
+        self._remember(book, (stat.st_mtime_ns, stat.st_size))
+        self._trim_disk(keep=path)
+        return book
+
+    def _remember(self, book, version):
+        book.version = version
+        self._memory.put_book(book)
+
+    def get(self, book_name):
+        try:
+            f = open(self._path(book_name), 'rb')
+        except FileNotFoundError:
+            return None
+        with f:
+            # 연 파일 기준으로 버전을 확인하므로 읽는 중에 교체되어도 내용과 버전이 일치
+            stat = os.fstat(f.fileno())
+            version = (stat.st_mtime_ns, stat.st_size)
+            book = self._memory.get(book_name)
+            if book is not None and book.version == version:
+                return book
+            book = Stored_Book.from_bundle(f.read())
+        self._remember(book, version)
+        return book
+
+    def latest(self):
+        try:
+            with open(os.path.join(self.directory, LATEST_FILE), 'rb') as f:
+                book_name = f.read().decode('utf-8')
+        except FileNotFoundError:
+            return None
+        return self.get(book_name)
+
+    def _bundle_files(self):
+        files = []
+        for name in os.listdir(self.directory):
+            if name.endswith(BUNDLE_SUFFIX):
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+        return sorted(files, reverse=True)
+
+    def list_books(self):
+        books = []
+        for _, size, path in self._bundle_files():
+            try:
+                with open(path, 'rb') as f:
+                    header = f.read(BUNDLE_HEADER.size)
+                    index, _ = read_bundle_index(header + f.read(BUNDLE_HEADER.unpack(header)[1]))
+            except (FileNotFoundError, ValueError, struct.error):
+                continue
+            books.append({**index['summary'], 'bytes': size})
+        return books
+
+    def _trim_disk(self, keep):
+        """디스크 사용량이 한도를 넘으면 오래된 번들부터 삭제"""
+        files = self._bundle_files()
+        total = sum(size for _, size, _ in files)
+        for _, size, path in reversed(files):
+            if total <= self.disk_max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            self.evictions += 1
+
+    def stats(self):
+        files = self._bundle_files()
+        return {'books': len(files), 'bytes': sum(size for _, size, _ in files),
+                'evictions': self.evictions, 'memory': self._memory.stats()}
+
+
+def create_result_store(directory=None):
+    """RESULT_STORE_DIR 이 있으면 프로세스 간 공유 디스크 저장소, 없으면 메모리 저장소"""
+    # load_dotenv() 가 모듈 import 뒤에 호출되므로 환경변수를 다시 읽음
+    directory = directory or os.getenv('RESULT_STORE_DIR')
+    if directory:
+        return Disk_Result_Store(directory)
+    return Result_Store()
+
+
+def book_response(book):
+    if request.args.get('format') == 'columnar':
+        if book.columnar is None:
+            return jsonify({"message": "컬럼형 데이터 없음"}), 404
+        return Response(book.columnar, mimetype=COLUMNAR_CONTENT_TYPE)
+    return Response(book.json_body, mimetype=JSON_MIMETYPE)
+
+
+def shard_response(book, shard_name):
+    # shard_name: manifest, level/N1, pages/1-50
+    if not SHARD_NAME_PATTERN.match(shard_name):
+        return jsonify({"message": "잘못된 샤드 이름"}), 400
+    body = book.shards.get(shard_name)
+    if body is None:
+        return jsonify({"message": "샤드를 찾을 수 없음"}), 404
+    return Response(body, mimetype=JSON_MIMETYPE)
+
+
+def register_result_routes(app, store):
+    """결과 조회 라우트 등록 (/api/kanji/all 은 가장 최근에 처리한 책)"""
+
+    @app.route('/api/kanji/all', methods=['GET'])
+    def kanji_all():
+        book = store.latest()
+        if book is None:
+            return jsonify({"message": "아직 데이터 없음"})
+        return book_response(book)
+
+    @app.route('/api/kanji/shards/<path:shard_name>', methods=['GET'])
+    def kanji_shard(shard_name):
+        book = store.latest()
+        if book is None:
+            return jsonify({"message": "아직 데이터 없음"})
+        return shard_response(book, shard_name)
+
+    @app.route('/api/kanji/books', methods=['GET'])
+    def kanji_books():
+        return jsonify({'books': store.list_books(), **store.stats()})
+
+    # 책 이름은 S3 객체 키 전체 (하위 경로 포함)
+    @app.route('/api/kanji/books/<path:book_name>', methods=['GET'])
+    def kanji_book(book_name):
+        book = store.get(book_name)
+        if book is None:
+            return jsonify({"message": "책을 찾을 수 없음"}), 404
+        return book_response(book)
+
+    @app.route('/api/kanji/books/<path:book_name>/shards/<path:shard_name>', methods=['GET'])
+    def kanji_book_shard(book_name, shard_name):
+        book = store.get(book_name)
+        if book is None:
+            return jsonify({"message": "책을 찾을 수 없음"}), 404
+        return shard_response(book, shard_name)
@@ -0,0 +1,116 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# =================================================================
+# S3 PDF 로더: 로컬 디스크(s3PDF/)를 거치지 않고 메모리 버퍼로 PDF를 읽습니다.
+# - 큰 객체는 Range GET 을 병렬로 나누어 받음 (받은 길이가 구간 길이와 다르면 재시도 후 오류)
+# - (bucket, key, ETag) 기준 크기 제한 LRU 캐시로 같은 PDF 재다운로드 방지
+# =================================================================
+
+PDF_RANGE_THRESHOLD = int(os.getenv('PDF_RANGE_THRESHOLD', str(64 * 1024 * 1024)))
+PDF_RANGE_CHUNK = int(os.getenv('PDF_RANGE_CHUNK', str(8 * 1024 * 1024)))
+PDF_RANGE_WORKERS = int(os.getenv('PDF_RANGE_WORKERS', '4'))
+PDF_RANGE_RETRIES = int(os.getenv('PDF_RANGE_RETRIES', '2'))
+PDF_CACHE_MAX_BYTES = int(os.getenv('PDF_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+
+
+class PDF_Byte_Cache:
+    """전체 바이트 수로 크기가 제한되는 스레드 안전 LRU 캐시"""
+
+    def __init__(self, max_bytes=PDF_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, cache_key):
+        with self._lock:
+            data = self._entries.get(cache_key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(cache_key)
+            self.hits += 1
+            return data
+
+    def put(self, cache_key, data):
+        # 캐시 한도보다 큰 파일은 저장하지 않음
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(cache_key, None)
+            if old is not None:
+                self.current_bytes -= len(old)
+            self._entries[cache_key] = data
+            self.current_bytes += len(data)
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= len(evicted)
+
+
+# 같은 프로세스의 모든 로더가 공유하는 캐시
+shared_pdf_cache = PDF_Byte_Cache()
+
+
+class S3_PDF_Loader:
+    def __init__(self, s3_client, cache=None, range_threshold=PDF_RANGE_THRESHOLD,
+                 range_chunk=PDF_RANGE_CHUNK, range_workers=PDF_RANGE_WORKERS):
+        self.s3 = s3_client
+        self.cache = shared_pdf_cache if cache is None else cache
+        self.range_threshold = range_threshold
+        self.range_chunk = range_chunk
+        self.range_workers = range_workers
+
+    def load(self, bucket, key):
+        """S3 객체를 bytes 로 반환 (캐시 적중 시 네트워크 본문 전송 없음)"""
+        head = self.s3.head_object(Bucket=bucket, Key=key)
+        etag = head['ETag']
+        size = head['ContentLength']
+
+        cache_key = (bucket, key, etag)
+        data = self.cache.get(cache_key)
+        if data is not None:
+            print(f"PDF 캐시 적중: s3://{bucket}/{key} ({size} bytes)")
+            return data
+
+        if size >= self.range_threshold:
+            data = self._ranged_get(bucket, key, size, etag)
+        else:
+            # IfMatch 로 HEAD 이후 객체가 바뀌었는지 확인
+            response = self.s3.get_object(Bucket=bucket, Key=key, IfMatch=etag)
+            data = response['Body'].read()
+            if len(data) != size:
+                raise IOError(f"PDF 다운로드 길이 불일치: s3://{bucket}/{key} {len(data)}/{size} bytes")
+
+        self.cache.put(cache_key, data)
+        return data
+
+    def _ranged_get(self, bucket, key, size, etag):
+        """Range GET 여러 개를 병렬로 받아 하나의 버퍼로 합침"""
+        buffer = bytearray(size)
+
+        def fetch(start):
+            end = min(start + self.range_chunk, size) - 1
+            for attempt in range(PDF_RANGE_RETRIES + 1):
+                response = self.s3.get_object(Bucket=bucket, Key=key, IfMatch=etag,
+                                              Range=f"bytes={start}-{end}")
+                chunk = response['Body'].read()
+                # 잘린 본문을 그대로 넣으면 빈 구간이 0 으로 남아 손상된 PDF 로 파싱됨
+                if len(chunk) == end - start + 1:
+                    buffer[start:end + 1] = chunk
+                    return
+                print(f"[ERROR] Range GET 길이 불일치 ({attempt + 1}/{PDF_RANGE_RETRIES + 1}): "
+                      f"bytes={start}-{end}, {len(chunk)} bytes 수신")
+            raise IOError(f"Range GET 길이 불일치: s3://{bucket}/{key} bytes={start}-{end}")
+
+        starts = range(0, size, self.range_chunk)
+        print(f"Range GET 다운로드: {len(starts)}개 구간, {size} bytes")
+        with ThreadPoolExecutor(max_workers=self.range_workers) as executor:
+            # result() 호출로 구간 다운로드 예외를 그대로 전달
+            for future in [executor.submit(fetch, start) for start in starts]:
+                future.result()
+        return bytes(buffer)
@@ -0,0 +1,138 @@
+import gzip
+import os
+from concurrent.futures import ThreadPoolExecutor
+from Kanji_Results import JSON_CHUNK_ITEMS, write_result_json
+
+# =================================================================
+# 처리 결과 JSON 의 S3 업로드 (처리 Lambda)
+# - 결과 dict 를 compact JSON 조각으로 직렬화하면서 바로 업로드 (전체 문자열을 만들지 않음)
+# - 선택적으로 gzip 압축 (Content-Encoding: gzip, GET Lambda 는 압축 본문을 그대로 전달)
+# - 파트 크기를 넘는 결과는 S3 멀티파트 업로드: 다음 파트를 직렬화하는 동안 이전 파트를
+#   백그라운드 스레드가 업로드하고, 대기 중인 파트 수를 제한해 메모리를 파트 몇 개 크기로 유지
+# - 파트 크기보다 작은 결과는 put_object 한 번 (멀티파트 요청 3번보다 빠름)
+# =================================================================
+
+RESULT_GZIP = os.getenv('RESULT_GZIP', '0') == '1'
+RESULT_GZIP_LEVEL = int(os.getenv('RESULT_GZIP_LEVEL', '6'))
+# S3 멀티파트의 마지막이 아닌 파트는 5MB 이상이어야 함
+MULTIPART_MIN_PART_BYTES = 5 * 1024 * 1024
+MULTIPART_PART_BYTES = int(os.getenv('MULTIPART_PART_BYTES', str(8 * 1024 * 1024)))
+# 동시에 업로드 중(또는 대기 중)일 수 있는 파트 수
+MULTIPART_MAX_PENDING = int(os.getenv('MULTIPART_MAX_PENDING', '2'))
+JSON_CONTENT_TYPE = 'application/json'
+
+
+class S3_Multipart_Writer:
+    """write() 로 받은 바이트를 파트 크기마다 S3 멀티파트로 올리는 파일 객체
+
+    with 블록이 정상 종료되면 업로드를 완료하고, 예외로 끝나면 멀티파트 업로드를 취소합니다.
+    put_args(ContentType, ContentEncoding 등)는 객체 생성 요청에 그대로 전달됩니다.
+    """
+
+    def __init__(self, s3_client, bucket, key, part_size=MULTIPART_PART_BYTES,
+                 max_pending=MULTIPART_MAX_PENDING, **put_args):
+        self.s3 = s3_client
+        self.bucket = bucket
+        self.key = key
+        self.part_size = max(MULTIPART_MIN_PART_BYTES, part_size)
+        self.max_pending = max(1, max_pending)
+        self.put_args = put_args
+        self.upload_id = None
+        self.bytes_written = 0
+        self._buffer = bytearray()
+        self._futures = []  # 파트 번호 순서
+        self._executor = None
+
+    @property
+    def parts(self):
+        """업로드한 파트 수 (put_object 한 번이면 1)"""
+        return len(self._futures) or 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+    def write(self, data):
+        self._buffer += data
+        self.bytes_written += len(data)
+        while len(self._buffer) >= self.part_size:
+            self._submit(bytes(self._buffer[:self.part_size]))
+            del self._buffer[:self.part_size]
+        return len(data)
+
+    def flush(self):
+        pass  # 파트 크기가 찰 때까지 모아서 업로드
+
+    def close(self):
+        if self.upload_id is None:
+            self.s3.put_object(Bucket=self.bucket, Key=self.key, Body=bytes(self._buffer), **self.put_args)
+            self._buffer = bytearray()
+            return
+
+        try:
+            if self._buffer:
+                self._submit(bytes(self._buffer))
+                self._buffer = bytearray()
+            parts = [future.result() for future in self._futures]
+            self.s3.complete_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+                                              MultipartUpload={'Parts': parts})
+        except Exception:
+            self.abort()
+            raise
+        self._executor.shutdown()
+
+    def abort(self):
+        """진행 중인 멀티파트 업로드 취소 (이미 올린 파트가 저장 비용으로 남지 않도록)"""
+        if self.upload_id is None:
+            return
+        for future in self._futures:
+            future.cancel()
+        self._executor.shutdown(wait=True)
+        try:
+            self.s3.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id)
+        except Exception as e:
+            print(f"[ERROR] 멀티파트 업로드 취소 실패 ({self.key}): {e}")
+
+    def _submit(self, body):
+        if self.upload_id is None:
+            response = self.s3.create_multipart_upload(Bucket=self.bucket, Key=self.key, **self.put_args)
+            self.upload_id = response['UploadId']
+            self._executor = ThreadPoolExecutor(max_workers=self.max_pending)
+        # 대기 중인 파트가 max_pending 개면 가장 오래된 파트가 끝날 때까지 직렬화를 멈춤
+        if len(self._futures) >= self.max_pending:
+            self._futures[-self.max_pending].result()
+        self._futures.append(self._executor.submit(self._upload_part, len(self._futures) + 1, body))
+
+    def _upload_part(self, part_number, body):
+        response = self.s3.upload_part(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+                                       PartNumber=part_number, Body=body)
+        return {'PartNumber': part_number, 'ETag': response['ETag']}
+
+
+def upload_result_json(s3_client, bucket, key, result, compress=RESULT_GZIP, part_size=MULTIPART_PART_BYTES,
+                       chunk_items=JSON_CHUNK_ITEMS):
+    """결과 dict 를 compact JSON 으로 스트리밍 업로드하고 {'json_bytes', 'stored_bytes', 'parts'} 반환"""
+    put_args = {'ContentType': JSON_CONTENT_TYPE}
+    if compress:
+        put_args['ContentEncoding'] = 'gzip'
+
+    with S3_Multipart_Writer(s3_client, bucket, key, part_size, **put_args) as writer:
+        if compress:
+            # mtime=0: 같은 결과는 같은 압축 바이트 (ETag 가 내용으로만 결정됨)
+            with gzip.GzipFile(fileobj=writer, mode='wb', compresslevel=RESULT_GZIP_LEVEL, mtime=0) as target:
+                json_bytes = write_result_json(result, target, chunk_items)
+        else:
+            json_bytes = write_result_json(result, writer, chunk_items)
+    return {'json_bytes': json_bytes, 'stored_bytes': writer.bytes_written, 'parts': writer.parts}
+
+
+def read_result_body(response):
+    """get_object 응답의 JSON 본문 bytes (Content-Encoding: gzip 이면 압축 해제)"""
+    body = response['Body'].read()
+    return gzip.decompress(body) if response.get('ContentEncoding') == 'gzip' else body
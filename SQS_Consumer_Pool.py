@@ -0,0 +1,168 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# =================================================================
+# SQS 소비자 풀
+# - 최대 10개씩 배치 수신, N개의 작업을 동시에 처리
+# - 처리 중인 메시지는 주기적으로 가시성 타임아웃 연장
+# - 처리 완료 메시지는 delete_message_batch 로 일괄 삭제, Failed 항목은 한 번 더 삭제하고
+#   그래도 실패하면 로그 (가시성 만료 후 재전달 -> 결과 캐시 적중으로 다시 처리)
+# - handler 예외/False 인 메시지는 삭제하지 않으므로 계속 실패하는 메시지는 큐의
+#   DLQ redrive policy(maxReceiveCount)로 격리. 다시 받아도 처리할 수 없는 메시지(형식 오류)는
+#   handler 가 True 를 반환해 삭제
+# =================================================================
+
+SQS_WORKERS = int(os.getenv('SQS_WORKERS', '4'))
+SQS_VISIBILITY_TIMEOUT = int(os.getenv('SQS_VISIBILITY_TIMEOUT', '120'))
+SQS_WAIT_TIME = 10
+SQS_MAX_BATCH = 10  # receive/delete/change_visibility 배치 최대 크기
+
+
+class SQS_Consumer_Pool:
+    def __init__(self, sqs_client, queue_url, handler, workers=SQS_WORKERS,
+                 visibility_timeout=SQS_VISIBILITY_TIMEOUT, wait_time=SQS_WAIT_TIME,
+                 heartbeat_interval=None):
+        """handler(message) 가 True 를 반환하면 메시지를 삭제합니다."""
+        self.sqs = sqs_client
+        self.queue_url = queue_url
+        self.handler = handler
+        self.workers = workers
+        self.visibility_timeout = visibility_timeout
+        self.wait_time = wait_time
+        # 타임아웃의 1/3 마다 연장해서 만료 전에 여유를 둠
+        self.heartbeat_interval = heartbeat_interval or max(1, visibility_timeout // 3)
+
+        self.processed = 0
+        self.failed = 0
+        self.delete_failures = 0
+        self._inflight = {}  # MessageId -> ReceiptHandle
+        self._pending_deletes = []
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+
+    def start(self):
+        """백그라운드 데몬 스레드로 수신 루프 시작"""
+        thread = threading.Thread(target=self.run_forever)
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    def stop(self):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+
+    def run_forever(self):
+        maintenance = threading.Thread(target=self._maintenance_loop)
+        maintenance.daemon = True
+        maintenance.start()
+
+        while not self._stop.is_set():
+            free_slots = self._wait_for_free_slots()
+            if free_slots <= 0 or self._stop.is_set():
+                continue
+            try:
+                response = self.sqs.receive_message(
+                    QueueUrl=self.queue_url,
+                    MaxNumberOfMessages=min(SQS_MAX_BATCH, free_slots),
+                    WaitTimeSeconds=self.wait_time,
+                    VisibilityTimeout=self.visibility_timeout
+                )
+            except Exception as e:
+                print(f"[ERROR] SQS 수신 실패: {e}")
+                time.sleep(1)
+                continue
+
+            for message in response.get('Messages', []):
+                with self._cond:
+                    self._inflight[message['MessageId']] = message['ReceiptHandle']
+                future = self._executor.submit(self.handler, message)
+                future.add_done_callback(lambda f, m=message: self._on_done(m, f))
+
+        # 종료 시 남은 작업 완료 후 삭제 반영
+        self._executor.shutdown(wait=True)
+        self._flush_deletes()
+
+    def _wait_for_free_slots(self):
+        with self._cond:
+            while len(self._inflight) >= self.workers and not self._stop.is_set():
+                self._cond.wait(timeout=1)
+            return self.workers - len(self._inflight)
+
+    def _on_done(self, message, future):
+        try:
+            should_delete = future.result()
+        except Exception as e:
+            print(f"[ERROR] 메시지 처리 실패 (가시성 만료 후 재전달): {e}")
+            should_delete = False
+
+        with self._cond:
+            self._inflight.pop(message['MessageId'], None)
+            if should_delete:
+                self.processed += 1
+                self._pending_deletes.append(message)
+            else:
+                self.failed += 1
+            self._cond.notify_all()
+
+    def _maintenance_loop(self):
+        """삭제 배치 전송(1초 간격)과 가시성 타임아웃 연장(heartbeat_interval 간격)"""
+        last_heartbeat = time.monotonic()
+        while not self._stop.is_set():
+            time.sleep(1)
+            self._flush_deletes()
+            if time.monotonic() - last_heartbeat >= self.heartbeat_interval:
+                self._extend_visibility()
+                last_heartbeat = time.monotonic()
+
+    def _flush_deletes(self):
+        with self._cond:
+            pending, self._pending_deletes = self._pending_deletes, []
+
+        for i in range(0, len(pending), SQS_MAX_BATCH):
+            batch = pending[i:i + SQS_MAX_BATCH]
+            failed = self._delete_batch(batch)
+            if failed:
+                # 일시적인 실패일 수 있으므로 실패한 메시지만 한 번 더 삭제
+                failed = self._delete_batch(failed)
+            if failed:
+                with self._cond:
+                    self.delete_failures += len(failed)
+                print(f"[ERROR] SQS 메시지 삭제 재시도 실패 {len(failed)}건 (가시성 만료 후 재전달): "
+                      f"{[message['MessageId'] for message in failed]}")
+            print(f"🗑️ 메시지 {len(batch) - len(failed)}건 일괄 삭제 완료")
+
+    def _delete_batch(self, batch):
+        """delete_message_batch 로 삭제하고 삭제하지 못한 메시지 목록 반환"""
+        try:
+            response = self.sqs.delete_message_batch(
+                QueueUrl=self.queue_url,
+                Entries=[{'Id': str(idx), 'ReceiptHandle': message['ReceiptHandle']}
+                         for idx, message in enumerate(batch)]
+            )
+        except Exception as e:
+            print(f"[ERROR] SQS 일괄 삭제 실패: {e}")
+            return batch
+        failed = response.get('Failed', [])
+        for entry in failed:
+            print(f"[ERROR] SQS 메시지 삭제 실패: {entry.get('Code')} {entry.get('Message', '')}")
+        return [batch[int(entry['Id'])] for entry in failed]
+
+    def _extend_visibility(self):
+        with self._cond:
+            inflight = list(self._inflight.values())
+
+        for i in range(0, len(inflight), SQS_MAX_BATCH):
+            batch = inflight[i:i + SQS_MAX_BATCH]
+            try:
+                self.sqs.change_message_visibility_batch(
+                    QueueUrl=self.queue_url,
+                    Entries=[{'Id': str(idx), 'ReceiptHandle': receipt,
+                              'VisibilityTimeout': self.visibility_timeout}
+                             for idx, receipt in enumerate(batch)]
+                )
+            except Exception as e:
+                print(f"[ERROR] 가시성 타임아웃 연장 실패: {e}")
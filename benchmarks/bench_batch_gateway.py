@@ -0,0 +1,254 @@
+import argparse
+import os
+import sys
+import threading
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import DynamoDB_Batch_Gateway as gateway_module  # noqa: E402
+from botocore.exceptions import ClientError  # noqa: E402
+from DynamoDB_Batch_Gateway import DynamoDB_Batch_Gateway  # noqa: E402
+from synthetic import make_vocabulary  # noqa: E402
+
+# =================================================================
+# DynamoDB 배치 게이트웨이: 재시도 / 백오프 / 결과 병합 / 재시도 한도 확인
+# - 스텁 클라이언트가 호출마다 정해진 동작으로 응답:
+#   ok(전부 처리), partial(요청의 뒤쪽 절반을 UnprocessedKeys/UnprocessedItems 로),
+#   throttle(ProvisionedThroughputExceededException), error(ValidationException)
+# - 백오프는 지터 없이 상한값으로 바꿔 대기 시간을 기록 (실제로 잠들지 않음)
+# - 확인: 미처리 키만 다시 요청, 대기가 base_delay * 2^시도 (max_delay 상한),
+#   찾은 항목이 빠짐/중복 없이 병합, 재시도 한도에서 남은 키/항목을 돌려줌,
+#   스로틀링이 아닌 오류는 재시도 없이 전달, ConsumedCapacity 합계
+# 사용법: python benchmarks/bench_batch_gateway.py --kanji 1000
+# =================================================================
+
+TABLE = 'kanji-test'
+BASE_DELAY = 0.05
+MAX_DELAY = 0.5
+
+
+def client_error(code, operation):
+    return ClientError({'Error': {'Code': code, 'Message': f"{code} (stub)"}}, operation)
+
+
+class Stub_DynamoDB_Client:
+    """batch_get_item / batch_write_item 스텁
+
+    plan: 호출 번호(0부터) -> 'ok' | 'partial' | 'throttle' | 'error'
+    """
+
+    def __init__(self, kanji_in_table, plan):
+        self.table = {kanji: self.item(kanji) for kanji in kanji_in_table}
+        self.plan = plan
+        self.calls = 0
+        self.requests = []  # 호출마다 요청한 한자 목록
+        self.capacity = 0.0  # 응답으로 돌려준 ConsumedCapacity 합계
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def item(kanji):
+        return {'kanji': {'S': kanji}, 'furigana': {'S': 'よみ'}, 'JLPT': {'S': 'N3'}, 'means': {'S': f"{kanji} 의미"}}
+
+    def _next_action(self, kanji_list, operation):
+        with self._lock:
+            action = self.plan(self.calls)
+            self.calls += 1
+            self.requests.append(kanji_list)
+        if action in ('throttle', 'error'):
+            code = 'ProvisionedThroughputExceededException' if action == 'throttle' else 'ValidationException'
+            raise client_error(code, operation)
+        return action
+
+    def _consumed(self, units):
+        with self._lock:
+            self.capacity += units
+        return [{'TableName': TABLE, 'CapacityUnits': units}]
+
+    def batch_get_item(self, RequestItems, ReturnConsumedCapacity):
+        request = RequestItems[TABLE]
+        keys = request['Keys']
+        action = self._next_action([key['kanji']['S'] for key in keys], 'BatchGetItem')
+        split = len(keys) // 2 if action == 'partial' else len(keys)
+        processed, unprocessed = keys[:split], keys[split:]
+        with self._lock:
+            found = [self.table[key['kanji']['S']] for key in processed if key['kanji']['S'] in self.table]
+        response = {'Responses': {TABLE: found}, 'ConsumedCapacity': self._consumed(len(processed) * 0.5)}
+        if unprocessed:
+            response['UnprocessedKeys'] = {TABLE: dict(request, Keys=unprocessed)}
+        return response
+
+    def batch_write_item(self, RequestItems, ReturnConsumedCapacity):
+        requests = RequestItems[TABLE]
+        action = self._next_action([r['PutRequest']['Item']['kanji']['S'] for r in requests], 'BatchWriteItem')
+        split = len(requests) // 2 if action == 'partial' else len(requests)
+        with self._lock:
+            for request in requests[:split]:
+                item = request['PutRequest']['Item']
+                self.table[item['kanji']['S']] = item
+        response = {'ConsumedCapacity': self._consumed(float(split))}
+        if requests[split:]:
+            response['UnprocessedItems'] = {TABLE: requests[split:]}
+        return response
+
+
+def sequence(*actions, then='ok'):
+    """actions 를 차례로, 그 뒤로는 then"""
+    return lambda call: actions[call] if call < len(actions) else then
+
+
+class Recording_Backoff:
+    """gateway 모듈의 random / time 대신 사용: 지터 없이 상한값을 쓰고 대기 시간만 기록"""
+
+    def __init__(self):
+        self.delays = []
+        self._lock = threading.Lock()
+
+    def uniform(self, low, high):
+        return high
+
+    def sleep(self, seconds):
+        with self._lock:
+            self.delays.append(round(seconds, 6))
+
+
+@contextmanager
+def recorded_backoff():
+    backoff = Recording_Backoff()
+    saved = gateway_module.random, gateway_module.time
+    gateway_module.random = gateway_module.time = backoff
+    try:
+        yield backoff
+    finally:
+        gateway_module.random, gateway_module.time = saved
+
+
+def expected_delays(attempts):
+    return [round(min(MAX_DELAY, BASE_DELAY * (2 ** attempt)), 6) for attempt in range(attempts)]
+
+
+def make_gateway(client, max_retries=8, max_workers=1):
+    return DynamoDB_Batch_Gateway(client, TABLE, max_retries=max_retries, base_delay=BASE_DELAY,
+                                  max_delay=MAX_DELAY, max_workers=max_workers)
+
+
+def found_kanji(items):
+    return [item['kanji']['S'] for item in items]
+
+
+def check_get_retry(vocabulary):
+    """스로틀링과 UnprocessedKeys 가 섞여도 미처리 키만 다시 요청하고 결과를 병합"""
+    requested, in_table = vocabulary[:80], vocabulary[:80:4] + vocabulary[1:80:4] + vocabulary[2:80:4]
+    client = Stub_DynamoDB_Client(in_table, sequence('throttle', 'partial', 'throttle', 'partial'))
+    gateway = make_gateway(client)
+    with recorded_backoff() as backoff:
+        items, unprocessed = gateway.batch_get(requested)
+
+    assert client.calls == 5, client.calls
+    assert client.requests[0] == client.requests[1] == requested
+    assert client.requests[2] == client.requests[3] == requested[40:], "미처리 키만 다시 요청해야 합니다"
+    assert client.requests[4] == requested[60:]
+    assert sorted(found_kanji(items)) == sorted(in_table), "찾은 항목이 빠지거나 중복되었습니다"
+    assert unprocessed == []
+    assert backoff.delays == expected_delays(4), backoff.delays
+    assert gateway.retries == 4
+    assert gateway.read_capacity == client.capacity
+    print(f"조회 재시도: 호출 {client.calls}회, 대기 {backoff.delays}, 찾은 항목 {len(items)}/{len(in_table)}, 확인 완료")
+
+
+def check_get_give_up(vocabulary):
+    """재시도 한도에서 멈추고, 남은 키와 그때까지 찾은 항목을 돌려줌"""
+    requested = vocabulary[:80]
+    client = Stub_DynamoDB_Client(requested, sequence(then='partial'))
+    gateway = make_gateway(client, max_retries=3)
+    with recorded_backoff() as backoff:
+        items, unprocessed = gateway.batch_get(requested)
+    # 80 -> 40 -> 20 -> 10 -> 5 개 미처리
+    assert client.calls == 4, client.calls
+    assert unprocessed == requested[75:], unprocessed
+    assert sorted(found_kanji(items)) == sorted(requested[:75])
+    assert backoff.delays == expected_delays(3), backoff.delays
+
+    client = Stub_DynamoDB_Client(requested, sequence(then='throttle'))
+    gateway = make_gateway(client, max_retries=6)
+    with recorded_backoff() as backoff:
+        items, unprocessed = gateway.batch_get(requested)
+    assert client.calls == 7 and items == [] and unprocessed == requested
+    assert backoff.delays == expected_delays(6), backoff.delays
+    assert backoff.delays[-1] == MAX_DELAY
+    print(f"조회 재시도 한도: UnprocessedKeys 4회 후 {len(requested[75:])}개 반환, "
+          f"스로틀링 7회 후 전부 반환 (대기 {backoff.delays}), 확인 완료")
+
+
+def check_write(vocabulary):
+    """UnprocessedItems / 스로틀링 재시도, 중복 제거, 재시도 한도"""
+    items = [{'kanji': kanji, 'furigana': 'よみ', 'means': f"{kanji} 의미", 'JLPT': 'N2'} for kanji in vocabulary[:60]]
+    client = Stub_DynamoDB_Client([], sequence('partial', 'throttle', 'partial', 'throttle', 'partial'))
+    gateway = make_gateway(client)
+    with recorded_backoff() as backoff:
+        failed = gateway.batch_write(items + items[:10])
+    assert failed == []
+    assert sorted(client.table) == sorted(vocabulary[:60]), "저장된 항목이 다릅니다"
+    assert all(len(request) <= gateway_module.WRITE_CHUNK for request in client.requests)
+    assert all(len(set(request)) == len(request) for request in client.requests), "배치 안에 중복 키"
+    assert gateway.write_capacity == client.capacity == 60.0
+    assert backoff.delays and set(backoff.delays) <= set(expected_delays(8))
+
+    client = Stub_DynamoDB_Client([], sequence('partial', then='throttle'))
+    gateway = make_gateway(client, max_retries=2)
+    with recorded_backoff() as backoff:
+        failed = gateway.batch_write(items[:20])
+    assert client.calls == 3
+    assert failed == items[10:20], "재시도 한도 뒤 저장하지 못한 항목만 돌려줘야 합니다"
+    assert sorted(client.table) == sorted(vocabulary[:10])
+    assert backoff.delays == expected_delays(2)
+    print(f"저장 재시도: 70개(중복 10) -> 60개 저장, 재시도 한도에서 미저장 {len(failed)}개 반환, 확인 완료")
+
+
+def check_non_throttling_error(vocabulary):
+    client = Stub_DynamoDB_Client([], sequence(then='error'))
+    gateway = make_gateway(client)
+    with recorded_backoff() as backoff:
+        try:
+            gateway.batch_get(vocabulary[:10])
+        except ClientError as e:
+            assert e.response['Error']['Code'] == 'ValidationException'
+        else:
+            raise AssertionError("스로틀링이 아닌 오류는 전달해야 합니다")
+    assert client.calls == 1 and backoff.delays == []
+    print("스로틀링이 아닌 오류: 재시도 없이 전달, 확인 완료")
+
+
+def check_concurrent_merge(vocabulary, workers):
+    """청크를 동시에 요청해도 찾은 항목이 빠짐/중복 없이 병합"""
+    in_table = vocabulary[::10] + vocabulary[1::10] + vocabulary[2::10] + vocabulary[3::10] + \
+        vocabulary[4::10] + vocabulary[5::10] + vocabulary[6::10]
+    client = Stub_DynamoDB_Client(in_table, lambda call: ('ok', 'partial', 'throttle')[call % 3])
+    gateway = make_gateway(client, max_retries=20, max_workers=workers)
+    with recorded_backoff() as backoff:
+        items, unprocessed = gateway.batch_get(vocabulary)
+    assert sorted(found_kanji(items)) == sorted(in_table), "동시 요청 결과 병합이 잘못되었습니다"
+    assert unprocessed == []
+    # 청크마다 마지막 호출만 재시도 없이 끝남
+    chunks = (len(vocabulary) + gateway_module.GET_CHUNK - 1) // gateway_module.GET_CHUNK
+    assert gateway.retries == len(backoff.delays) == client.calls - chunks
+    print(f"동시 조회 병합: 한자 {len(vocabulary)}개, 워커 {workers}개, 호출 {client.calls}회, "
+          f"찾은 항목 {len(items)}/{len(in_table)}, 확인 완료")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--kanji', type=int, default=1000, help='동시 조회 병합 확인에 쓸 한자 수')
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    vocabulary = make_vocabulary(max(args.kanji, 80))
+    check_get_retry(vocabulary)
+    check_get_give_up(vocabulary)
+    check_write(vocabulary)
+    check_non_throttling_error(vocabulary)
+    check_concurrent_merge(vocabulary[:args.kanji], args.workers)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_e2e import INPUT_BUCKET, LAMBDA_TABLE, RESULTS_BUCKET, configure_env, create_resources, quiet  # noqa: E402
+from fakes import Fake_Gemini_Model  # noqa: E402
+from synthetic import make_vocabulary  # noqa: E402
+
+# =================================================================
+# 처리 Lambda 의 SQS 배치 처리: 레코드 동시 처리 + batchItemFailures + send_message_batch 알림
+# - 책 --records 권의 합성 배치 이벤트에 실패를 주입:
+#   missing_input(입력 JSON 없음), bad_body(메시지 본문이 JSON 아님), notify(완료 알림 전송 실패)
+# - BATCH_RECORD_WORKERS 값마다 별도 프로세스에서 같은 배치를 처리해 시간 비교
+# - batchItemFailures 가 주입한 레코드와 정확히 같은지, 성공한 책의 결과와 알림이 있는지 확인
+# - 실패 원인을 고친 뒤 실패한 메시지만 다시 전달해 처리 (기존 핸들러는 배치 전체를 재시도)
+# 사용법: python benchmarks/bench_batch_records.py --records 10 --workers 1 4
+# =================================================================
+
+FAILURES = {2: 'missing_input', 5: 'bad_body', 7: 'notify'}
+
+
+class Failing_Notify_SQS:
+    """send_message_batch 에서 지정한 책의 알림을 Failed 로 돌려주는 SQS 클라이언트 래퍼"""
+
+    def __init__(self, client, failing_books):
+        self.client = client
+        self.failing_books = set(failing_books)
+        self.batch_calls = 0
+        self.single_calls = 0
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def send_message(self, **kwargs):
+        self.single_calls += 1
+        return self.client.send_message(**kwargs)
+
+    def send_message_batch(self, QueueUrl, Entries):
+        self.batch_calls += 1
+        failing = [entry for entry in Entries if json.loads(entry['MessageBody'])['bookName'] in self.failing_books]
+        sent = [entry for entry in Entries if entry not in failing]
+        response = self.client.send_message_batch(QueueUrl=QueueUrl, Entries=sent) if sent else {}
+        response['Failed'] = response.get('Failed', []) + [
+            {'Id': entry['Id'], 'SenderFault': False, 'Code': 'InternalError'} for entry in failing
+        ]
+        return response
+
+
+def book_name(index):
+    return f"book_{index}.pdf"
+
+
+def make_record(index, body=None):
+    body = body or json.dumps({'s3_bucket': INPUT_BUCKET, 's3_key': f"extracted/book_{index}.json"})
+    return {'messageId': f"msg-{index}", 'receiptHandle': f"receipt-{index}", 'body': body,
+            'eventSource': 'aws:sqs'}
+
+
+def put_input(s3, index, vocabulary, kanji_per_book):
+    words = vocabulary[index * kanji_per_book:(index + 1) * kanji_per_book]
+    data = {'book_name': f"s3PDF/{book_name(index)}", 'total_pages': len(words) // 10 + 1,
+            'kanji_data': [{'kanji': word, 'pages': [position // 10 + 1]} for position, word in enumerate(words)]}
+    s3.put_object(Bucket=INPUT_BUCKET, Key=f"extracted/book_{index}.json",
+                  Body=json.dumps(data, ensure_ascii=False).encode('utf-8'))
+
+
+def drain(sqs, queue_url):
+    messages = []
+    while True:
+        response = sqs.receive_message(QueueUrl=queue_url, MaxNumberOfMessages=10)
+        batch = response.get('Messages', [])
+        if not batch:
+            return messages
+        messages.extend(json.loads(message['Body']) for message in batch)
+        sqs.delete_message_batch(QueueUrl=queue_url, Entries=[
+            {'Id': str(idx), 'ReceiptHandle': message['ReceiptHandle']} for idx, message in enumerate(batch)
+        ])
+
+
+def run_child(args, result_path):
+    configure_env({'ai_rate': args['ai_rate'], 'ai_burst': int(args['ai_rate']), 'ai_lease': '0'})
+    os.environ['BATCH_RECORD_WORKERS'] = str(args['workers'])
+    os.environ['PIPELINE_METRICS'] = '0'
+    import boto3
+    from moto import mock_aws
+
+    records_count = args['records']
+    failures = {index: kind for index, kind in FAILURES.items() if index < records_count}
+    with mock_aws(), quiet(not args['verbose']):
+        vocabulary = make_vocabulary(records_count * args['kanji_per_book'], seed=3)
+        s3, dynamodb, sqs = create_resources(boto3, vocabulary, args['known'])
+        queue_url = os.environ['SQS_NOTIFICATION_URL']
+        for index in range(records_count):
+            if failures.get(index) != 'missing_input':
+                put_input(s3, index, vocabulary, args['kanji_per_book'])
+        os.environ['DYNAMODB_TABLE_NAME'] = LAMBDA_TABLE
+        import DynamoDB_Wtih_Lambda_S3 as processing
+
+        notify_books = [book_name(index) for index, kind in failures.items() if kind == 'notify']
+        sqs_proxy = Failing_Notify_SQS(sqs, notify_books)
+        processing.s3_client = s3
+        processing.dynamodb_client = dynamodb
+        processing.sqs_client = sqs_proxy
+        processing.S3_RESULTS_BUCKET = RESULTS_BUCKET
+        processing.ai_coalescer.gateway.client = dynamodb
+        model = Fake_Gemini_Model(latency=args['latency'])
+        processing.ai_enricher.model = model
+
+        records = [make_record(index, 'not-json' if failures.get(index) == 'bad_body' else None)
+                   for index in range(records_count)]
+        start = time.perf_counter()
+        response = processing.lambda_handler({'Records': records}, None)
+        batch_seconds = time.perf_counter() - start
+        batch_llm_calls = model.calls
+
+        failed_ids = sorted(item['itemIdentifier'] for item in response['batchItemFailures'])
+        assert failed_ids == sorted(f"msg-{index}" for index in failures), f"batchItemFailures 불일치: {failed_ids}"
+        notices = drain(sqs, queue_url)
+        completed = {notice['bookName'] for notice in notices if notice['status'] == 'complete'}
+        failed_notices = [notice for notice in notices if notice['status'] == 'FAILED_complete']
+        expected_complete = {book_name(index) for index in range(records_count) if index not in failures}
+        assert completed == expected_complete, f"완료 알림 불일치: {sorted(completed)}"
+        assert len(failed_notices) == sum(kind != 'notify' for kind in failures.values())
+        for index in range(records_count):
+            if failures.get(index) not in ('missing_input', 'bad_body'):
+                s3.head_object(Bucket=RESULTS_BUCKET, Key=f"processed/{book_name(index)}")
+        assert sqs_proxy.single_calls == 0, "알림은 send_message_batch 로만 보내야 합니다"
+
+        # 실패 원인을 고치고 실패한 메시지만 다시 전달
+        for index, kind in failures.items():
+            if kind == 'missing_input':
+                put_input(s3, index, vocabulary, args['kanji_per_book'])
+        sqs_proxy.failing_books.clear()
+        redelivered = [make_record(index) for index in sorted(failures)]
+        start = time.perf_counter()
+        retry_response = processing.lambda_handler({'Records': redelivered}, None)
+        retry_seconds = time.perf_counter() - start
+        assert not retry_response['batchItemFailures'], retry_response
+        assert {notice['bookName'] for notice in drain(sqs, queue_url)} == {book_name(index) for index in failures}
+
+    with open(result_path, 'w', encoding='utf-8') as f:
+        json.dump({'batch_seconds': batch_seconds, 'retry_seconds': retry_seconds, 'failed': failed_ids,
+                   'batch_llm_calls': batch_llm_calls, 'retry_llm_calls': model.calls - batch_llm_calls,
+                   'notify_batch_calls': sqs_proxy.batch_calls}, f)
+
+
+def run_workers(args):
+    fd, result_path = tempfile.mkstemp(prefix='kanji-batch-', suffix='.json')
+    os.close(fd)
+    try:
+        subprocess.run([sys.executable, '-W', 'ignore::FutureWarning', os.path.abspath(__file__),
+                        '--child', json.dumps(args), result_path], check=True)
+        with open(result_path, encoding='utf-8') as f:
+            return json.load(f)
+    finally:
+        os.remove(result_path)
+
+
+def main():
+    if len(sys.argv) == 4 and sys.argv[1] == '--child':
+        run_child(json.loads(sys.argv[2]), sys.argv[3])
+        return
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--records', type=int, default=10, help='SQS 배치의 레코드(책) 수')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4], help='BATCH_RECORD_WORKERS 값들')
+    parser.add_argument('--kanji-per-book', type=int, default=300)
+    parser.add_argument('--known', type=float, default=0.5, help='DynamoDB 에 미리 있는 어휘 비율')
+    parser.add_argument('--latency', type=float, default=0.2, help='가짜 Gemini 호출당 지연(초)')
+    parser.add_argument('--ai-rate', type=float, default=20.0)
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    injected = {index: kind for index, kind in FAILURES.items() if index < args.records}
+    print(f"레코드 {args.records}개, 책마다 한자 {args.kanji_per_book}개, 주입한 실패 {injected}")
+    for workers in args.workers:
+        result = run_workers({'records': args.records, 'workers': workers, 'kanji_per_book': args.kanji_per_book,
+                              'known': args.known, 'latency': args.latency, 'ai_rate': args.ai_rate,
+                              'verbose': args.verbose})
+        print(f"워커 {workers}개: 배치 {result['batch_seconds']:6.2f}s (LLM {result['batch_llm_calls']}회, "
+              f"알림 send_message_batch {result['notify_batch_calls']}회), "
+              f"batchItemFailures {result['failed']}, "
+              f"실패 메시지만 재전달 {result['retry_seconds']:5.2f}s (LLM {result['retry_llm_calls']}회), 확인 완료")
+    print(f"기존 핸들러는 첫 실패에서 예외를 다시 던져 레코드 {args.records}개 전체가 재전달됩니다.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,192 @@
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+import boto3
+from moto import mock_aws
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from AI_Coalescer import Enrichment_Coalescer, Enrichment_Lease  # noqa: E402
+from AI_Enrichment import Enrichment_Usage, Kanji_Enricher, Token_Bucket  # noqa: E402
+from DynamoDB_Batch_Gateway import DynamoDB_Batch_Gateway  # noqa: E402
+from Kanji_Cache import Kanji_Dictionary_Cache  # noqa: E402
+from bench_enrichment import build_prompt, placeholder  # noqa: E402
+from bench_snapshot import TABLE_NAME, create_table  # noqa: E402
+from fakes import Fake_Gemini_Model  # noqa: E402
+from synthetic import make_vocabulary  # noqa: E402
+
+# =================================================================
+# 여러 책을 동시에 처리할 때 AI 생성 중복: 작업별 개별 요청 vs 요청 병합
+# - 개별  : 작업마다 Kanji_Enricher 로 직접 생성 후 저장 (변경 전)
+# - 병합  : 한 프로세스의 작업들이 Enrichment_Coalescer 하나를 공유
+# - 리스  : 병합기 2개(컨테이너/Lambda 2곳)가 DynamoDB 리스로 같은 한자를 한 번만 생성
+# - 병합기마다 동시 모델 호출 수가 --concurrency 를 넘지 않는지, 작업별 AI 호출 수의 합이
+#   엔진의 호출 수와 같은지 확인 (작업 시작을 조금씩 어긋나게 한 경우 포함)
+# 사용법: python benchmarks/bench_coalescing.py --books 6 --kanji 300 --pool 600 --concurrency 2
+# =================================================================
+
+REGION = 'us-east-1'
+LEASE_TABLE = 'bench-kanji-lease'
+
+
+def make_books(args):
+    pool = make_vocabulary(args.pool)
+    rng = random.Random(0)
+    return [rng.sample(pool, args.kanji) for _ in range(args.books)]
+
+
+def make_enricher(model, rate_limiter, args):
+    return Kanji_Enricher(model, build_prompt, placeholder, batch_size=args.batch_size,
+                          concurrency=args.concurrency, rate_limiter=rate_limiter, base_delay=0.1)
+
+
+def run_jobs(books, job, stagger=0.0):
+    """모든 책을 동시에(stagger 초씩 어긋나게) 시작하고 (경과 시간, 책별 결과) 반환"""
+    results = [None] * len(books)
+    barrier = threading.Barrier(len(books))
+
+    def run(idx):
+        barrier.wait()
+        time.sleep(idx * stagger)
+        results[idx] = job(idx, books[idx])
+
+    threads = [threading.Thread(target=run, args=(idx,)) for idx in range(len(books))]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, results
+
+
+def report(name, elapsed, model, writes, books, results):
+    for book, items in zip(books, results):
+        assert sorted(item['kanji'] for item in items) == sorted(book)
+    requested = sum(len(book) for book in books)
+    print(f"{name:34s}: {elapsed:5.2f}s, 모델 호출 {model.calls:4d}회 (최대 동시 {model.peak}), "
+          f"생성 한자 {model.kanji:5d}개 (요청 {requested}), DynamoDB 쓰기 {writes}개")
+
+
+def check_usage(model, usages):
+    """작업별로 나눈 AI 호출 수의 합 == 실제 모델 호출 수"""
+    charged = sum(usage.stats()['calls'] for usage in usages)
+    assert charged == model.calls, f"작업별 AI 호출 수 합 {charged} != 모델 호출 {model.calls}"
+    print(f"  작업별 AI 호출 수: {[usage.stats()['calls'] for usage in usages]} (합 {charged})")
+
+
+class Counting_Model(Fake_Gemini_Model):
+    """모델에 보낸 한자 수와 최대 동시 호출 수도 집계"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.kanji = 0
+        self.active = 0
+        self.peak = 0
+
+    def generate_content(self, prompt):
+        with self._lock:
+            self.kanji += len(prompt.split('\n')[0].split(': ', 1)[1].split(','))
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            return super().generate_content(prompt)
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+class Counting_Gateway(DynamoDB_Batch_Gateway):
+    writes = 0
+
+    def batch_write(self, items):
+        Counting_Gateway.writes += len(items)
+        return super().batch_write(items)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--books', type=int, default=6)
+    parser.add_argument('--kanji', type=int, default=300, help='책마다 못 찾은 한자 수')
+    parser.add_argument('--pool', type=int, default=600, help='책들이 공유하는 한자 종류 수')
+    parser.add_argument('--batch-size', type=int, default=10)
+    parser.add_argument('--latency', type=float, default=0.2)
+    parser.add_argument('--rate', type=float, default=20.0)
+    parser.add_argument('--concurrency', type=int, default=2, help='병합기(엔진)마다 동시 모델 호출 수 (AI_CONCURRENCY)')
+    parser.add_argument('--stagger', type=float, default=0.15, help='어긋나게 시작할 때 작업 간격(초)')
+    args = parser.parse_args()
+
+    books = make_books(args)
+    os.environ.setdefault('AWS_DEFAULT_REGION', REGION)
+    with mock_aws():
+        dynamodb = boto3.client('dynamodb', region_name=REGION)
+        create_table(dynamodb, [])
+        # 리스는 한자 테이블이 아닌 전용 테이블에 저장
+        dynamodb.create_table(TableName=LEASE_TABLE, KeySchema=[{'AttributeName': 'kanji', 'KeyType': 'HASH'}],
+                              AttributeDefinitions=[{'AttributeName': 'kanji', 'AttributeType': 'S'}],
+                              BillingMode='PAY_PER_REQUEST')
+
+        def reset():
+            for item in dynamodb.scan(TableName=TABLE_NAME)['Items']:
+                dynamodb.delete_item(TableName=TABLE_NAME, Key={'kanji': item['kanji']})
+            Counting_Gateway.writes = 0
+
+        # 1) 작업별 개별 생성 + 저장 (변경 전)
+        # 모든 방식에서 Gemini 할당량(초당 요청 수)은 프로세스 공용 토큰 버킷 하나
+        model = Counting_Model(args.latency)
+        gateway = Counting_Gateway(dynamodb, TABLE_NAME)
+        rate_limiter = Token_Bucket(args.rate, args.rate)
+
+        def separate(idx, kanji_list):
+            items = make_enricher(model, rate_limiter, args).enrich(kanji_list)
+            gateway.batch_write(items)
+            return items
+        elapsed, results = run_jobs(books, separate)
+        report('개별 (변경 전)', elapsed, model, Counting_Gateway.writes, books, results)
+
+        # 2) 한 프로세스 안에서 병합기 공유 (동시에 시작 / 어긋나게 시작)
+        for name, stagger in (('병합 (프로세스 1개)', 0.0), ('병합 (프로세스 1개, 어긋난 시작)', args.stagger)):
+            reset()
+            model = Counting_Model(args.latency)
+            coalescer = Enrichment_Coalescer(make_enricher(model, Token_Bucket(args.rate, args.rate), args),
+                                             Counting_Gateway(dynamodb, TABLE_NAME), Kanji_Dictionary_Cache())
+            usages = [Enrichment_Usage() for _ in books]
+            elapsed, results = run_jobs(
+                books, lambda idx, kanji_list: coalescer.enrich(kanji_list, usages[idx]), stagger
+            )
+            report(name, elapsed, model, Counting_Gateway.writes, books, results)
+            print(f"  {coalescer.stats()}")
+            assert model.peak <= args.concurrency, f"동시 모델 호출 {model.peak} > {args.concurrency}"
+            check_usage(model, usages)
+
+        # 3) 병합기 2개 + DynamoDB 리스 (컨테이너/Lambda 2곳, 모델 할당량은 공유)
+        reset()
+        model = Counting_Model(args.latency)
+        rate_limiter = Token_Bucket(args.rate, args.rate)
+        coalescers = [
+            Enrichment_Coalescer(make_enricher(model, rate_limiter, args),
+                                 Counting_Gateway(dynamodb, TABLE_NAME), Kanji_Dictionary_Cache(),
+                                 Enrichment_Lease(dynamodb, LEASE_TABLE, owner=f"worker-{i}"),
+                                 poll_interval=0.1)
+            for i in range(2)
+        ]
+        usages = [Enrichment_Usage() for _ in books]
+        elapsed, results = run_jobs(
+            books, lambda idx, kanji_list: coalescers[idx % 2].enrich(kanji_list, usages[idx])
+        )
+        report('병합 + 리스 (프로세스 2개)', elapsed, model, Counting_Gateway.writes, books, results)
+        for coalescer in coalescers:
+            print(f"  {coalescer.stats()}")
+        assert model.peak <= args.concurrency * len(coalescers)
+        check_usage(model, usages)
+        leases = dynamodb.scan(TableName=LEASE_TABLE)['Items']
+        assert not leases, f"해제되지 않은 리스 {len(leases)}개"
+        assert not [item for item in dynamodb.scan(TableName=TABLE_NAME)['Items'] if 'lease_owner' in item], \
+            "한자 테이블에 리스 항목이 있습니다"
+
+
+if __name__ == '__main__':
+    main()
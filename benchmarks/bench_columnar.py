@@ -0,0 +1,61 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Kanji_Columnar import Columnar_Book, read_columnar, write_columnar  # noqa: E402
+from bench_results_api import make_book  # noqa: E402
+
+# =================================================================
+# 단어장 저장 형식: JSON(indent=2 / compact) vs 컬럼형(.kjcol, zlib / 무압축)
+# 크기, 직렬화 시간, 로드 시간(전체 dict 복원 / 컬럼만 로드)
+# 사용법: python benchmarks/bench_columnar.py --entries 20000
+# =================================================================
+
+
+def best_of(repeat, fn, *args):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--entries', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    book = make_book(args.entries)
+    formats = [
+        ('JSON indent=2 (현재)', lambda: json.dumps(book, ensure_ascii=False, indent=2).encode('utf-8'),
+         lambda data: json.loads(data), None),
+        ('JSON compact', lambda: json.dumps(book, ensure_ascii=False, separators=(',', ':')).encode('utf-8'),
+         lambda data: json.loads(data), None),
+        ('kjcol zlib', lambda: write_columnar(book), read_columnar, Columnar_Book),
+        ('kjcol 무압축', lambda: write_columnar(book, compress=False), read_columnar, Columnar_Book),
+    ]
+
+    baseline = None
+    for name, dump, load, load_columns in formats:
+        dump_elapsed, data = best_of(args.repeat, dump)
+        load_elapsed, loaded = best_of(args.repeat, load, data)
+        assert loaded == book
+        baseline = baseline or len(data)
+        line = (f"{name:20s}: {len(data) / 1024:8.1f} KB (x{baseline / len(data):.1f} 감소), "
+                f"직렬화 {dump_elapsed * 1000:6.1f} ms, 로드 {load_elapsed * 1000:6.1f} ms")
+        if load_columns:
+            columns_elapsed, _ = best_of(args.repeat, load_columns, data)
+            line += f" (컬럼만 {columns_elapsed * 1000:.1f} ms)"
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
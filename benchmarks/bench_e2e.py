@@ -0,0 +1,505 @@
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fakes import Fake_Gemini_Model, fake_item  # noqa: E402
+from synthetic import make_corpus, make_pdf_bytes, make_vocabulary  # noqa: E402
+
+# =================================================================
+# 종단 간 벤치마크: PDF 한 권이 전체 파이프라인을 지나는 시간
+# - moto(S3/SQS/DynamoDB) + 가짜 Gemini 모델(지연 설정) + 합성 PDF(페이지 수/한자 밀도)
+# - 실제 코드 실행: 컨테이너 Create_Kanji_Data(직렬/파이프라인) -> 처리 Lambda -> GET Lambda
+# - 단계별 시간(S3, 추출, DynamoDB 조회/저장/리스, LLM, 결과 조립), 처리량, 최대 메모리(ru_maxrss)
+# - 시나리오마다 별도 프로세스로 실행 (캐시/메모리 상태가 서로 섞이지 않음)
+# - --output 으로 JSON 저장, --compare 로 이전 결과와 시나리오/단계별 비교
+# 사용법: python benchmarks/bench_e2e.py --pages 10 100 1000 --density 0.2 0.5 --output e2e.json
+#         python benchmarks/bench_e2e.py --pages 10 100 1000 --density 0.2 0.5 --compare e2e.json
+# 주의: 단계 시간은 스레드별 호출 시간의 합이라 동시에 실행되는 단계는 전체 시간보다 클 수 있음
+#       moto 호출 비용은 실제 AWS 왕복 지연과 다르므로 같은 환경에서 측정한 결과끼리만 비교
+# =================================================================
+
+REGION = 'us-east-1'
+CONTAINER_TABLE = 'e2e-kanji'
+LAMBDA_TABLE = 'e2e-kanji-lambda'
+LEASE_TABLE = 'e2e-kanji-lease'
+INPUT_BUCKET = 'e2e-input'
+RESULTS_BUCKET = 'e2e-results'
+MODES = ('serial', 'streaming')
+
+S3_STAGES = {'head_object': 's3_download', 'get_object': 's3_download', 'put_object': 's3_upload'}
+DYNAMODB_STAGES = {
+    'batch_get_item': 'dynamodb_read', 'batch_write_item': 'dynamodb_write',
+    # AI 생성 리스 획득/해제 (AI_LEASE=1)
+    'put_item': 'dynamodb_lease', 'delete_item': 'dynamodb_lease',
+}
+SQS_STAGES = {'send_message': 'sqs_notify'}
+MODEL_STAGES = {'generate_content': 'llm'}
+
+# GET Lambda 요청 종류 (쿼리, 헤더)
+GET_REQUESTS = {
+    'full_gzip': (None, {'Accept-Encoding': 'gzip'}),
+    'page_100': ({'offset': '0', 'limit': '100'}, {}),
+    'level_N3': ({'level': 'N3'}, {}),
+    'columnar': ({'format': 'columnar'}, {}),
+}
+
+
+class Stage_Timer:
+    """단계 이름별 누적 시간과 호출 수 (여러 스레드에서 동시에 기록)"""
+
+    def __init__(self):
+        self._totals = defaultdict(lambda: [0.0, 0])
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds):
+        with self._lock:
+            total = self._totals[stage]
+            total[0] += seconds
+            total[1] += 1
+
+    @contextmanager
+    def stage(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start)
+
+    def wrap(self, func, stage):
+        def timed(*args, **kwargs):
+            with self.stage(stage):
+                return func(*args, **kwargs)
+        return timed
+
+    def snapshot(self):
+        with self._lock:
+            return {stage: {'seconds': round(total[0], 4), 'calls': total[1]}
+                    for stage, total in sorted(self._totals.items())}
+
+    def reset(self):
+        with self._lock:
+            self._totals.clear()
+
+
+class Timed_Client:
+    """boto3 클라이언트/모델을 감싸서 지정한 메서드 호출 시간을 단계별로 기록"""
+
+    def __init__(self, target, timer, stages):
+        self._target = target
+        self._timer = timer
+        self._stages = stages
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        stage = self._stages.get(name)
+        return self._timer.wrap(attr, stage) if stage else attr
+
+
+def peak_rss_mb():
+    # Linux 의 ru_maxrss 단위는 KB
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def scenario_key(scenario):
+    return f"{scenario['pages']}p/d{scenario['density']}/{scenario['mode']}"
+
+
+# -----------------------------------------------------------------
+# 자식 프로세스: 시나리오 하나 실행
+# -----------------------------------------------------------------
+
+def configure_env(scenario):
+    """모듈 import 전에 읽는 환경변수 설정"""
+    os.environ.update({
+        'AWS_ACCESS_KEY_ID': 'testing', 'AWS_SECRET_ACCESS_KEY': 'testing',
+        'AWS_DEFAULT_REGION': REGION, 'AWS_REGION': REGION,
+        'DYNAMODB_TABLE_NAME': CONTAINER_TABLE, 'S3_RESULTS_BUCKET': RESULTS_BUCKET,
+        # 같은 PDF 를 다시 처리하지 않도록 결과 캐시는 끔 (전체 경로 측정)
+        'RESULT_CACHE': '0',
+        'AI_RATE_PER_SEC': str(scenario['ai_rate']), 'AI_BURST': str(scenario['ai_burst']),
+        'AI_LEASE': scenario['ai_lease'], 'AI_LEASE_TABLE': LEASE_TABLE,
+    })
+    os.environ.pop('KANJI_CACHE_SNAPSHOT', None)
+
+
+def create_resources(boto3, vocabulary, known_ratio):
+    s3 = boto3.client('s3', region_name=REGION)
+    s3.create_bucket(Bucket=INPUT_BUCKET)
+    s3.create_bucket(Bucket=RESULTS_BUCKET)
+    dynamodb = boto3.client('dynamodb', region_name=REGION)
+    sqs = boto3.client('sqs', region_name=REGION)
+    os.environ['SQS_NOTIFICATION_URL'] = sqs.create_queue(QueueName='e2e-notify')['QueueUrl']
+
+    from DynamoDB_Batch_Gateway import DynamoDB_Batch_Gateway
+    # 어휘 일부는 이미 사전에 있는 한자 (두 테이블 모두 같은 상태에서 시작)
+    known = random.Random(0).sample(vocabulary, int(len(vocabulary) * known_ratio))
+    for table in (CONTAINER_TABLE, LAMBDA_TABLE, LEASE_TABLE):
+        dynamodb.create_table(
+            TableName=table,
+            KeySchema=[{'AttributeName': 'kanji', 'KeyType': 'HASH'}],
+            AttributeDefinitions=[{'AttributeName': 'kanji', 'AttributeType': 'S'}],
+            BillingMode='PAY_PER_REQUEST'
+        )
+        if table != LEASE_TABLE:
+            DynamoDB_Batch_Gateway(dynamodb, table).batch_write([fake_item(kanji) for kanji in known])
+    return s3, dynamodb, sqs
+
+
+def timed_pipeline_class(base, timer):
+    """추출과 결과 조립 단계를 기록하는 Create_Kanji_Data"""
+
+    class Timed_Create_Kanji_Data(base):
+        def extract_kanji_data_with_pages(self, pdf_source, on_new_kanji=None):
+            with timer.stage('extract'):
+                return super().extract_kanji_data_with_pages(pdf_source, on_new_kanji)
+
+        def build_details(self, kanji_order, found_items, ai_items):
+            with timer.stage('build_details'):
+                return super().build_details(kanji_order, found_items, ai_items)
+
+    return Timed_Create_Kanji_Data
+
+
+def run_container(scenario, timer, s3, dynamodb):
+    import Create_Kanji_Data as container
+
+    model = Fake_Gemini_Model(latency=scenario['latency'])
+    clients = {
+        'sqs': None, 'sns': None,
+        's3': Timed_Client(s3, timer, S3_STAGES),
+        'dynamodb': Timed_Client(dynamodb, timer, DYNAMODB_STAGES),
+        'model': Timed_Client(model, timer, MODEL_STAGES),
+    }
+    pipeline_class = timed_pipeline_class(container.Create_Kanji_Data, timer)
+    start = time.perf_counter()
+    instance = pipeline_class(clients=clients, s3_location=(INPUT_BUCKET, 'book.pdf'),
+                              streaming=scenario['mode'] == 'streaming')
+    elapsed = time.perf_counter() - start
+
+    kanji_count = len(instance.all_data['details'])
+    return instance, {
+        'seconds': round(elapsed, 4),
+        'pages_per_sec': round(scenario['pages'] / elapsed, 2),
+        'kanji_per_sec': round(kanji_count / elapsed, 2),
+        'kanji': kanji_count,
+        'llm_calls': model.calls,
+        'stages': timer.snapshot(),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def run_processing_lambda(scenario, timer, s3, dynamodb, sqs, instance):
+    # 모듈 수준 초기화(테이블 이름, 리스)가 Lambda 전용 테이블을 보도록 import 전에 변경
+    os.environ['DYNAMODB_TABLE_NAME'] = LAMBDA_TABLE
+    import DynamoDB_Wtih_Lambda_S3 as processing
+    from Kanji_Cache import Kanji_Dictionary_Cache
+
+    model = Fake_Gemini_Model(latency=scenario['latency'])
+    timed_dynamodb = Timed_Client(dynamodb, timer, DYNAMODB_STAGES)
+    processing.s3_client = Timed_Client(s3, timer, S3_STAGES)
+    processing.dynamodb_client = timed_dynamodb
+    processing.sqs_client = Timed_Client(sqs, timer, SQS_STAGES)
+    processing.ai_enricher.model = Timed_Client(model, timer, MODEL_STAGES)
+    processing.ai_coalescer.gateway.client = timed_dynamodb
+    if processing.ai_coalescer.lease is not None:
+        processing.ai_coalescer.lease.client = timed_dynamodb
+    # 컨테이너가 채운 프로세스 공용 한자 캐시 대신 빈 캐시 (cold Lambda 와 같은 조건)
+    processing.shared_kanji_cache = Kanji_Dictionary_Cache()
+    processing.ai_coalescer.kanji_cache = processing.shared_kanji_cache
+
+    # 추출 Lambda 가 올리는 것과 같은 형식의 입력 JSON
+    data = {
+        'book_name': instance.pdf_path,
+        'kanji_data': [{'kanji': kanji, 'pages': instance.kanji_page_map[kanji]} for kanji in instance.kanji_data],
+        'total_pages': scenario['pages'],
+    }
+    s3.put_object(Bucket=INPUT_BUCKET, Key='extracted/book.json',
+                  Body=json.dumps(data, ensure_ascii=False).encode('utf-8'))
+    event = {'Records': [{'body': json.dumps({'s3_bucket': INPUT_BUCKET, 's3_key': 'extracted/book.json'})}]}
+
+    timer.reset()
+    start = time.perf_counter()
+    batch_response = processing.lambda_handler(event, None)
+    assert not batch_response['batchItemFailures'], "처리 Lambda 레코드 실패"
+    elapsed = time.perf_counter() - start
+
+    from S3_Result_Writer import read_result_body
+
+    processed = json.loads(read_result_body(s3.get_object(Bucket=RESULTS_BUCKET, Key='processed/book.pdf')))
+    assert processed['details'] == instance.all_data['details'], "컨테이너와 Lambda 결과가 다릅니다"
+    kanji_count = len(processed['details'])
+    return {
+        'seconds': round(elapsed, 4),
+        'kanji_per_sec': round(kanji_count / elapsed, 2),
+        'kanji': kanji_count,
+        'llm_calls': model.calls,
+        'stages': timer.snapshot(),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def measure_get(api, event, repeat, cold):
+    timings = []
+    response = None
+    for _ in range(repeat):
+        if cold:
+            api.book_cache = api.Book_Cache()
+        start = time.perf_counter()
+        response = api.lambda_handler(event, None)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return response, {
+        'p50_ms': round(timings[len(timings) // 2] * 1000, 3),
+        'max_ms': round(timings[-1] * 1000, 3),
+    }
+
+
+def run_get_lambda(scenario, timer, s3):
+    import API_Gateway_With_Lambda_S3 as api
+
+    api.S3_RESULTS_BUCKET = RESULTS_BUCKET
+    api.s3_client = Timed_Client(s3, timer, S3_STAGES)
+    repeat = scenario['get_repeat']
+
+    timer.reset()
+    results = {}
+    etag = None
+    for name, (query, headers) in GET_REQUESTS.items():
+        event = {'pathParameters': {'book_name': 'book.pdf'}, 'queryStringParameters': query, 'headers': headers}
+        _, cold = measure_get(api, event, max(1, repeat // 10), cold=True)
+        response, warm = measure_get(api, event, repeat, cold=False)
+        assert response['statusCode'] == 200, response
+        if name == 'full_gzip':
+            etag = response['headers']['ETag']
+        body = response['body']
+        results[name] = {'cold': cold, 'warm': warm, 'response_bytes': len(body)}
+
+    # 클라이언트가 같은 버전을 가진 경우 (304)
+    event = {'pathParameters': {'book_name': 'book.pdf'}, 'queryStringParameters': None,
+             'headers': {'If-None-Match': etag}}
+    response, warm = measure_get(api, event, repeat, cold=False)
+    assert response['statusCode'] == 304, response
+    results['not_modified'] = {'warm': warm, 'response_bytes': 0}
+
+    # 캐시가 데워진 상태의 처리량 (요청 종류를 번갈아 호출)
+    events = [{'pathParameters': {'book_name': 'book.pdf'}, 'queryStringParameters': query, 'headers': headers}
+              for query, headers in GET_REQUESTS.values()]
+    start = time.perf_counter()
+    for event in itertools.islice(itertools.cycle(events), repeat * len(events)):
+        api.lambda_handler(event, None)
+    elapsed = time.perf_counter() - start
+    return {
+        'requests': results,
+        'warm_req_per_sec': round(repeat * len(events) / elapsed, 1),
+        'stages': timer.snapshot(),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+@contextmanager
+def quiet(enabled):
+    """파이프라인의 진행 로그(print)를 버림 (--verbose 가 아니면)"""
+    if not enabled:
+        yield
+        return
+    stdout = sys.stdout
+    with open(os.devnull, 'w') as devnull:
+        sys.stdout = devnull
+        try:
+            yield
+        finally:
+            sys.stdout = stdout
+
+
+def run_child(scenario, result_path):
+    configure_env(scenario)
+    import boto3
+    from moto import mock_aws
+
+    result = {'key': scenario_key(scenario), 'scenario': scenario}
+    start = time.perf_counter()
+    vocabulary = make_vocabulary(scenario['vocabulary'])
+    pdf_bytes = make_pdf_bytes(make_corpus(scenario['pages'], scenario['vocabulary'], scenario['density']))
+    result['pdf_bytes'] = len(pdf_bytes)
+    result['setup_seconds'] = round(time.perf_counter() - start, 3)
+
+    with mock_aws(), quiet(not scenario['verbose']):
+        s3, dynamodb, sqs = create_resources(boto3, vocabulary, scenario['known'])
+        s3.put_object(Bucket=INPUT_BUCKET, Key='book.pdf', Body=pdf_bytes)
+        del pdf_bytes
+        result['baseline_rss_mb'] = peak_rss_mb()
+
+        timer = Stage_Timer()
+        instance, result['container'] = run_container(scenario, timer, s3, dynamodb)
+        if scenario['lambdas']:
+            result['processing_lambda'] = run_processing_lambda(scenario, timer, s3, dynamodb, sqs, instance)
+            result['get_lambda'] = run_get_lambda(scenario, timer, s3)
+    result['peak_rss_mb'] = peak_rss_mb()
+
+    with open(result_path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False)
+
+
+# -----------------------------------------------------------------
+# 부모 프로세스: 시나리오 실행, 출력, 저장, 비교
+# -----------------------------------------------------------------
+
+def run_scenario(scenario):
+    fd, result_path = tempfile.mkstemp(prefix='kanji-e2e-', suffix='.json')
+    os.close(fd)
+    try:
+        # google.generativeai 지원 종료 경고는 시나리오마다 반복되므로 숨김
+        subprocess.run([sys.executable, '-W', 'ignore::FutureWarning', os.path.abspath(__file__),
+                        '--child', json.dumps(scenario), result_path], check=True)
+        with open(result_path, encoding='utf-8') as f:
+            return json.load(f)
+    finally:
+        os.remove(result_path)
+
+
+def format_stages(stages):
+    return ', '.join(f"{stage} {value['seconds']:.2f}s/{value['calls']}회" for stage, value in stages.items())
+
+
+def print_result(result):
+    container = result['container']
+    print(f"[{result['key']}] PDF {result['pdf_bytes'] / 1024:.0f} KB, 한자 {container['kanji']}개, "
+          f"기본 메모리 {result['baseline_rss_mb']} MB")
+    print(f"  컨테이너     : {container['seconds']:7.2f}s, {container['pages_per_sec']:8.1f} pages/s, "
+          f"{container['kanji_per_sec']:8.1f} kanji/s, LLM {container['llm_calls']}회, "
+          f"최대 메모리 {container['peak_rss_mb']} MB")
+    print(f"    {format_stages(container['stages'])}")
+    if 'processing_lambda' in result:
+        processing = result['processing_lambda']
+        print(f"  처리 Lambda  : {processing['seconds']:7.2f}s, {processing['kanji_per_sec']:8.1f} kanji/s, "
+              f"LLM {processing['llm_calls']}회, 최대 메모리 {processing['peak_rss_mb']} MB")
+        print(f"    {format_stages(processing['stages'])}")
+        get = result['get_lambda']
+        print(f"  GET Lambda   : warm {get['warm_req_per_sec']:.0f} req/s, 최대 메모리 {get['peak_rss_mb']} MB")
+        for name, request in get['requests'].items():
+            cold = f"cold {request['cold']['p50_ms']:7.2f} ms, " if 'cold' in request else ' ' * 19
+            print(f"    {name:13s}: {cold}warm p50 {request['warm']['p50_ms']:7.3f} ms, "
+                  f"응답 {request['response_bytes']} bytes")
+
+
+def comparable_metrics(result):
+    """비교할 지표: (이름 -> 값, 작을수록 좋음)"""
+    metrics = {'container.seconds': result['container']['seconds'],
+               'container.peak_rss_mb': result['container']['peak_rss_mb']}
+    for stage, value in result['container']['stages'].items():
+        metrics[f"container.{stage}"] = value['seconds']
+    if 'processing_lambda' in result:
+        metrics['processing_lambda.seconds'] = result['processing_lambda']['seconds']
+        for stage, value in result['processing_lambda']['stages'].items():
+            metrics[f"processing_lambda.{stage}"] = value['seconds']
+        for name, request in result['get_lambda']['requests'].items():
+            metrics[f"get_lambda.{name}.warm_p50_ms"] = request['warm']['p50_ms']
+    metrics['peak_rss_mb'] = result['peak_rss_mb']
+    return metrics
+
+
+def compare(baseline, results, threshold):
+    """이전 결과 대비 비율 출력. threshold 이상 느려진 지표 수 반환"""
+    previous = {result['key']: result for result in baseline['results']}
+    regressions = 0
+    print(f"\n=== 비교: {baseline.get('created_at')} ({baseline.get('git_revision')}) 대비 ===")
+    for result in results:
+        old = previous.get(result['key'])
+        if old is None:
+            print(f"[{result['key']}] 이전 결과 없음")
+            continue
+        print(f"[{result['key']}]")
+        old_metrics = comparable_metrics(old)
+        for name, value in comparable_metrics(result).items():
+            old_value = old_metrics.get(name)
+            if not old_value:
+                continue
+            ratio = value / old_value
+            mark = ''
+            if ratio >= 1 + threshold:
+                mark = '  ⚠️ 느려짐'
+                regressions += 1
+            elif ratio <= 1 - threshold:
+                mark = '  ✅ 빨라짐'
+            print(f"  {name:40s}: {old_value:10.3f} -> {value:10.3f} ({ratio:5.2f}x){mark}")
+    return regressions
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    if len(sys.argv) == 4 and sys.argv[1] == '--child':
+        run_child(json.loads(sys.argv[2]), sys.argv[3])
+        return
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pages', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--density', type=float, nargs='+', default=[0.5], help='줄마다 한자 단어 비율')
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+    parser.add_argument('--vocabulary', type=int, default=3000, help='합성 교재의 한자 단어 종류 수')
+    parser.add_argument('--known', type=float, default=0.5, help='DynamoDB 에 미리 있는 어휘 비율')
+    parser.add_argument('--latency', type=float, default=0.2, help='가짜 Gemini 호출당 지연(초)')
+    parser.add_argument('--ai-rate', type=float, default=20.0, help='AI_RATE_PER_SEC')
+    parser.add_argument('--ai-lease', choices=('0', '1'), default=os.getenv('AI_LEASE', '0'))
+    parser.add_argument('--get-repeat', type=int, default=50, help='GET 요청 종류별 반복 횟수')
+    parser.add_argument('--output', help='결과 JSON 저장 경로')
+    parser.add_argument('--compare', help='비교할 이전 결과 JSON')
+    parser.add_argument('--threshold', type=float, default=0.1, help='느려짐/빨라짐 표시 기준 비율')
+    parser.add_argument('--verbose', action='store_true', help='파이프라인 로그 출력')
+    args = parser.parse_args()
+
+    results = []
+    for pages, density in itertools.product(args.pages, args.density):
+        for mode_num, mode in enumerate(args.modes):
+            scenario = {
+                'pages': pages, 'density': density, 'mode': mode, 'vocabulary': args.vocabulary,
+                'known': args.known, 'latency': args.latency, 'ai_rate': args.ai_rate,
+                'ai_burst': max(4, int(args.ai_rate)), 'ai_lease': args.ai_lease,
+                'get_repeat': args.get_repeat, 'verbose': args.verbose,
+                # Lambda 단계는 컨테이너 모드와 상관없으므로 첫 모드에서만 실행
+                'lambdas': mode_num == 0,
+            }
+            result = run_scenario(scenario)
+            print_result(result)
+            results.append(result)
+
+    report = {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'git_revision': git_revision(),
+        'machine': {'python': platform.python_version(), 'platform': platform.platform(),
+                    'cpu_count': os.cpu_count()},
+        'args': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+        'results': results,
+    }
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare(json.load(f), results, args.threshold)
+        print(f"기준({args.threshold:.0%}) 이상 느려진 지표 {regressions}개")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"결과 저장: {args.output}")
+    print(f"CPU {os.cpu_count()}개, moto 기준 측정 (실제 AWS 왕복 지연은 포함되지 않음)")
+
+
+if __name__ == '__main__':
+    main()
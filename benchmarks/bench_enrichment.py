@@ -0,0 +1,54 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from AI_Enrichment import Kanji_Enricher, Token_Bucket  # noqa: E402
+from fakes import Fake_Gemini_Model  # noqa: E402
+from synthetic import make_vocabulary  # noqa: E402
+
+# =================================================================
+# AI 한자 데이터 생성: 순차 vs 동시 요청 (가짜 Gemini 모델, 오프라인)
+# 사용법: python benchmarks/bench_enrichment.py --kanji 500 --latency 0.3 --concurrency 1 4 8
+# =================================================================
+
+
+def build_prompt(batch):
+    return f"다음 일본 한자에 대한 정보를 JSON 배열 형태로 생성해주세요: {', '.join(batch)}\n"
+
+
+def placeholder(batch):
+    return [{"kanji": kanji, "furigana": "", "means": "정보 없음", "JLPT": "OTHER"} for kanji in batch]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--kanji', type=int, default=500)
+    parser.add_argument('--batch-size', type=int, default=10)
+    parser.add_argument('--latency', type=float, default=0.3)
+    parser.add_argument('--rate', type=float, default=20.0, help='초당 최대 요청 수')
+    parser.add_argument('--quota-error-rate', type=float, default=0.05)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 8])
+    args = parser.parse_args()
+
+    kanji_list = make_vocabulary(args.kanji)
+    baseline = None
+    for concurrency in args.concurrency:
+        model = Fake_Gemini_Model(args.latency, args.quota_error_rate)
+        enricher = Kanji_Enricher(model, build_prompt, placeholder, batch_size=args.batch_size,
+                                  concurrency=concurrency,
+                                  rate_limiter=Token_Bucket(args.rate, concurrency),
+                                  base_delay=0.1)
+        start = time.perf_counter()
+        results = enricher.enrich(kanji_list)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        assert [item['kanji'] for item in results] == kanji_list
+        print(f"concurrency={concurrency}: {elapsed:.2f}s, 모델 호출 {model.calls}회, "
+              f"속도 향상 x{baseline / elapsed:.2f}")
+
+
+if __name__ == '__main__':
+    main()
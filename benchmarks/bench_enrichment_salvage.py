@@ -0,0 +1,103 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from AI_Enrichment import Kanji_Enricher, Token_Bucket, parse_model_json  # noqa: E402
+from bench_enrichment import build_prompt, placeholder  # noqa: E402
+from fakes import Garbled_Gemini_Model  # noqa: E402
+from synthetic import make_vocabulary  # noqa: E402
+
+# =================================================================
+# 잘리고 깨지는 응답에서 AI 생성: 변경 전 vs 자동 배치 크기 + 부분 복구
+# - 변경 전(컨테이너): 배치 10 고정, 파싱 실패 시 배치 전체를 한자별 개별 호출로 폴백
+# - 변경 전(Lambda)  : 배치 100 고정, 파싱 실패 시 배치 전체를 '정보 없음'으로
+# - 변경 후          : 같은 시작 배치 크기에서 자동 조절, 온전한 객체는 사용, 빠진 한자만 재요청
+# 사용법: python benchmarks/bench_enrichment_salvage.py --kanji 1000 --max-items 30 --garble-rate 0.03
+# =================================================================
+
+
+def build_single_prompt(kanji):
+    return f"다음 일본 한자에 대한 정보를 JSON 형태로 생성해주세요: {kanji}\n"
+
+
+class Legacy_Enricher(Kanji_Enricher):
+    """변경 전 동작: 고정 배치, 엄격한 JSON 파싱, 실패하면 배치 전체를 on_batch_error 로"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, adaptive=False, **kwargs)
+
+    def _run_batch(self, batch):
+        try:
+            return parse_model_json(self.generate(self.build_prompt(batch)))
+        except Exception:
+            return self.on_batch_error(batch)
+
+
+def single_fallback(enricher_ref):
+    """변경 전 컨테이너의 generate_single_fallback"""
+    def fallback(batch):
+        results = []
+        for kanji in batch:
+            try:
+                results.append(parse_model_json(enricher_ref[0].generate(build_single_prompt(kanji))))
+            except Exception:
+                results.extend(placeholder([kanji]))
+        return results
+    return fallback
+
+
+def run(name, enricher, model, kanji_list):
+    start = time.perf_counter()
+    results = enricher.enrich(kanji_list)
+    elapsed = time.perf_counter() - start
+    assert sorted(item['kanji'] for item in results) == sorted(kanji_list)
+    placeholders = sum(1 for item in results if item['means'] == '정보 없음')
+    generated = len(kanji_list) - placeholders
+    per_call = generated / model.calls if model.calls else 0
+    print(f"{name:28s}: 모델 호출 {model.calls:4d}회, '정보 없음' {placeholders:4d}개, "
+          f"호출당 생성 {per_call:5.1f}개, {elapsed:5.2f}s, 마지막 배치 크기 {enricher.batch_size}")
+    return model.calls, placeholders
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--kanji', type=int, default=1000)
+    parser.add_argument('--max-items', type=int, default=30, help='응답 하나에 담기는 최대 항목 수')
+    parser.add_argument('--garble-rate', type=float, default=0.03)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--rate', type=float, default=200.0)
+    args = parser.parse_args()
+
+    kanji_list = make_vocabulary(args.kanji)
+
+    def model():
+        return Garbled_Gemini_Model(args.latency, args.max_items, args.garble_rate)
+
+    def options():
+        return {'rate_limiter': Token_Bucket(args.rate, args.rate), 'base_delay': 0.01}
+
+    for label, batch_size in (('컨테이너', 10), ('Lambda', 100)):
+        old_model = model()
+        if batch_size == 10:
+            enricher_ref = []
+            old = Legacy_Enricher(old_model, build_prompt, single_fallback(enricher_ref),
+                                  batch_size=batch_size, **options())
+            enricher_ref.append(old)
+        else:
+            old = Legacy_Enricher(old_model, build_prompt, placeholder, batch_size=batch_size, **options())
+        old_calls, old_placeholders = run(f"{label} 변경 전 (배치 {batch_size})", old, old_model, kanji_list)
+
+        new_model = model()
+        new = Kanji_Enricher(new_model, build_prompt, placeholder, batch_size=batch_size, **options())
+        new_calls, new_placeholders = run(f"{label} 변경 후 (시작 {batch_size})", new, new_model, kanji_list)
+        print(f"  {new.stats()}")
+        # 변경 전 Lambda 는 호출 수는 적어도 잘린 배치를 전부 '정보 없음'으로 채움
+        assert new_placeholders <= old_placeholders
+        assert new_calls <= old_calls or new_placeholders < old_placeholders
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PDF_Kanji_Extractor import extract_kanji_with_pages, open_pdf  # noqa: E402
+from synthetic import make_pdf  # noqa: E402
+
+# =================================================================
+# PDF 한자 추출: 직렬 vs 멀티 프로세스 비교
+# 사용법: python benchmarks/bench_extract.py --pages 600 --workers 1 2 4
+# =================================================================
+
+
+def run(pdf_path, workers):
+    start = time.perf_counter()
+    reader = open_pdf(pdf_path)
+    kanji_list, kanji_page_map, _ = extract_kanji_with_pages(reader, pdf_path, workers)
+    elapsed = time.perf_counter() - start
+    return elapsed, len(reader.pages), kanji_list, kanji_page_map
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pages', type=int, default=600)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, 'synthetic.pdf')
+        size = make_pdf(pdf_path, pages=args.pages)
+        print(f"합성 PDF: {args.pages} 페이지, {size / 1024 / 1024:.1f} MB")
+
+        baseline = None
+        for workers in args.workers:
+            elapsed, pages_len, kanji_list, kanji_page_map = run(pdf_path, workers)
+            if baseline is None:
+                baseline = (elapsed, pages_len, set(kanji_list), dict(kanji_page_map))
+            else:
+                # 출력(pages_len / max_words / 페이지 맵)이 직렬과 같아야 함
+                assert pages_len == baseline[1]
+                assert set(kanji_list) == baseline[2]
+                assert dict(kanji_page_map) == baseline[3]
+            print(f"workers={workers}: {elapsed:.2f}s, pages_len={pages_len}, "
+                  f"max_words={len(kanji_list)}, 속도 향상 x{baseline[0] / elapsed:.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_e2e import (CONTAINER_TABLE, INPUT_BUCKET, configure_env, create_resources,  # noqa: E402
+                       quiet)
+from fakes import Fake_Gemini_Model  # noqa: E402
+from synthetic import make_corpus, make_page_lines, make_pdf_bytes, make_vocabulary  # noqa: E402
+
+# =================================================================
+# 증분 재처리: 몇 페이지만 고친 책을 다시 올렸을 때 (INCREMENTAL 모드 vs 전체 처리)
+# - 1판 처리(색인 생성) -> 일부 페이지를 새 단어가 섞인 페이지로 바꾼 2판을
+#   증분 모드와 전체 처리로 각각 처리해 시간과 결과(details)를 비교
+# - 두 판은 같은 ToUnicode CMap 을 사용 (서브셋하지 않은 글꼴)
+# - 실행마다 한자 캐시를 새로 만들어 프로세스 캐시 적중 없이 측정
+# - 글꼴 지문: 내장 CMap(/Encoding 스트림) 내용이 바뀌면 지문도 바뀜
+# - 색인 저장소: 버킷/PAGE_INDEX_DIR 이 없으면 파일을 쓰지 않고, 디렉터리는 크기 한도에서 오래된 색인부터 삭제
+# 사용법: python benchmarks/bench_incremental.py --pages 1000 --changed 1 10 100
+# =================================================================
+
+
+def revise(pages, changed, vocabulary, seed=1):
+    """changed 개 페이지를 (기존 + 새 어휘) 단어로 다시 쓴 2판"""
+    rng = random.Random(seed)
+    new_words = [word for word in make_vocabulary(200, seed=seed + 100) if word not in set(vocabulary)]
+    revised = list(pages)
+    for page_num in rng.sample(range(len(pages)), changed):
+        revised[page_num] = '\n'.join(make_page_lines(vocabulary + new_words, rng))
+    return revised
+
+
+def run(container, clients, incremental, store, verbose):
+    from Kanji_Cache import Kanji_Dictionary_Cache
+
+    container.shared_kanji_cache = Kanji_Dictionary_Cache()
+    start = time.perf_counter()
+    with quiet(not verbose):
+        instance = container.Create_Kanji_Data(clients=clients, s3_location=(INPUT_BUCKET, 'book.pdf'),
+                                               incremental=incremental, page_index_store=store)
+    return instance, time.perf_counter() - start
+
+
+def check_font_digest():
+    from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+    from Page_Index import _font_digest
+
+    def type0_font(cmap):
+        encoding = DecodedStreamObject()
+        encoding.set_data(cmap)
+        return DictionaryObject({NameObject('/Subtype'): NameObject('/Type0'),
+                                 NameObject('/BaseFont'): NameObject('/MSGothic'),
+                                 NameObject('/Encoding'): encoding})
+
+    cmap = b"1 begincidrange <0000> <00ff> 0 endcidrange"
+    assert _font_digest(type0_font(cmap)) == _font_digest(type0_font(cmap))
+    assert _font_digest(type0_font(cmap)) != _font_digest(type0_font(cmap.replace(b' 0 ', b' 256 '))), \
+        "내장 CMap 이 바뀌었는데 글꼴 지문이 같습니다"
+    print("글꼴 지문: 내장 CMap 내용 변경 감지, 확인 완료")
+
+
+def check_index_store(index_dir):
+    from Page_Index import Page_Index, Page_Index_Store
+
+    index = Page_Index(['kanji', False], [('f' * 32, {'漢字': 1})], {'漢字': ['かんじ', '한자', 'N1']})
+    cwd = os.getcwd()
+    os.chdir(index_dir)
+    try:
+        store = Page_Index_Store()
+        store.put('book.pdf', index)
+        assert os.listdir(index_dir) == [] and store.get('book.pdf') is None, \
+            "PAGE_INDEX_DIR 이 없으면 로컬에 쓰지 않아야 합니다"
+    finally:
+        os.chdir(cwd)
+
+    size = len(index.to_bytes())
+    store = Page_Index_Store(local_dir=os.path.join(index_dir, 'capped'), local_max_bytes=size * 3)
+    for i in range(6):
+        store.put(f"book_{i}.pdf", index)
+        # mtime 순서가 확실하도록 간격을 둠
+        time.sleep(0.01)
+    files = os.listdir(store.local_dir)
+    assert len(files) == 3 and sum(os.path.getsize(os.path.join(store.local_dir, f)) for f in files) <= size * 3
+    assert store.get('book_0.pdf') is None and store.get('book_5.pdf') is not None, "오래된 색인부터 삭제해야 합니다"
+    print(f"색인 저장소: 디렉터리 미지정 시 저장 안 함, 한도 {size * 3} bytes 에서 최근 3권 유지, 확인 완료")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pages', type=int, default=1000)
+    parser.add_argument('--changed', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--vocabulary', type=int, default=3000)
+    parser.add_argument('--density', type=float, default=0.5)
+    parser.add_argument('--known', type=float, default=0.5, help='처음부터 DynamoDB 에 있는 어휘 비율')
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    configure_env({'ai_rate': 20, 'ai_burst': 20, 'ai_lease': '0'})
+    import boto3
+    from moto import mock_aws
+
+    vocabulary = make_vocabulary(args.vocabulary)
+    first = make_corpus(args.pages, args.vocabulary, args.density)
+    editions = [revise(first, changed, vocabulary, seed=changed) for changed in args.changed]
+    charset = set(''.join(first + [text for pages in editions for text in pages]))
+
+    with mock_aws(), tempfile.TemporaryDirectory() as index_dir:
+        check_font_digest()
+        check_index_store(index_dir)
+        s3, dynamodb, _ = create_resources(boto3, vocabulary, args.known)
+        import Create_Kanji_Data as container
+        from Page_Index import Page_Index_Store
+
+        model = Fake_Gemini_Model(latency=args.latency)
+        clients = {'sqs': None, 'sns': None, 's3': s3, 'dynamodb': dynamodb, 'model': model}
+        print(f"{args.pages}페이지, 밀도 {args.density}, 테이블 {CONTAINER_TABLE}")
+
+        for changed, pages in zip(args.changed, editions):
+            store = Page_Index_Store(local_dir=os.path.join(index_dir, str(changed)))
+            s3.put_object(Bucket=INPUT_BUCKET, Key='book.pdf', Body=make_pdf_bytes(first, charset))
+            _, first_seconds = run(container, clients, True, store, args.verbose)
+
+            s3.put_object(Bucket=INPUT_BUCKET, Key='book.pdf', Body=make_pdf_bytes(pages, charset))
+            calls = model.calls
+            incremental, incremental_seconds = run(container, clients, True, store, args.verbose)
+            incremental_calls = model.calls - calls
+            full, full_seconds = run(container, clients, False, None, args.verbose)
+
+            assert incremental.all_data['details'] == full.all_data['details']
+            assert incremental.all_data['pages_len'] == full.all_data['pages_len'] == args.pages
+            counts = incremental.metrics.counts
+            print(f"변경 {changed:4d}페이지: 1판 {first_seconds:6.2f}s, "
+                  f"2판 전체 {full_seconds:6.2f}s, 증분 {incremental_seconds:6.2f}s "
+                  f"({full_seconds / incremental_seconds:5.1f}배), "
+                  f"지문 {incremental.metrics.timings.get('fingerprint', 0):5.3f}s, "
+                  f"추출 {counts.get('pages_extracted', '-')}페이지, "
+                  f"재사용 한자 {counts.get('kanji_reused', '-')}/{len(full.all_data['details'])}, "
+                  f"AI 호출 {incremental_calls}회, 결과 일치")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,235 @@
+import argparse
+import hashlib
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_e2e import INPUT_BUCKET, LAMBDA_TABLE, RESULTS_BUCKET, configure_env, create_resources, quiet  # noqa: E402
+from fakes import Fake_Gemini_Model  # noqa: E402
+from synthetic import make_corpus, make_pdf_bytes, make_vocabulary  # noqa: E402
+
+# =================================================================
+# 큰 PDF / 큰 한자 집합의 최대 메모리: 기본 모드 vs 저메모리 모드(LOW_MEMORY=1)
+# - 컨테이너: 2000페이지 합성 PDF 를 Create_Kanji_Data 로 처리
+# - 처리 Lambda: 한자 수만 개 + 한자별 페이지 목록이 담긴 입력 JSON 을 처리
+# - 모드/대상마다 별도 프로세스, 준비(moto, 데이터 생성) 뒤 최대 RSS 를 초기화하고
+#   처리 중 늘어난 최대 RSS 만 측정 (/proc/self/clear_refs, 없으면 ru_maxrss 차이)
+# - 두 모드의 결과(details)가 같은지 해시로 확인하고, 저메모리 모드가 대상별 한도
+#   (--budget-mb, --lambda-budget-mb)를 넘으면 실패로 종료
+# - 결과 캐시는 기본 설정 그대로 켜 두고 결과 버킷에 저장 (처음 처리하는 책이므로 미스 + 저장 경로)
+# - moto 가 같은 프로세스에서 S3/DynamoDB 를 흉내 내므로 업로드한 객체와 응답 처리 비용도
+#   측정값에 포함됨 (실제 Lambda 보다 큼)
+# 사용법: python benchmarks/bench_low_memory.py --pages 2000 --lambda-kanji 50000
+# =================================================================
+
+MODES = ('default', 'low_memory')
+
+
+def reset_peak_rss():
+    """최대 RSS(VmHWM)를 현재 값으로 초기화. 지원하지 않으면 False"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def current_rss_mb():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return peak_rss_mb()
+
+
+def details_digest(details):
+    canonical = json.dumps([dict(item.to_dict() if hasattr(item, 'to_dict') else item) for item in details],
+                           ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def measure(run):
+    """run() 동안 늘어난 최대 RSS(MB)와 시간"""
+    baseline = current_rss_mb()
+    if not reset_peak_rss():
+        baseline = peak_rss_mb()
+    start = time.perf_counter()
+    digest = run()
+    return {'seconds': round(time.perf_counter() - start, 2), 'baseline_mb': round(baseline, 1),
+            'peak_increase_mb': round(peak_rss_mb() - baseline, 1), 'digest': digest}
+
+
+def assert_cache_written(s3):
+    from Result_Cache import RESULT_CACHE_PREFIX
+
+    listed = s3.list_objects_v2(Bucket=RESULTS_BUCKET, Prefix=RESULT_CACHE_PREFIX)
+    assert listed.get('KeyCount', 0) == 1, "결과 캐시 항목이 저장되지 않았습니다"
+
+
+def run_container(args, pdf_path):
+    import boto3
+    from moto import mock_aws
+
+    with mock_aws(), quiet(not args['verbose']):
+        vocabulary = make_vocabulary(args['vocabulary'])
+        s3, dynamodb, _ = create_resources(boto3, vocabulary, 1.0)
+        with open(pdf_path, 'rb') as f:
+            s3.put_object(Bucket=INPUT_BUCKET, Key='book.pdf', Body=f.read())
+        import Create_Kanji_Data as container
+
+        clients = {'sqs': None, 'sns': None, 's3': s3, 'dynamodb': dynamodb,
+                   'model': Fake_Gemini_Model(latency=0)}
+
+        def run():
+            instance = container.Create_Kanji_Data(clients=clients, s3_location=(INPUT_BUCKET, 'book.pdf'),
+                                                   streaming=False, incremental=False)
+            return details_digest(instance.all_data['details'])
+        result = measure(run)
+        assert_cache_written(s3)
+        return result
+
+
+def make_lambda_input(kanji_count, pages):
+    """한자 kanji_count 개, 한자마다 등장 페이지 목록 (추출 Lambda 가 올리는 형식)"""
+    rng = random.Random(0)
+    vocabulary = make_vocabulary(kanji_count, seed=7)
+    rng.shuffle(vocabulary)
+    kanji_data = []
+    for kanji in vocabulary:
+        first = rng.randint(1, pages)
+        count = min(rng.randint(1, 40), pages - first + 1)
+        kanji_data.append({'kanji': kanji, 'pages': sorted(rng.sample(range(first, pages + 1), count))})
+    kanji_data.sort(key=lambda item: item['pages'][0])
+    return vocabulary, {'book_name': 's3PDF/book.pdf', 'kanji_data': kanji_data, 'total_pages': pages}
+
+
+def run_lambda(args):
+    import boto3
+    from moto import mock_aws
+
+    with mock_aws(), quiet(not args['verbose']):
+        vocabulary, data = make_lambda_input(args['lambda_kanji'], args['pages'])
+        # 한자는 모두 DynamoDB 에 있는 상태 (조회 경로만 측정)
+        s3, dynamodb, sqs = create_resources(boto3, vocabulary, 1.0)
+        s3.put_object(Bucket=INPUT_BUCKET, Key='extracted/book.json',
+                      Body=json.dumps(data, ensure_ascii=False).encode('utf-8'))
+        del data
+        os.environ['DYNAMODB_TABLE_NAME'] = LAMBDA_TABLE
+        import DynamoDB_Wtih_Lambda_S3 as processing
+
+        processing.s3_client = s3
+        processing.dynamodb_client = dynamodb
+        processing.sqs_client = sqs
+        processing.S3_RESULTS_BUCKET = RESULTS_BUCKET
+        processing.ai_coalescer.gateway.client = dynamodb
+        event = {'Records': [{'body': json.dumps({'s3_bucket': INPUT_BUCKET, 's3_key': 'extracted/book.json'})}]}
+
+        def run():
+            response = processing.lambda_handler(event, None)
+            assert not response['batchItemFailures'], "처리 Lambda 레코드 실패"
+            return None
+        result = measure(run)
+        assert_cache_written(s3)
+        from S3_Result_Writer import read_result_body
+
+        body = read_result_body(s3.get_object(Bucket=RESULTS_BUCKET, Key='processed/book.pdf'))
+        result['output_bytes'] = len(body)
+        result['digest'] = details_digest(json.loads(body)['details'])
+        return result
+
+
+def run_child(args, result_path):
+    configure_env({'ai_rate': 100, 'ai_burst': 100, 'ai_lease': '0'})
+    # bench_e2e 는 결과 캐시를 끄지만 여기서는 기본값(켜짐)으로 측정, 컨테이너도 S3 에 저장
+    os.environ.pop('RESULT_CACHE', None)
+    os.environ['RESULT_CACHE_BUCKET'] = RESULTS_BUCKET
+    os.environ['LOW_MEMORY'] = '1' if args['mode'] == 'low_memory' else '0'
+    os.environ['PIPELINE_METRICS'] = '0'
+    if args['target'] == 'container':
+        result = run_container(args, args['pdf_path'])
+    else:
+        result = run_lambda(args)
+    with open(result_path, 'w', encoding='utf-8') as f:
+        json.dump(result, f)
+
+
+def run_scenario(args):
+    fd, result_path = tempfile.mkstemp(prefix='kanji-low-memory-', suffix='.json')
+    os.close(fd)
+    try:
+        # 레코드/업로드 스레드마다 glibc malloc 아레나가 생겨 최대 RSS 가 실행마다 크게 달라지므로
+        # README 에서 권장하는 MALLOC_ARENA_MAX 로 실행 (프로세스 시작 시에만 읽음)
+        env = dict(os.environ, MALLOC_ARENA_MAX=os.getenv('MALLOC_ARENA_MAX', '2'))
+        subprocess.run([sys.executable, '-W', 'ignore::FutureWarning', os.path.abspath(__file__),
+                        '--child', json.dumps(args), result_path], check=True, env=env)
+        with open(result_path, encoding='utf-8') as f:
+            return json.load(f)
+    finally:
+        os.remove(result_path)
+
+
+def main():
+    if len(sys.argv) == 4 and sys.argv[1] == '--child':
+        run_child(json.loads(sys.argv[2]), sys.argv[3])
+        return
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pages', type=int, default=2000)
+    parser.add_argument('--vocabulary', type=int, default=3000)
+    parser.add_argument('--density', type=float, default=0.5)
+    parser.add_argument('--lambda-kanji', type=int, default=50000, help='처리 Lambda 입력의 한자 수')
+    parser.add_argument('--targets', nargs='+', choices=('container', 'lambda'), default=['container', 'lambda'])
+    parser.add_argument('--budget-mb', type=float, default=32.0, help='컨테이너 저메모리 모드의 처리 중 최대 RSS 증가 한도')
+    parser.add_argument('--lambda-budget-mb', type=float, default=160.0, help='처리 Lambda 저메모리 모드의 한도')
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    budgets = {'container': args.budget_mb, 'lambda': args.lambda_budget_mb}
+    over_budget = []
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, 'book.pdf')
+        if 'container' in args.targets:
+            with open(pdf_path, 'wb') as f:
+                f.write(make_pdf_bytes(make_corpus(args.pages, args.vocabulary, args.density)))
+            print(f"{args.pages}페이지 PDF {os.path.getsize(pdf_path) / 1024 / 1024:.1f} MB")
+
+        for target in args.targets:
+            results = {}
+            for mode in MODES:
+                results[mode] = run_scenario({
+                    'target': target, 'mode': mode, 'pages': args.pages, 'vocabulary': args.vocabulary,
+                    'lambda_kanji': args.lambda_kanji, 'pdf_path': pdf_path, 'verbose': args.verbose
+                })
+                result = results[mode]
+                output = f", 결과 JSON {result['output_bytes'] / 1024 / 1024:.1f} MB" if 'output_bytes' in result else ''
+                print(f"{target:9s} {mode:10s}: {result['seconds']:7.2f}s, 기준 {result['baseline_mb']:6.1f} MB, "
+                      f"처리 중 최대 증가 {result['peak_increase_mb']:6.1f} MB{output}")
+            assert results['default']['digest'] == results['low_memory']['digest'], f"{target} 결과가 다릅니다"
+            if results['low_memory']['peak_increase_mb'] > budgets[target]:
+                over_budget.append(target)
+
+    print(f"저메모리 모드 한도 {budgets} MB: " + (f"초과 {over_budget}" if over_budget else "모두 한도 이내"))
+    sys.exit(1 if over_budget else 0)
+
+
+if __name__ == '__main__':
+    main()
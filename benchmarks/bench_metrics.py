@@ -0,0 +1,96 @@
+import argparse
+import contextlib
+import io
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Pipeline_Metrics import Job_Metrics, Metrics_Registry  # noqa: E402
+
+# =================================================================
+# 지표 기록 비용: 단계 기록 / 카운트 / EMF 출력 / Prometheus 렌더링
+# - 켠 상태와 끈 상태(PIPELINE_METRICS=0)의 호출당 비용을 비교
+# - 여러 스레드가 같은 레지스트리에 동시에 기록할 때의 처리량
+# 파이프라인 전체 시간 차이는 bench_e2e.py 를 PIPELINE_METRICS=0/1 로 두 번 실행해서 비교
+# 사용법: python benchmarks/bench_metrics.py --ops 200000 --threads 4
+# =================================================================
+
+
+def per_call_us(func, ops):
+    start = time.perf_counter()
+    for _ in range(ops):
+        func()
+    return (time.perf_counter() - start) / ops * 1e6
+
+
+def measure(registry, ops):
+    job = Job_Metrics('bench', registry)
+
+    def stage():
+        with job.stage('extract'):
+            pass
+
+    def emit():
+        # 요청 하나 분량 (GET Lambda: 단계 2개 + 카운트 1개 + EMF 한 줄)
+        request = Job_Metrics('bench', registry)
+        with request.stage('load_book'):
+            pass
+        with request.stage('render'):
+            pass
+        request.count('book_cache_hits')
+        request.emit(status=200)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        return {
+            'stage': per_call_us(stage, ops),
+            'count': per_call_us(lambda: job.count('kanji'), ops),
+            'request+emit': per_call_us(emit, max(1, ops // 10)),
+        }
+
+
+def measure_threads(registry, ops, threads):
+    def work():
+        job = Job_Metrics('bench', registry)
+        for _ in range(ops // threads):
+            with job.stage('dynamodb_lookup'):
+                pass
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return ops / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--ops', type=int, default=200000)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--stages', type=int, default=30, help='렌더링 측정용 단계 종류 수')
+    args = parser.parse_args()
+
+    for label, enabled in (('켬', True), ('끔 (PIPELINE_METRICS=0)', False)):
+        registry = Metrics_Registry(enabled=enabled)
+        costs = measure(registry, args.ops)
+        print(f"{label:24s}: " + ', '.join(f"{name} {value:.2f} µs" for name, value in costs.items()))
+        print(f"{'':24s}  스레드 {args.threads}개 동시 기록 {measure_threads(registry, args.ops, args.threads):,.0f} 회/s")
+
+    registry = Metrics_Registry()
+    for i in range(args.stages):
+        registry.observe(f"stage_{i}", 0.01 * i, 'bench')
+        registry.increment(f"event_{i}", i, 'bench')
+    registry.add_collector('cache', lambda: {'hits': 1, 'misses': 2, 'nested': {'size': 3}})
+    start = time.perf_counter()
+    for _ in range(100):
+        text = registry.render_prometheus()
+    elapsed = (time.perf_counter() - start) / 100
+    print(f"/metrics 렌더링 (단계 {args.stages}개): {elapsed * 1000:.2f} ms, {len(text)} bytes")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,234 @@
+import argparse
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from S3_PDF_Loader import PDF_Byte_Cache, S3_PDF_Loader  # noqa: E402
+
+# =================================================================
+# S3 PDF 로더 확인 (moto S3)
+# - Range GET: 임계값 이상인 객체를 구간 크기대로 빠짐/겹침 없이 나눠 받고 원본과 같은지
+# - ETag 캐시: 두 번째 로드는 본문 GET 없이 적중, 객체를 덮어쓰면(ETag 변경) 다시 받음
+# - 잘린 구간 본문: 재시도로 복구, 계속 잘리면 오류 (0 으로 채운 PDF 를 돌려주지 않음)
+# - HEAD 뒤에 객체가 바뀌면 IfMatch 로 실패 (이전 내용을 캐시하지 않음)
+# - 캐시 크기: 로드마다 current_bytes <= max_bytes, 한도보다 큰 PDF 는 저장하지 않음
+# - 임시 파일: 로드 중 작업 디렉터리(s3PDF/)와 임시 디렉터리에 파일이 생기지 않음
+# 사용법: python benchmarks/bench_pdf_loader.py --size-kb 1024 --chunk-kb 100
+# =================================================================
+
+BUCKET = 'pdf-loader-input'
+
+
+class Counting_S3:
+    """get_object 요청(Range 포함)을 기록하는 S3 클라이언트 래퍼"""
+
+    def __init__(self, client):
+        self.client = client
+        self.gets = []
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def get_object(self, **kwargs):
+        with self._lock:
+            self.gets.append(kwargs.get('Range'))
+        return self.client.get_object(**kwargs)
+
+    def take(self):
+        with self._lock:
+            gets, self.gets = self.gets, []
+        return gets
+
+
+class Overwriting_S3(Counting_S3):
+    """HEAD 응답 직후 객체를 덮어써서 HEAD 와 GET 사이의 변경을 흉내냄"""
+
+    def __init__(self, client, new_body):
+        super().__init__(client)
+        self.new_body = new_body
+
+    def head_object(self, **kwargs):
+        head = self.client.head_object(**kwargs)
+        self.client.put_object(Body=self.new_body, **kwargs)
+        return head
+
+
+class Truncating_S3(Counting_S3):
+    """Range GET 본문을 처음 short_reads 번은 앞부분만 돌려주는 래퍼 (연결이 끊긴 응답)"""
+
+    def __init__(self, client, short_reads):
+        super().__init__(client)
+        self.short_reads = short_reads
+
+    def get_object(self, **kwargs):
+        response = super().get_object(**kwargs)
+        with self._lock:
+            truncate = self.short_reads > 0
+            self.short_reads -= 1
+        if truncate:
+            body = response['Body'].read()
+            response['Body'] = io.BytesIO(body[:len(body) // 2])
+        return response
+
+
+def payload(size, seed):
+    return bytes((i * 131 + seed) % 251 for i in range(size))
+
+
+def listing(workdir):
+    """작업 디렉터리(하위 포함)와 임시 디렉터리(최상위)의 파일 목록"""
+    files = {os.path.join(directory, name) for directory, _, names in os.walk(workdir) for name in names}
+    tmp = tempfile.gettempdir()
+    files.update(os.path.join(tmp, name) for name in os.listdir(tmp))
+    return files
+
+
+def parse_range(header):
+    start, end = header[len('bytes='):].split('-')
+    return int(start), int(end)
+
+
+def check_ranged_get(s3, size, chunk):
+    body = payload(size, 1)
+    s3.client.put_object(Bucket=BUCKET, Key='big.pdf', Body=body)
+    loader = S3_PDF_Loader(s3, cache=PDF_Byte_Cache(size * 4), range_threshold=chunk * 2, range_chunk=chunk)
+    start = time.perf_counter()
+    data = loader.load(BUCKET, 'big.pdf')
+    seconds = time.perf_counter() - start
+    ranges = sorted(parse_range(header) for header in s3.take())
+    assert data == body, "Range GET 으로 받은 내용이 원본과 다릅니다"
+    assert len(ranges) == (size + chunk - 1) // chunk, ranges
+    assert ranges[0][0] == 0 and ranges[-1][1] == size - 1
+    assert all(prev_end + 1 == next_start for (_, prev_end), (next_start, _) in zip(ranges, ranges[1:])), \
+        "구간이 빠지거나 겹쳤습니다"
+    assert all(end - start + 1 <= chunk for start, end in ranges)
+
+    s3.client.put_object(Bucket=BUCKET, Key='small.pdf', Body=body[:chunk])
+    assert loader.load(BUCKET, 'small.pdf') == body[:chunk]
+    assert s3.take() == [None], "임계값 미만은 Range 없이 한 번에 받아야 합니다"
+    print(f"Range GET: {size} bytes -> {len(ranges)}개 구간 ({seconds * 1000:.1f} ms), 임계값 미만은 GET 1회, 확인 완료")
+
+
+def check_etag_cache(s3, size):
+    cache = PDF_Byte_Cache(size * 4)
+    loader = S3_PDF_Loader(s3, cache=cache, range_threshold=size * 2)
+    first = payload(size, 2)
+    s3.client.put_object(Bucket=BUCKET, Key='book.pdf', Body=first)
+    assert loader.load(BUCKET, 'book.pdf') == first and len(s3.take()) == 1
+    assert loader.load(BUCKET, 'book.pdf') == first
+    assert s3.take() == [] and cache.hits == 1, "같은 ETag 는 본문 GET 없이 캐시에서 읽어야 합니다"
+
+    second = payload(size, 3)
+    s3.client.put_object(Bucket=BUCKET, Key='book.pdf', Body=second)
+    assert loader.load(BUCKET, 'book.pdf') == second, "덮어쓴 객체는 새 내용을 받아야 합니다"
+    assert len(s3.take()) == 1 and cache.misses == 2
+
+    # 새 로더도 같은 캐시를 공유하면 적중
+    assert S3_PDF_Loader(s3, cache=cache, range_threshold=size * 2).load(BUCKET, 'book.pdf') == second
+    assert s3.take() == [] and cache.hits == 2
+    print(f"ETag 캐시: 적중 {cache.hits}회, 객체 변경 후 미스 -> 새 내용, 확인 완료")
+
+
+def check_truncated_range(s3, size, chunk):
+    body = payload(size, 6)
+    s3.client.put_object(Bucket=BUCKET, Key='truncated.pdf', Body=body)
+    flaky = Truncating_S3(s3.client, short_reads=1)
+    loader = S3_PDF_Loader(flaky, cache=PDF_Byte_Cache(0), range_threshold=chunk * 2, range_chunk=chunk,
+                           range_workers=1)
+    assert loader.load(BUCKET, 'truncated.pdf') == body, "잘린 구간은 다시 받아야 합니다"
+
+    broken = Truncating_S3(s3.client, short_reads=10 ** 6)
+    loader = S3_PDF_Loader(broken, cache=PDF_Byte_Cache(0), range_threshold=chunk * 2, range_chunk=chunk)
+    try:
+        loader.load(BUCKET, 'truncated.pdf')
+    except IOError as e:
+        assert '길이 불일치' in str(e), e
+    else:
+        raise AssertionError("계속 잘린 본문은 오류여야 합니다")
+    print("잘린 Range GET 본문: 1회 잘림은 재시도로 복구, 계속 잘리면 IOError, 확인 완료")
+
+
+def check_changed_during_load(s3, size, chunk):
+    old, new = payload(size, 4), payload(size, 5)
+    for label, threshold in (('단일 GET', size * 2), ('Range GET', chunk * 2)):
+        s3.client.put_object(Bucket=BUCKET, Key='racing.pdf', Body=old)
+        cache = PDF_Byte_Cache(size * 4)
+        racing = Overwriting_S3(s3.client, new)
+        loader = S3_PDF_Loader(racing, cache=cache, range_threshold=threshold, range_chunk=chunk)
+        try:
+            loader.load(BUCKET, 'racing.pdf')
+        except Exception as e:
+            assert 'PreconditionFailed' in str(e) or '412' in str(e), e
+        else:
+            raise AssertionError(f"{label}: HEAD 뒤에 바뀐 객체를 받으면 안 됩니다")
+        assert cache.current_bytes == 0
+    print("HEAD 뒤 객체 변경: 단일 GET / Range GET 모두 IfMatch 로 실패, 캐시 저장 없음, 확인 완료")
+
+
+def check_cache_bound(s3, size):
+    cache = PDF_Byte_Cache(int(size * 2.5))
+    loader = S3_PDF_Loader(s3, cache=cache, range_threshold=size * 2)
+    keys = [f"bound_{index}.pdf" for index in range(5)]
+    for index, key in enumerate(keys):
+        s3.client.put_object(Bucket=BUCKET, Key=key, Body=payload(size, 10 + index))
+    for key in keys:
+        loader.load(BUCKET, key)
+        assert cache.current_bytes <= cache.max_bytes, (cache.current_bytes, cache.max_bytes)
+    s3.take()
+    assert cache.current_bytes == size * 2
+    loader.load(BUCKET, keys[-1])
+    assert s3.take() == [], "최근 항목은 캐시에 남아 있어야 합니다"
+    loader.load(BUCKET, keys[0])
+    assert len(s3.take()) == 1, "가장 오래된 항목은 밀려나야 합니다"
+
+    s3.client.put_object(Bucket=BUCKET, Key='huge.pdf', Body=payload(size * 3, 20))
+    before = cache.current_bytes
+    loader.load(BUCKET, 'huge.pdf')
+    assert cache.current_bytes == before, "한도보다 큰 PDF 는 캐시하지 않아야 합니다"
+
+    # 저메모리 모드의 컨테이너는 캐시 한도 0
+    disabled = PDF_Byte_Cache(0)
+    S3_PDF_Loader(s3, cache=disabled, range_threshold=size * 2).load(BUCKET, keys[1])
+    assert disabled.current_bytes == 0
+    s3.take()
+    print(f"캐시 크기: 한도 {cache.max_bytes} bytes 에서 최대 {size * 2} bytes 유지, 큰 PDF / 한도 0 은 저장 안 함, 확인 완료")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size-kb', type=int, default=1024, help='Range GET 확인용 PDF 크기')
+    parser.add_argument('--chunk-kb', type=int, default=100, help='Range GET 구간 크기')
+    args = parser.parse_args()
+
+    import boto3
+    from moto import mock_aws
+
+    size = args.size_kb * 1024 + 123  # 구간 크기의 배수가 아닌 크기
+    chunk = args.chunk_kb * 1024
+    with mock_aws(), tempfile.TemporaryDirectory() as workdir:
+        s3 = Counting_S3(boto3.client('s3', region_name='us-east-1'))
+        s3.client.create_bucket(Bucket=BUCKET)
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        before = listing(workdir)
+        try:
+            check_ranged_get(s3, size, chunk)
+            check_etag_cache(s3, 64 * 1024)
+            check_truncated_range(s3, 256 * 1024, 64 * 1024)
+            check_changed_during_load(s3, 256 * 1024, 64 * 1024)
+            check_cache_bound(s3, 64 * 1024)
+            created = listing(workdir) - before
+        finally:
+            os.chdir(cwd)
+    assert not created, f"로드 중 파일이 생성되었습니다: {sorted(created)[:5]}"
+    print("임시 파일: 작업 디렉터리 / 임시 디렉터리에 생성된 파일 없음, 확인 완료")
+
+
+if __name__ == '__main__':
+    main()
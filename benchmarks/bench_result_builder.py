@@ -0,0 +1,69 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Kanji_Results import build_final_details  # noqa: E402
+from fakes import fake_item  # noqa: E402
+
+# =================================================================
+# 결과 정렬/생성: 기존 list(...).index() 정렬 vs build_final_details
+# 사용법: python benchmarks/bench_result_builder.py --sizes 10000 100000 --old-max 20000
+# =================================================================
+
+
+def old_builder(kanji_data_list, all_processed_items, kanji_page_map):
+    """변경 전 lambda_handler 4단계 (O(n^2))"""
+    final_details = []
+    original_order_map = {item['kanji']: item for item in kanji_data_list}
+    sorted_processed_items = sorted(all_processed_items,
+                                    key=lambda x: list(original_order_map.keys()).index(x['kanji']['S']))
+    for idx, data in enumerate(sorted_processed_items, 1):
+        kanji = data['kanji']['S']
+        page = kanji_page_map.get(kanji, [0])[0]
+        final_details.append({
+            'vocabulary_book_order': idx, 'kanji': kanji, 'furigana': data['furigana']['S'],
+            'means': data['means']['S'], 'level': data['JLPT']['S'], 'page': page
+        })
+    return final_details
+
+
+def make_input(size):
+    kanji_order = [f"漢{i}" for i in range(size)]
+    kanji_data_list = [{'kanji': kanji, 'pages': [i // 50 + 1]} for i, kanji in enumerate(kanji_order)]
+    kanji_page_map = {item['kanji']: item['pages'] for item in kanji_data_list}
+    items = [{key: {'S': value} for key, value in fake_item(kanji).items()} for kanji in kanji_order]
+    random.Random(size).shuffle(items)  # 조회/AI 결과는 순서가 섞여서 들어옴
+    return kanji_order, kanji_data_list, kanji_page_map, items
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--old-max', type=int, default=20000, help='기존 방식은 이 크기까지만 측정')
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        kanji_order, kanji_data_list, kanji_page_map, items = make_input(size)
+
+        start = time.perf_counter()
+        new_details = build_final_details(kanji_order, items, kanji_page_map)
+        new_elapsed = time.perf_counter() - start
+        line = f"n={size}: build_final_details {new_elapsed * 1000:.1f} ms"
+
+        if size <= args.old_max:
+            start = time.perf_counter()
+            old_details = old_builder(kanji_data_list, items, kanji_page_map)
+            old_elapsed = time.perf_counter() - start
+            assert old_details == new_details
+            line += f", 기존 {old_elapsed * 1000:.1f} ms (x{old_elapsed / new_elapsed:.0f})"
+        else:
+            line += ", 기존 방식 생략 (O(n^2))"
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
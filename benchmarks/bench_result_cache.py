@@ -0,0 +1,101 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import boto3
+from moto import mock_aws
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fakes import Fake_Gemini_Model  # noqa: E402
+from synthetic import make_vocabulary  # noqa: E402
+
+# =================================================================
+# 결과 캐시: 같은 교재를 다른 이름으로 다시 올렸을 때 Lambda 처리 시간
+# moto(S3/SQS/DynamoDB) + 가짜 Gemini 모델로 lambda_handler 를 직접 호출합니다.
+# 사용법: python benchmarks/bench_result_cache.py --kanji 2000 --uploads 5
+# =================================================================
+
+REGION = 'us-east-1'
+TABLE_NAME = 'bench-kanji'
+INPUT_BUCKET = 'bench-input'
+RESULTS_BUCKET = 'bench-results'
+
+
+def setup_env():
+    os.environ.update({
+        'AWS_ACCESS_KEY_ID': 'testing', 'AWS_SECRET_ACCESS_KEY': 'testing',
+        'AWS_DEFAULT_REGION': REGION, 'DYNAMODB_TABLE_NAME': TABLE_NAME,
+        'S3_RESULTS_BUCKET': RESULTS_BUCKET,
+    })
+
+
+def create_resources():
+    s3 = boto3.client('s3', region_name=REGION)
+    s3.create_bucket(Bucket=INPUT_BUCKET)
+    s3.create_bucket(Bucket=RESULTS_BUCKET)
+    boto3.client('dynamodb', region_name=REGION).create_table(
+        TableName=TABLE_NAME,
+        KeySchema=[{'AttributeName': 'kanji', 'KeyType': 'HASH'}],
+        AttributeDefinitions=[{'AttributeName': 'kanji', 'AttributeType': 'S'}],
+        BillingMode='PAY_PER_REQUEST'
+    )
+    queue_url = boto3.client('sqs', region_name=REGION).create_queue(QueueName='bench-notify')['QueueUrl']
+    os.environ['SQS_NOTIFICATION_URL'] = queue_url
+    return s3
+
+
+def upload(s3, book_name, kanji_list, total_pages):
+    key = f"extracted/{book_name}.json"
+    data = {
+        'book_name': f"s3PDF/{book_name}.pdf",
+        'kanji_data': [{'kanji': kanji, 'pages': [i // 20 + 1]} for i, kanji in enumerate(kanji_list)],
+        'total_pages': total_pages
+    }
+    s3.put_object(Bucket=INPUT_BUCKET, Key=key, Body=json.dumps(data, ensure_ascii=False).encode('utf-8'))
+    return {'Records': [{'body': json.dumps({'s3_bucket': INPUT_BUCKET, 's3_key': key})}]}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--kanji', type=int, default=2000)
+    parser.add_argument('--uploads', type=int, default=5)
+    parser.add_argument('--latency', type=float, default=0.05, help='가짜 Gemini 호출당 지연(초)')
+    args = parser.parse_args()
+
+    setup_env()
+    with mock_aws():
+        s3 = create_resources()
+        import DynamoDB_Wtih_Lambda_S3 as handler_module
+        from S3_Result_Writer import read_result_body
+        handler_module.ai_enricher.model = Fake_Gemini_Model(latency=args.latency)
+
+        kanji_list = make_vocabulary(args.kanji)
+        results = []
+        for upload_num in range(args.uploads):
+            event = upload(s3, f"book_copy_{upload_num}", kanji_list, total_pages=args.kanji // 20)
+            start = time.perf_counter()
+            response = handler_module.lambda_handler(event, None)
+            assert not response['batchItemFailures'], "처리 Lambda 레코드 실패"
+            elapsed = time.perf_counter() - start
+            processed = json.loads(read_result_body(s3.get_object(Bucket=RESULTS_BUCKET,
+                                                                  Key=f"processed/book_copy_{upload_num}.pdf")))
+            results.append((elapsed, processed))
+
+        # 캐시 적중 결과는 book_name 외에 첫 처리 결과와 같아야 함
+        first = results[0][1]
+        for _, processed in results[1:]:
+            assert processed['details'] == first['details']
+            assert processed['book_name'] != first['book_name']
+
+        print()
+        print(f"한자 {args.kanji}개, 업로드 {args.uploads}회")
+        for upload_num, (elapsed, _) in enumerate(results):
+            print(f"업로드 {upload_num + 1}: {elapsed * 1000:.1f} ms")
+        print(f"결과 캐시: {handler_module.result_cache.stats()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+from flask import Flask, jsonify
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Kanji_Columnar import write_columnar  # noqa: E402
+from Kanji_Results import build_shards  # noqa: E402
+from Result_Store import Disk_Result_Store, Result_Store, register_result_routes  # noqa: E402
+from bench_results_api import make_book  # noqa: E402
+
+# =================================================================
+# Flask 결과 조회 부하 테스트: 기존 jsonify(all_data) vs Result_Store(직렬화된 bytes)
+# 읽기 스레드가 요청하는 동안 수집 스레드가 계속 새 책을 저장하고,
+# 응답의 book_name / max_words / details 가 서로 맞는지(중간 상태 없음) 확인합니다.
+# 디스크 저장소: 파일 이름이 같은 다른 경로의 책이 겹치지 않고, 메모리 사본은 LRU 한도 안에 유지
+# 사용법: python benchmarks/bench_result_store.py --entries 2000 --readers 4 --seconds 5
+# =================================================================
+
+CHECK_EVERY = 10
+
+
+def make_named_book(entries, book_name):
+    book = make_book(entries)
+    book['book_name'] = f"s3PDF/{book_name}"
+    for item in book['details']:
+        item['kanji'] = f"{book_name}:{item['kanji']}"
+    return book
+
+
+def check_book(body):
+    """한 응답 안의 책 이름과 details 가 모두 같은 책인지 확인"""
+    book = json.loads(body)
+    name = os.path.basename(book['book_name'])
+    assert book['max_words'] == len(book['details'])
+    assert all(item['kanji'].startswith(name + ':') for item in book['details'])
+
+
+def old_app(state):
+    """변경 전 App_Runner: 인스턴스 하나를 덮어쓰고 요청마다 jsonify"""
+    app = Flask('old')
+
+    @app.route('/api/kanji/all')
+    def kanji_all():
+        return jsonify(state['all_data'])
+    return app
+
+
+def run_load(app, paths, readers, seconds, ingest=None):
+    stop = threading.Event()
+    counts = [0] * readers
+    errors = []
+
+    def reader(idx):
+        client = app.test_client()
+        i = 0
+        while not stop.is_set():
+            path = paths[i % len(paths)]
+            response = client.get(path)
+            i += 1
+            # 응답 파싱 비용이 처리량을 가리지 않도록 일부만 검사
+            if response.status_code == 200 and i % CHECK_EVERY == 0:
+                try:
+                    check_book(response.data)
+                except AssertionError:
+                    errors.append(path)
+            counts[idx] += 1
+
+    threads = [threading.Thread(target=reader, args=(idx,)) for idx in range(readers)]
+    if ingest:
+        threads.append(threading.Thread(target=ingest, args=(stop,)))
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return sum(counts) / (time.perf_counter() - start), errors
+
+
+def check_disk_store(entries):
+    store_dir = tempfile.mkdtemp(prefix='kanji-results-')
+    try:
+        names = ['a/book.pdf', 'b/book.pdf'] + [f"c/book_{i}.pdf" for i in range(20)]
+        sample = make_named_book(entries, 'sample')
+        store = Disk_Result_Store(store_dir, max_bytes=len(json.dumps(sample)) * 3)
+        for name in names:
+            store.put(name, make_named_book(entries, name))
+        app = Flask('disk')
+        register_result_routes(app, store)
+        client = app.test_client()
+        for name in names[:2]:
+            book = json.loads(client.get(f"/api/kanji/books/{name}").data)
+            assert book['book_name'] == f"s3PDF/{name}", "같은 파일 이름의 다른 경로 책이 겹쳤습니다"
+        for name in names:
+            assert store.get(name).book_name == name
+        stats = store.stats()
+        assert stats['books'] == len(names)
+        assert stats['memory']['books'] <= 3 and stats['memory']['bytes'] <= store._memory.max_bytes
+        print(f"디스크 저장소: 번들 {stats['books']}개 (a/book.pdf, b/book.pdf 구분), "
+              f"메모리 사본 {stats['memory']['books']}개로 제한, 확인 완료")
+    finally:
+        shutil.rmtree(store_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--entries', type=int, default=2000)
+    parser.add_argument('--books', type=int, default=8)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    books = {f"book_{i}.pdf": make_named_book(args.entries, f"book_{i}.pdf") for i in range(args.books)}
+    names = list(books)
+
+    state = {'all_data': books[names[0]]}
+    rps, _ = run_load(old_app(state), ['/api/kanji/all'], args.readers, args.seconds)
+    print(f"기존 jsonify(all_data): {rps:.0f} req/s")
+
+    store = Result_Store()
+    for name, book in books.items():
+        store.put(name, book, build_shards(book), write_columnar(book))
+    app = Flask('store')
+    register_result_routes(app, store)
+
+    ingested = [0]
+
+    def ingest(stop):
+        # 처리 스레드처럼 책을 계속 새로 저장 (같은 이름 교체 + /api/kanji/all 최신 책 변경)
+        i = 0
+        while not stop.is_set():
+            name = names[i % len(names)]
+            store.put(name, books[name], build_shards(books[name]), write_columnar(books[name]))
+            ingested[0] += 1
+            i += 1
+
+    paths = ['/api/kanji/all'] + [f"/api/kanji/books/{name}" for name in names]
+    rps, errors = run_load(app, paths, args.readers, args.seconds, ingest)
+    print(f"Result_Store (수집 {ingested[0]}권 동시 진행): {rps:.0f} req/s, 불일치 응답 {len(errors)}개")
+    print(f"결과 저장소: {store.stats()}")
+    assert not errors
+    check_disk_store(args.entries // 10)
+
+
+if __name__ == '__main__':
+    main()
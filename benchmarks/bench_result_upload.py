@@ -0,0 +1,140 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_low_memory import current_rss_mb, peak_rss_mb, reset_peak_rss  # noqa: E402
+from bench_results_api import REGION, make_book  # noqa: E402
+
+# =================================================================
+# 처리 결과 업로드: 기존 방식(indent=2 문자열 + put_object) vs 스트리밍 compact JSON
+# (S3 멀티파트로 직렬화와 업로드를 겹침) vs 스트리밍 + gzip
+# - 로컬 S3 대역: moto. moto 는 같은 프로세스에서 바로 저장하므로 Bandwidth_S3 가
+#   업로드 본문 크기 / --bandwidth-mbps 만큼 기다려 네트워크 전송 시간을 흉내 냄
+#   (sleep 은 GIL 을 놓으므로 멀티파트 업로드 스레드와 직렬화가 실제로 겹침)
+# - 방식마다 별도 프로세스에서 결과 생성 뒤 최대 RSS 를 초기화하고 업로드 중 증가분만 측정
+#   (moto 가 저장한 객체도 포함되므로 저장 크기가 작을수록 유리)
+# - 업로드한 객체를 다시 읽어 원래 결과와 같은지 확인
+# 사용법: python benchmarks/bench_result_upload.py --entries 100000 --bandwidth-mbps 50
+# =================================================================
+
+RESULTS_BUCKET = 'bench-upload-results'
+OUTPUT_KEY = 'processed/big_book.pdf'
+METHODS = ('indent_put', 'stream', 'stream_gzip')
+
+
+class Bandwidth_S3:
+    """S3 클라이언트 래퍼: 본문을 올리는 요청마다 전송 시간만큼 대기"""
+
+    def __init__(self, client, megabytes_per_sec):
+        self.client = client
+        self.bytes_per_sec = megabytes_per_sec * 1024 * 1024
+        self.requests = 0
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def _transfer(self, body):
+        size = len(body.encode('utf-8')) if isinstance(body, str) else len(body)
+        self.requests += 1
+        if self.bytes_per_sec:
+            time.sleep(size / self.bytes_per_sec)
+
+    def put_object(self, **kwargs):
+        self._transfer(kwargs['Body'])
+        return self.client.put_object(**kwargs)
+
+    def upload_part(self, **kwargs):
+        self._transfer(kwargs['Body'])
+        return self.client.upload_part(**kwargs)
+
+
+def old_upload(s3, result):
+    """기존 처리 Lambda: 전체 결과를 indent=2 문자열로 만든 뒤 put_object 한 번"""
+    body = json.dumps(result, ensure_ascii=False, indent=2)
+    s3.put_object(Bucket=RESULTS_BUCKET, Key=OUTPUT_KEY, Body=body, ContentType='application/json')
+    return len(body.encode('utf-8'))
+
+
+def run_child(args, result_path):
+    import boto3
+    from moto import mock_aws
+    from S3_Result_Writer import read_result_body, upload_result_json
+
+    with mock_aws():
+        client = boto3.client('s3', region_name=REGION)
+        client.create_bucket(Bucket=RESULTS_BUCKET)
+        s3 = Bandwidth_S3(client, args['bandwidth_mbps'])
+        book = make_book(args['entries'])
+
+        baseline = current_rss_mb()
+        if not reset_peak_rss():
+            baseline = peak_rss_mb()
+        start = time.perf_counter()
+        if args['method'] == 'indent_put':
+            stored_bytes = old_upload(s3, book)
+        else:
+            upload = upload_result_json(s3, RESULTS_BUCKET, OUTPUT_KEY, book,
+                                        compress=args['method'] == 'stream_gzip',
+                                        part_size=args['part_mb'] * 1024 * 1024)
+            stored_bytes = upload['stored_bytes']
+        seconds = time.perf_counter() - start
+        peak_increase = peak_rss_mb() - baseline
+
+        stored = json.loads(read_result_body(client.get_object(Bucket=RESULTS_BUCKET, Key=OUTPUT_KEY)))
+        assert stored == book, f"{args['method']}: 업로드한 결과가 원래 결과와 다릅니다"
+
+    with open(result_path, 'w', encoding='utf-8') as f:
+        json.dump({'seconds': seconds, 'peak_increase_mb': peak_increase, 'stored_bytes': stored_bytes,
+                   'requests': s3.requests}, f)
+
+
+def run_method(args):
+    fd, result_path = tempfile.mkstemp(prefix='kanji-upload-', suffix='.json')
+    os.close(fd)
+    try:
+        subprocess.run([sys.executable, '-W', 'ignore::FutureWarning', os.path.abspath(__file__),
+                        '--child', json.dumps(args), result_path], check=True)
+        with open(result_path, encoding='utf-8') as f:
+            return json.load(f)
+    finally:
+        os.remove(result_path)
+
+
+def main():
+    if len(sys.argv) == 4 and sys.argv[1] == '--child':
+        run_child(json.loads(sys.argv[2]), sys.argv[3])
+        return
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--entries', type=int, default=100000)
+    parser.add_argument('--bandwidth-mbps', type=float, default=50.0, help='S3 업로드 대역폭 (MB/s, 0 이면 대기 없음)')
+    parser.add_argument('--part-mb', type=int, default=8, help='멀티파트 파트 크기 (MB, 최소 5)')
+    parser.add_argument('--methods', nargs='+', choices=METHODS, default=list(METHODS))
+    args = parser.parse_args()
+
+    print(f"details {args.entries}개, 대역폭 {args.bandwidth_mbps} MB/s, 파트 {args.part_mb} MB")
+    results = {}
+    for method in args.methods:
+        results[method] = result = run_method({'method': method, 'entries': args.entries,
+                                               'bandwidth_mbps': args.bandwidth_mbps, 'part_mb': args.part_mb})
+        print(f"{method:12s}: 업로드 {result['seconds']:6.2f}s, 최대 메모리 증가 {result['peak_increase_mb']:6.1f} MB, "
+              f"저장 {result['stored_bytes'] / 1024 / 1024:6.2f} MB, 요청 {result['requests']}회, 결과 일치")
+
+    if 'indent_put' in results:
+        base = results['indent_put']
+        for method in args.methods:
+            if method != 'indent_put':
+                result = results[method]
+                print(f"{method:12s} vs indent_put: 시간 {base['seconds'] / result['seconds']:4.1f}배 빠름, "
+                      f"메모리 {base['peak_increase_mb'] - result['peak_increase_mb']:+.1f} MB 절감, "
+                      f"크기 {result['stored_bytes'] / base['stored_bytes']:.0%}")
+
+
+if __name__ == '__main__':
+    main()
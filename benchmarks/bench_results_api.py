@@ -0,0 +1,134 @@
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+import boto3
+from moto import mock_aws
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fakes import fake_item  # noqa: E402
+from synthetic import make_vocabulary  # noqa: E402
+
+# =================================================================
+# 결과 조회 API(GET Lambda): 전체 JSON vs gzip / 페이지 / 레벨 필터 / 304 응답
+# 각 경우를 warm 컨테이너 책 캐시 없이(cold) / 있을 때(warm) 측정합니다.
+# moto S3 를 사용하므로 실제 S3/API Gateway 전송 시간은 응답 크기로 판단합니다.
+# 확인: 파라미터 없는 요청은 JSON 을 파싱하지 않음, gzip 응답은 다른 ETag (둘 다 304 가능),
+#       S3 에서 삭제된 결과는 404 와 함께 책 캐시에서도 제거
+# 사용법: python benchmarks/bench_results_api.py --entries 20000 --requests 20
+# =================================================================
+
+REGION = 'us-east-1'
+RESULTS_BUCKET = 'bench-results'
+BOOK_NAME = 'big_book.pdf'
+LEVELS = ['N1', 'N2', 'N3', 'N4', 'N5', 'OTHER']
+
+
+def make_book(entries):
+    details = []
+    for i, kanji in enumerate(make_vocabulary(entries), 1):
+        item = fake_item(kanji)
+        details.append({
+            'vocabulary_book_order': i, 'kanji': kanji, 'furigana': item['furigana'],
+            'means': item['means'], 'level': random.Random(i).choice(LEVELS), 'page': i // 30 + 1
+        })
+    return {'book_name': f"s3PDF/{BOOK_NAME}", 'details': details,
+            'pages_len': entries // 30 + 1, 'max_words': len(details)}
+
+
+def make_event(query=None, headers=None):
+    return {'pathParameters': {'book_name': BOOK_NAME},
+            'queryStringParameters': query, 'headers': headers or {}}
+
+
+def measure(api, event, repeat, cold):
+    timings = []
+    response = None
+    for _ in range(repeat):
+        if cold:
+            api.book_cache = api.Book_Cache()
+        start = time.perf_counter()
+        response = api.lambda_handler(event, None)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), response
+
+
+def check_cache_behaviour(api, s3):
+    object_key = f"processed/{BOOK_NAME}"
+    api.book_cache = api.Book_Cache()
+    plain = api.lambda_handler(make_event(), None)
+    entry, _ = api.book_cache.get(object_key)
+    assert entry._book is None, "파라미터 없는 요청은 JSON 을 파싱하지 않아야 합니다"
+    api.lambda_handler(make_event({'limit': '10'}), None)
+    assert entry._book is not None
+
+    gzipped = api.lambda_handler(make_event(headers={'Accept-Encoding': 'gzip'}), None)
+    etag, gzip_etag = plain['headers']['ETag'], gzipped['headers']['ETag']
+    assert gzip_etag != etag, "gzip 응답과 원문 응답의 ETag 가 같습니다"
+    for tag in (etag, gzip_etag, f"W/{gzip_etag}"):
+        response = api.lambda_handler(make_event(headers={'If-None-Match': tag}), None)
+        assert response['statusCode'] == 304 and response['headers']['ETag'] == tag.replace('W/', ''), response
+
+    # TTL 이 지난 뒤 재검증에서 객체가 없으면 404, 캐시 항목도 제거
+    body = s3.get_object(Bucket=RESULTS_BUCKET, Key=object_key)['Body'].read()
+    s3.delete_object(Bucket=RESULTS_BUCKET, Key=object_key)
+    api.book_cache.ttl = 0
+    try:
+        assert api.lambda_handler(make_event(), None)['statusCode'] == 404
+        assert api.book_cache.get(object_key) == (None, False), "삭제된 결과가 책 캐시에 남아 있습니다"
+        assert api.book_cache.current_bytes == 0
+    finally:
+        s3.put_object(Bucket=RESULTS_BUCKET, Key=object_key, Body=body)
+    print(f"책 캐시: 지연 파싱, gzip ETag {gzip_etag} / 원문 {etag} 모두 304, 삭제 후 404 + 캐시 제거, 확인 완료")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--entries', type=int, default=20000)
+    parser.add_argument('--requests', type=int, default=20)
+    args = parser.parse_args()
+
+    os.environ.update({'AWS_ACCESS_KEY_ID': 'testing', 'AWS_SECRET_ACCESS_KEY': 'testing',
+                       'AWS_DEFAULT_REGION': REGION, 'S3_RESULTS_BUCKET': RESULTS_BUCKET})
+    with mock_aws():
+        s3 = boto3.client('s3', region_name=REGION)
+        s3.create_bucket(Bucket=RESULTS_BUCKET)
+        # 처리 Lambda 와 같은 형식(indent=2)으로 저장
+        s3.put_object(Bucket=RESULTS_BUCKET, Key=f"processed/{BOOK_NAME}",
+                      Body=json.dumps(make_book(args.entries), ensure_ascii=False, indent=2).encode('utf-8'))
+        import API_Gateway_With_Lambda_S3 as api
+        # 핸들러의 이벤트 로그 출력은 측정에서 제외
+        api.print = lambda *a, **k: None
+
+        etag = api.lambda_handler(make_event(), None)['headers']['ETag']
+        gzip_headers = {'Accept-Encoding': 'gzip, deflate'}
+        cases = [
+            ('전체 (기존 동작)', make_event()),
+            ('전체 + gzip', make_event(headers=gzip_headers)),
+            ('limit=100', make_event({'offset': '0', 'limit': '100'})),
+            ('limit=100 + gzip', make_event({'offset': '0', 'limit': '100'}, gzip_headers)),
+            ('level=N1 + gzip', make_event({'level': 'N1'}, gzip_headers)),
+            ('If-None-Match (304)', make_event(headers={'If-None-Match': etag})),
+        ]
+
+        baseline = None
+        for name, event in cases:
+            cold_elapsed, _ = measure(api, event, args.requests, cold=True)
+            api.book_cache = api.Book_Cache()
+            elapsed, response = measure(api, event, args.requests, cold=False)
+            size = len(response['body'].encode('utf-8'))
+            baseline = baseline or size
+            print(f"{name:22s} status={response['statusCode']} 응답 {size / 1024:8.1f} KB "
+                  f"(x{baseline / max(size, 1):.0f} 감소), p50 cold {cold_elapsed * 1000:6.1f} ms / "
+                  f"warm {elapsed * 1000:6.2f} ms")
+        print(f"책 캐시: {api.book_cache.stats()}")
+        check_cache_behaviour(api, s3)
+
+
+if __name__ == '__main__':
+    main()
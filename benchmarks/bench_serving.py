@@ -0,0 +1,158 @@
+import argparse
+import http.client
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Kanji_Columnar import write_columnar  # noqa: E402
+from Kanji_Results import build_shards  # noqa: E402
+from Result_Store import Disk_Result_Store  # noqa: E402
+from bench_result_store import make_named_book  # noqa: E402
+
+# =================================================================
+# 서빙 모드 비교: 기동 시간과 결과 조회 처리량
+# - 기동: Create_Kanji_Data import(boto3/Gemini/pypdf 포함) 후 앱 생성 vs Kanji_API_Server 만 import
+# - 처리량: Flask 개발 서버(1 프로세스) vs gunicorn 멀티 워커 (설치되어 있을 때)
+#   두 서버 모두 같은 디스크 결과 저장소(RESULT_STORE_DIR)를 읽음
+# 사용법: python benchmarks/bench_serving.py --entries 2000 --books 8 --workers 4 --seconds 5
+# =================================================================
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STARTUP_SNIPPETS = {
+    'Create_Kanji_Data (기존 import 경로)': "import Create_Kanji_Data; Create_Kanji_Data.create_app()",
+    'Kanji_API_Server (앱 팩토리)': "import Kanji_API_Server; Kanji_API_Server.create_app()",
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def measure_startup(snippet, env, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', snippet], cwd=ROOT, env=env, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def wait_ready(port, timeout=30):
+    """서버가 첫 응답을 줄 때까지 대기하고 걸린 시간 반환"""
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/')
+            conn.getresponse().read()
+            conn.close()
+            return time.perf_counter() - start
+        except OSError:
+            time.sleep(0.02)
+    raise RuntimeError(f"서버가 {timeout}초 안에 뜨지 않았습니다 (port {port})")
+
+
+def run_load(port, paths, clients, seconds):
+    stop = threading.Event()
+    counts = [0] * clients
+    errors = []
+
+    def client(idx):
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+        i = idx
+        while not stop.is_set():
+            try:
+                conn.request('GET', paths[i % len(paths)])
+                response = conn.getresponse()
+                response.read()
+                if response.status != 200:
+                    errors.append(response.status)
+                if response.will_close:
+                    conn.close()
+                    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+            except (OSError, http.client.HTTPException) as e:
+                errors.append(repr(e))
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+            i += 1
+            counts[idx] += 1
+        conn.close()
+
+    threads = [threading.Thread(target=client, args=(idx,)) for idx in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return sum(counts) / (time.perf_counter() - start), errors
+
+
+def serve(name, command, env, paths, args):
+    port = free_port()
+    command = [part.replace('{port}', str(port)) for part in command]
+    process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        ready = wait_ready(port)
+        rps, errors = run_load(port, paths, args.clients, args.seconds)
+    finally:
+        process.terminate()
+        process.wait()
+    print(f"{name:28s}: 첫 응답까지 {ready:.2f}s, {rps:7.0f} req/s, 오류 {len(errors)}개")
+    assert not errors, errors[:5]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--entries', type=int, default=2000)
+    parser.add_argument('--books', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    store_dir = tempfile.mkdtemp(prefix='kanji-results-')
+    env = dict(os.environ, RESULT_STORE_DIR=store_dir, PYTHONPATH=ROOT)
+    try:
+        # 수집 워커 프로세스가 만든 것과 같은 디스크 저장소 준비
+        store = Disk_Result_Store(store_dir)
+        names = [f"book_{i}.pdf" for i in range(args.books)]
+        for name in names:
+            book = make_named_book(args.entries, name)
+            store.put(name, book, build_shards(book), write_columnar(book))
+
+        for name, snippet in STARTUP_SNIPPETS.items():
+            print(f"기동 {name:34s}: {measure_startup(snippet, env, args.repeat):.2f}s")
+
+        paths = ['/api/kanji/all'] + [f"/api/kanji/books/{name}" for name in names]
+        serve('Flask 개발 서버 (1 프로세스)',
+              [sys.executable, '-c', "import Kanji_API_Server; "
+               "Kanji_API_Server.create_app().run(host='127.0.0.1', port={port})"],
+              env, paths, args)
+        if shutil.which('gunicorn'):
+            serve(f"gunicorn -w {args.workers}",
+                  ['gunicorn', '-w', str(args.workers), '-b', '127.0.0.1:{port}', 'Kanji_API_Server:create_app()'],
+                  env, paths, args)
+        else:
+            print("gunicorn 이 설치되어 있지 않아 멀티 워커 측정은 건너뜁니다.")
+        print(f"CPU {os.cpu_count()}개 (멀티 워커 이득은 CPU 수에 비례)")
+    finally:
+        shutil.rmtree(store_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Kanji_Results import build_shards, dumps_compact  # noqa: E402
+from bench_results_api import make_book  # noqa: E402
+
+# =================================================================
+# 레벨/페이지 구간 샤드: 전체 JSON(indent=2) 대비 크기와 파싱 시간
+# 사용법: python benchmarks/bench_shards.py --entries 20000
+# =================================================================
+
+
+def parse_time(body, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        json.loads(body)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def with_pageless_tail(book, count=3):
+    """AI 가 다른 한자로 돌려준 항목처럼 page 0 항목이 details 끝에 붙은 결과"""
+    tail = [dict(item, kanji=item['kanji'] + '々', page=0) for item in book['details'][:count]]
+    return dict(book, details=book['details'] + tail)
+
+
+def check_manifest(book, shards):
+    """레벨 샤드를 합치면 전체 details 와 같고, 페이지 샤드는 manifest runs 구간을 이은 것"""
+    details = book['details']
+    manifest = shards['manifest']
+    level_items = [item for info in manifest['levels'].values() for item in shards[info['shard']]['details']]
+    assert len(level_items) == len(details)
+    assert sorted(map(id, level_items)) == sorted(map(id, details))
+    covered = 0
+    for block in manifest['page_blocks']:
+        expected = [item for offset, count in block['runs'] for item in details[offset:offset + count]]
+        assert shards[block['shard']]['details'] == expected, block['shard']
+        assert block['count'] == len(expected)
+        covered += len(expected)
+    assert covered == len(details)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--entries', type=int, default=20000)
+    args = parser.parse_args()
+
+    book = make_book(args.entries)
+    full_body = json.dumps(book, ensure_ascii=False, indent=2).encode('utf-8')
+
+    start = time.perf_counter()
+    shards = build_shards(book)
+    bodies = {name: dumps_compact(data).encode('utf-8') for name, data in shards.items()}
+    build_elapsed = time.perf_counter() - start
+
+    check_manifest(book, shards)
+    # 페이지 정보 없이(page 0) 끝에 붙은 항목이 있어도 구간 runs 가 맞아야 함
+    tailed = with_pageless_tail(book)
+    tailed_shards = build_shards(tailed)
+    check_manifest(tailed, tailed_shards)
+    assert len(tailed_shards['manifest']['page_blocks'][0]['runs']) == 2
+
+    full_parse = parse_time(full_body)
+    print(f"전체 JSON(indent=2): {len(full_body) / 1024:.1f} KB, 파싱 {full_parse * 1000:.1f} ms")
+    print(f"샤드 생성+직렬화: {build_elapsed * 1000:.1f} ms, 샤드 {len(shards) - 1}개, "
+          f"manifest {len(bodies['manifest']) / 1024:.1f} KB")
+    for name in ['level/N1', 'level/N5', shards['manifest']['page_blocks'][0]['shard']]:
+        body = bodies[name]
+        elapsed = parse_time(body)
+        print(f"{name:12s}: {len(body) / 1024:8.1f} KB (x{len(full_body) / len(body):.0f} 감소), "
+              f"파싱 {elapsed * 1000:.2f} ms (x{full_parse / elapsed:.0f})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+import boto3
+from moto import mock_aws
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Kanji_Cache  # noqa: E402
+from Kanji_Cache import Kanji_Dictionary_Cache  # noqa: E402
+from Kanji_Snapshot import Kanji_Snapshot, refresh_snapshot, write_snapshot  # noqa: E402
+from fakes import fake_item  # noqa: E402
+from synthetic import make_vocabulary  # noqa: E402
+
+# =================================================================
+# 한자 조회 시간: DynamoDB batch_get_item (moto) vs mmap 스냅샷
+# moto 는 프로세스 내부 호출이라 실제 네트워크 왕복(수~수십 ms/배치)은 포함되지 않습니다.
+# 사용법: python benchmarks/bench_snapshot.py --table-size 20000 --lookups 2000
+# =================================================================
+
+TABLE_NAME = 'bench-kanji'
+
+
+def create_table(dynamodb, items):
+    dynamodb.create_table(
+        TableName=TABLE_NAME,
+        KeySchema=[{'AttributeName': 'kanji', 'KeyType': 'HASH'}],
+        AttributeDefinitions=[{'AttributeName': 'kanji', 'AttributeType': 'S'}],
+        BillingMode='PAY_PER_REQUEST'
+    )
+    for i in range(0, len(items), 25):
+        dynamodb.batch_write_item(RequestItems={TABLE_NAME: [
+            {'PutRequest': {'Item': {key: {'S': value} for key, value in item.items()}}}
+            for item in items[i:i + 25]
+        ]})
+
+
+def lookup_dynamodb(dynamodb, kanji_list):
+    found = 0
+    for i in range(0, len(kanji_list), 100):
+        keys = [{'kanji': {'S': kanji}} for kanji in kanji_list[i:i + 100]]
+        response = dynamodb.batch_get_item(RequestItems={TABLE_NAME: {'Keys': keys}})
+        found += len(response['Responses'][TABLE_NAME])
+    return found
+
+
+def lookup_snapshot(snapshot, kanji_list):
+    return sum(1 for kanji in kanji_list if snapshot.get(kanji) is not None)
+
+
+def check_reload(path, vocabulary, lookups, reloads=5, threads=4):
+    """조회 스레드가 도는 중에 스냅샷 파일을 교체: 조회는 계속 성공하고 교체된 스냅샷(mmap)은 닫힘
+
+    파일 하나당 재로드는 한 번만 (같은 version 을 두 번 열지 않음)
+    """
+    opened = []
+
+    class Counting_Snapshot(Kanji_Snapshot):
+        def __init__(self, *args):
+            super().__init__(*args)
+            opened.append(self.version)
+
+    Kanji_Cache.Kanji_Snapshot = Counting_Snapshot
+    cache = Kanji_Dictionary_Cache(table_snapshot=Kanji_Snapshot(path))
+    seen = [cache.table_snapshot]
+    errors = []
+    stop = threading.Event()
+
+    def reader():
+        try:
+            while not stop.is_set():
+                found, missing = cache.get_many(lookups)
+                assert not missing and len(found) == len(lookups)
+        except Exception as e:
+            errors.append(e)
+
+    workers = [threading.Thread(target=reader) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for version in range(2, reloads + 2):
+        write_snapshot([fake_item(kanji) for kanji in vocabulary], path, version=version)
+        deadline = time.time() + 5
+        while cache.table_snapshot.version != version and time.time() < deadline:
+            time.sleep(0.01)
+        seen.append(cache.table_snapshot)
+    stop.set()
+    for worker in workers:
+        worker.join()
+    Kanji_Cache.Kanji_Snapshot = Kanji_Snapshot
+
+    assert not errors, errors[:3]
+    assert opened == list(range(2, reloads + 2)), f"같은 스냅샷을 여러 번 재로드: {opened}"
+    assert [snapshot.version for snapshot in seen][1:] == list(range(2, reloads + 2))
+    assert all(snapshot._mm.closed for snapshot in seen[:-1]), "교체된 스냅샷이 닫히지 않았습니다"
+    assert not seen[-1]._mm.closed and not cache._snapshot_users
+    print(f"스냅샷 재로드: 조회 스레드 {threads}개 실행 중 {reloads}회 교체, 조회 오류 0개, 이전 스냅샷 {reloads}개 모두 닫힘")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--table-size', type=int, default=20000)
+    parser.add_argument('--lookups', type=int, default=2000)
+    args = parser.parse_args()
+
+    vocabulary = make_vocabulary(args.table_size)
+    lookups = random.Random(1).sample(vocabulary, args.lookups)
+
+    with mock_aws(), tempfile.TemporaryDirectory() as tmp:
+        dynamodb = boto3.client('dynamodb', region_name='us-east-1')
+        create_table(dynamodb, [fake_item(kanji) for kanji in vocabulary])
+        path = os.path.join(tmp, 'kanji_snapshot.bin')
+
+        start = time.perf_counter()
+        refresh_snapshot(path, TABLE_NAME, dynamodb, segments=4)
+        print(f"스냅샷 생성: {time.perf_counter() - start:.2f}s, {os.path.getsize(path) / 1024:.0f} KB")
+
+        start = time.perf_counter()
+        snapshot = Kanji_Snapshot(path)
+        print(f"스냅샷 로드(mmap): {(time.perf_counter() - start) * 1000:.2f} ms")
+
+        start = time.perf_counter()
+        found_db = lookup_dynamodb(dynamodb, lookups)
+        db_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        found_snapshot = lookup_snapshot(snapshot, lookups)
+        snapshot_elapsed = time.perf_counter() - start
+
+        assert found_db == found_snapshot == args.lookups
+        print(f"DynamoDB batch_get_item: {db_elapsed * 1000:.1f} ms ({args.lookups}개)")
+        print(f"스냅샷 조회: {snapshot_elapsed * 1000:.1f} ms ({args.lookups}개), "
+              f"x{db_elapsed / snapshot_elapsed:.0f}")
+        snapshot.close()
+        check_reload(path, vocabulary, lookups)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import boto3
+from moto import mock_aws
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from SQS_Consumer_Pool import SQS_Consumer_Pool  # noqa: E402
+
+# =================================================================
+# SQS 소비자 풀 처리량 (books/min) - moto SQS 사용
+# 책 한 권 처리는 --book-seconds 동안 sleep 하는 핸들러로 대체합니다.
+# 이어서 삭제 실패 처리를 확인: Failed 로 돌아온 항목은 한 번 더 삭제하고, 계속 실패하는 메시지만
+# 로그 후 재전달. S3 이벤트가 아닌 메시지(형식 오류, s3:TestEvent)는 수집 워커가 삭제
+# 사용법: python benchmarks/bench_sqs_pool.py --books 40 --workers 1 2 4 8
+# =================================================================
+
+
+def s3_event_body(bucket, key):
+    s3_event = {'Records': [{'s3': {'bucket': {'name': bucket}, 'object': {'key': key}}}]}
+    return json.dumps({'Message': json.dumps(s3_event)})
+
+
+def run(workers, books, book_seconds):
+    sqs = boto3.client('sqs', region_name='us-east-1')
+    queue_url = sqs.create_queue(QueueName=f'bench-pdf-{workers}')['QueueUrl']
+    for i in range(0, books, 10):
+        sqs.send_message_batch(QueueUrl=queue_url, Entries=[
+            {'Id': str(n), 'MessageBody': s3_event_body('bench-bucket', f'book-{n}.pdf')}
+            for n in range(i, min(i + 10, books))
+        ])
+
+    def handler(message):
+        time.sleep(book_seconds)
+        return True
+
+    pool = SQS_Consumer_Pool(sqs, queue_url, handler, workers=workers, wait_time=1)
+    start = time.perf_counter()
+    pool.start()
+    while pool.processed + pool.failed < books:
+        time.sleep(0.05)
+    elapsed = time.perf_counter() - start
+    pool.stop()
+    return elapsed
+
+
+class Failing_Delete_SQS:
+    """delete_message_batch 에서 flaky 책은 첫 시도만, stuck 책은 항상 Failed 로 돌려주는 래퍼"""
+
+    def __init__(self, client, flaky, stuck):
+        self.client = client
+        self.flaky = set(flaky)
+        self.stuck = set(stuck)
+        self.books = {}  # ReceiptHandle -> 책 이름 (핸들러가 기록)
+        self.delete_calls = 0
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def delete_message_batch(self, QueueUrl, Entries):
+        self.delete_calls += 1
+        failing = []
+        for entry in Entries:
+            book = self.books[entry['ReceiptHandle']]
+            if book in self.stuck or book in self.flaky:
+                self.flaky.discard(book)
+                failing.append(entry)
+        sent = [entry for entry in Entries if entry not in failing]
+        response = self.client.delete_message_batch(QueueUrl=QueueUrl, Entries=sent) if sent else {}
+        response['Failed'] = response.get('Failed', []) + [
+            {'Id': entry['Id'], 'SenderFault': False, 'Code': 'InternalError', 'Message': 'fake'} for entry in failing
+        ]
+        return response
+
+
+def check_delete_failures(books=6):
+    sqs = boto3.client('sqs', region_name='us-east-1')
+    queue_url = sqs.create_queue(QueueName='bench-pdf-deletes')['QueueUrl']
+    sqs.send_message_batch(QueueUrl=queue_url, Entries=[
+        {'Id': str(n), 'MessageBody': s3_event_body('bench-bucket', f'book-{n}.pdf')} for n in range(books)
+    ])
+    proxy = Failing_Delete_SQS(sqs, flaky={'book-1.pdf', 'book-2.pdf'}, stuck={'book-3.pdf'})
+
+    def handler(message):
+        s3_event = json.loads(json.loads(message['Body'])['Message'])
+        proxy.books[message['ReceiptHandle']] = s3_event['Records'][0]['s3']['object']['key']
+        return True
+
+    pool = SQS_Consumer_Pool(proxy, queue_url, handler, workers=books, visibility_timeout=2, wait_time=1)
+    thread = pool.start()
+    while pool.processed < books:
+        time.sleep(0.05)
+    pool.stop()
+    thread.join()
+    assert pool.delete_failures == 1, pool.delete_failures
+
+    # 삭제하지 못한 메시지만 가시성 만료 후 다시 보임
+    redelivered = sqs.receive_message(QueueUrl=queue_url, MaxNumberOfMessages=10, WaitTimeSeconds=3)['Messages']
+    keys = [json.loads(json.loads(m['Body'])['Message'])['Records'][0]['s3']['object']['key'] for m in redelivered]
+    assert keys == ['book-3.pdf'], keys
+    print(f"삭제 실패 처리: Failed 3건 중 2건은 재시도로 삭제, 1건만 로그 후 재전달 "
+          f"(delete_message_batch {proxy.delete_calls}회), 확인 완료")
+
+    from Create_Kanji_Data import Ingestion_Worker
+
+    invalid = [{'MessageId': 'bad-json', 'Body': 'not-json'},
+               {'MessageId': 'test-event', 'Body': json.dumps({'Message': json.dumps(
+                   {'Service': 'Amazon S3', 'Event': 's3:TestEvent'})})},
+               {'MessageId': 'no-sns', 'Body': json.dumps({'Records': []})}]
+    # 형식 오류 메시지는 self 를 쓰기 전에 반환
+    assert all(Ingestion_Worker.process_message(None, message) is True for message in invalid)
+    print(f"S3 이벤트가 아닌 메시지 {len(invalid)}개: 삭제(True), 확인 완료")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--books', type=int, default=40)
+    parser.add_argument('--book-seconds', type=float, default=0.5)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    with mock_aws():
+        for workers in args.workers:
+            elapsed = run(workers, args.books, args.book_seconds)
+            print(f"workers={workers}: {args.books}권 {elapsed:.2f}s, "
+                  f"{args.books / elapsed * 60:.1f} books/min")
+        check_delete_failures()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+import argparse
+import os
+import re
+import sys
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Kanji_Tokenizer import PATTERNS, Kanji_Tokenizer  # noqa: E402
+from synthetic import make_corpus  # noqa: E402
+
+# =================================================================
+# 텍스트 토크나이저: 기존 re.findall(패턴 문자열) vs Kanji_Tokenizer
+# - 기본 설정(kanji, 정규화 꺼짐)은 기존 방식과 단어 집합 / 첫 페이지가 같아야 함
+# - 처리 속도는 기존 루프와 비슷한 수준 (정규화/katakana/compound 모드는 더 느림)
+# 사용법: python benchmarks/bench_tokenizer.py --pages 2000 --repeat 3
+# =================================================================
+
+OLD_PATTERN = r'[一-鿿]+(?:[぀-ゟ]+[一-鿿]*)*'
+
+
+def old_extract(pages):
+    """변경 전 방식: 매 페이지 findall + strip, 등장할 때마다 페이지 번호 추가"""
+    kanji_set = set()
+    kanji_page_map = defaultdict(list)
+    for page_num, text in enumerate(pages):
+        for kanji in re.findall(OLD_PATTERN, text):
+            kanji = kanji.strip()
+            if kanji:
+                kanji_set.add(kanji)
+                kanji_page_map[kanji].append(page_num + 1)
+    return kanji_set, kanji_page_map
+
+
+def new_extract(pages, tokenizer):
+    """extract_kanji_with_pages 와 같은 집계 (페이지당 한 번 기록)"""
+    kanji_page_map = defaultdict(list)
+    for page_num, text in enumerate(pages):
+        for kanji in tokenizer.count_page(text):
+            kanji_page_map[kanji].append(page_num + 1)
+    return kanji_page_map
+
+
+def best_of(repeat, fn, *args):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pages', type=int, default=2000)
+    parser.add_argument('--vocabulary', type=int, default=3000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    pages = make_corpus(args.pages, args.vocabulary)
+    megabytes = sum(len(text.encode('utf-8')) for text in pages) / 1024 / 1024
+    print(f"합성 코퍼스: {args.pages} 페이지, {megabytes:.1f} MB")
+
+    elapsed, (old_set, old_map) = best_of(args.repeat, old_extract, pages)
+    old_entries = sum(len(page_list) for page_list in old_map.values())
+    print(f"기존: {megabytes / elapsed:.1f} MB/s, 단어 {len(old_set)}개, 페이지 맵 항목 {old_entries}개")
+
+    default = Kanji_Tokenizer()
+    for mode in PATTERNS:
+        for normalize in (False, True):
+            tokenizer = Kanji_Tokenizer(mode, normalize)
+            elapsed, new_map = best_of(args.repeat, new_extract, pages, tokenizer)
+            entries = sum(len(page_list) for page_list in new_map.values())
+            if mode == 'kanji':
+                # 첫 페이지와 단어 집합은 기존 방식과 같아야 함
+                assert set(new_map) == old_set
+                assert all(new_map[kanji][0] == old_map[kanji][0] for kanji in old_set)
+            if (mode, normalize) == (default.mode, default.normalize):
+                assert not normalize, "NFKC 정규화는 기본값이 아니어야 합니다"
+            label = ' (기본)' if (mode, normalize) == (default.mode, default.normalize) else ''
+            print(f"{mode:9s} normalize={int(normalize)}{label}: {megabytes / elapsed:.1f} MB/s, "
+                  f"단어 {len(new_map)}개, 페이지 맵 항목 {entries}개 "
+                  f"(기존 대비 {entries / old_entries:.0%})")
+
+
+if __name__ == '__main__':
+    main()
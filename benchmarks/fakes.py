@@ -0,0 +1,88 @@
+import json
+import random
+import re
+import threading
+import time
+
+# =================================================================
+# 벤치마크용 가짜 Gemini 모델 (네트워크 없이 결정적 응답)
+# =================================================================
+
+PROMPT_KANJI_PATTERN = re.compile(r'생성해주세요: (.+)')
+
+
+class Fake_Response:
+    def __init__(self, text):
+        self.text = text
+
+
+class Fake_Quota_Error(Exception):
+    def __init__(self):
+        super().__init__("429 ResourceExhausted: quota exceeded (fake)")
+
+
+class Fake_Gemini_Model:
+    """프롬프트 첫 줄의 한자 목록에 대해 JSON 배열(또는 단일 객체)을 반환
+
+    latency: 호출당 지연(초), quota_error_rate: 429 오류 비율
+    """
+
+    def __init__(self, latency=0.2, quota_error_rate=0.0, seed=0):
+        self.latency = latency
+        self.quota_error_rate = quota_error_rate
+        self.calls = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt):
+        with self._lock:
+            self.calls += 1
+            quota_error = self._rng.random() < self.quota_error_rate
+        time.sleep(self.latency)
+        if quota_error:
+            raise Fake_Quota_Error()
+
+        kanji_list = [k.strip() for k in PROMPT_KANJI_PATTERN.search(prompt).group(1).split(',')]
+        items = [fake_item(kanji) for kanji in kanji_list]
+        if '배열' not in prompt.split('\n')[0]:
+            return Fake_Response(json.dumps(items[0], ensure_ascii=False))
+        return Fake_Response("```json\n" + json.dumps(items, ensure_ascii=False) + "\n```")
+
+
+def fake_item(kanji):
+    level = f"N{sum(map(ord, kanji)) % 5 + 1}"
+    return {"kanji": kanji, "furigana": "よみ", "means": f"{kanji} 의미", "JLPT": level}
+
+
+class Garbled_Gemini_Model(Fake_Gemini_Model):
+    """출력 한도와 깨진 응답을 흉내내는 가짜 모델
+
+    max_items 개를 넘는 배열은 그 위치에서 잘리고(출력 토큰 한도), 각 항목은
+    garble_rate 확률로 JSON 이 깨집니다. 지연은 latency + 항목 수 * item_latency.
+    """
+
+    def __init__(self, latency=0.2, max_items=30, garble_rate=0.03, item_latency=0.0, seed=0):
+        super().__init__(latency, 0.0, seed)
+        self.max_items = max_items
+        self.garble_rate = garble_rate
+        self.item_latency = item_latency
+
+    def generate_content(self, prompt):
+        kanji_list = [k.strip() for k in PROMPT_KANJI_PATTERN.search(prompt).group(1).split(',')]
+        with self._lock:
+            self.calls += 1
+            garbled = [self._rng.random() < self.garble_rate for _ in kanji_list]
+        time.sleep(self.latency + self.item_latency * len(kanji_list))
+
+        parts = []
+        for kanji, broken in zip(kanji_list, garbled):
+            text = json.dumps(fake_item(kanji), ensure_ascii=False)
+            # 따옴표 하나가 빠진 항목
+            parts.append(text.replace('"furigana"', '"furigana', 1) if broken else text)
+        if '배열' not in prompt.split('\n')[0]:
+            return Fake_Response(parts[0])
+        text = "```json\n[" + ",\n".join(parts[:self.max_items])
+        if len(parts) > self.max_items:
+            # 다음 항목 중간에서 잘림
+            return Fake_Response(text + ",\n" + parts[self.max_items][:len(parts[self.max_items]) // 2])
+        return Fake_Response(text + "]\n```")
@@ -0,0 +1,118 @@
+import random
+
+# =================================================================
+# 벤치마크용 합성 데이터 (일본어 텍스트, 다중 페이지 PDF)
+# 외부 폰트/라이브러리 없이 ToUnicode CMap 만으로 텍스트 추출이 가능한 PDF를 만듭니다.
+# =================================================================
+
+HIRAGANA = [chr(c) for c in range(0x3042, 0x3094)]
+
+
+def make_vocabulary(size=3000, seed=0):
+    """한자(+오쿠리가나) 단어 목록 생성"""
+    rng = random.Random(seed)
+    words = set()
+    while len(words) < size:
+        kanji = ''.join(chr(rng.randint(0x4E00, 0x9FA5)) for _ in range(rng.randint(1, 3)))
+        if rng.random() < 0.4:
+            kanji += ''.join(rng.choice(HIRAGANA) for _ in range(rng.randint(1, 2)))
+        words.add(kanji)
+    return sorted(words)
+
+
+def make_page_lines(vocabulary, rng, lines=30, words_per_line=8, density=0.5):
+    """한 페이지 분량의 텍스트 줄 생성 (density = 한자 단어 비율)"""
+    page_lines = []
+    for _ in range(lines):
+        parts = []
+        for _ in range(words_per_line):
+            if rng.random() < density:
+                parts.append(rng.choice(vocabulary))
+            else:
+                parts.append(''.join(rng.choice(HIRAGANA) for _ in range(rng.randint(2, 4))))
+            parts.append('、')
+        page_lines.append(''.join(parts))
+    return page_lines
+
+
+def make_corpus(pages=100, vocabulary_size=3000, density=0.5, seed=0):
+    """페이지별 텍스트 목록 생성"""
+    rng = random.Random(seed)
+    vocabulary = make_vocabulary(vocabulary_size, seed)
+    return ['\n'.join(make_page_lines(vocabulary, rng, density=density)) for _ in range(pages)]
+
+
+def _to_unicode_cmap(chars):
+    # CID = UTF-16BE 코드 유닛, 실제 사용된 문자만 매핑 (CMap 파싱 비용 최소화)
+    entries = [f"<{ord(c):04X}> <{ord(c):04X}>" for c in sorted(chars)]
+    blocks = []
+    for i in range(0, len(entries), 100):
+        chunk = entries[i:i + 100]
+        blocks.append(f"{len(chunk)} beginbfchar\n" + "\n".join(chunk) + "\nendbfchar")
+    return ("/CIDInit /ProcSet findresource begin\n12 dict begin\nbegincmap\n"
+            "/CIDSystemInfo << /Registry (Adobe) /Ordering (UCS) /Supplement 0 >> def\n"
+            "/CMapName /Adobe-Identity-UCS def\n/CMapType 2 def\n"
+            "1 begincodespacerange\n<0000> <FFFF>\nendcodespacerange\n"
+            + "\n".join(blocks) +
+            "\nendcmap\nCMapName currentdict /CMap defineresource pop\nend\nend\n")
+
+
+def make_pdf_bytes(page_texts, charset=None):
+    """페이지별 텍스트로 PDF 바이트 생성
+
+    charset 을 넘기면 ToUnicode CMap 을 그 문자들로 만듭니다 (서브셋하지 않은 글꼴처럼
+    판이 바뀌어도 같은 글꼴 데이터를 쓰는 PDF).
+    """
+    objects = []
+
+    def add(body):
+        objects.append(body)
+        return len(objects)
+
+    catalog_id = add(None)
+    pages_id = add(None)
+    chars = set(charset) if charset is not None else set(''.join(page_texts))
+    cmap = _to_unicode_cmap(chars - {'\n'}).encode('ascii')
+    cmap_id = add(b"<< /Length %d >>\nstream\n" % len(cmap) + cmap + b"\nendstream")
+    cid_font_id = add(b"<< /Type /Font /Subtype /CIDFontType2 /BaseFont /MSGothic "
+                      b"/CIDSystemInfo << /Registry (Adobe) /Ordering (Identity) /Supplement 0 >> "
+                      b"/DW 1000 >>")
+    font_id = add(b"<< /Type /Font /Subtype /Type0 /BaseFont /MSGothic /Encoding /Identity-H "
+                  b"/DescendantFonts [%d 0 R] /ToUnicode %d 0 R >>" % (cid_font_id, cmap_id))
+
+    page_ids = []
+    for text in page_texts:
+        ops = [b"BT /F1 10 Tf 12 TL 40 800 Td"]
+        for line in text.split('\n'):
+            ops.append(b"<" + line.encode('utf-16-be').hex().upper().encode('ascii') + b"> Tj T*")
+        ops.append(b"ET")
+        content = b"\n".join(ops)
+        content_id = add(b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+        page_ids.append(add(b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] "
+                            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>"
+                            % (pages_id, font_id, content_id)))
+
+    objects[catalog_id - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id
+    kids = b" ".join(b"%d 0 R" % pid for pid in page_ids)
+    objects[pages_id - 1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(page_ids)
+
+    out = bytearray(b"%PDF-1.7\n")
+    offsets = []
+    for num, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % num + body + b"\nendobj\n"
+    xref_pos = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1, catalog_id, xref_pos)
+    return bytes(out)
+
+
+def make_pdf(path, pages=400, vocabulary_size=3000, density=0.5, seed=0):
+    """합성 PDF 파일을 path 에 저장하고 바이트 수 반환"""
+    data = make_pdf_bytes(make_corpus(pages, vocabulary_size, density, seed))
+    with open(path, 'wb') as f:
+        f.write(data)
+    return len(data)